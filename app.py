@@ -1,19 +1,37 @@
 import os
 import io
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, render_template, request, jsonify, send_file, Response, stream_with_context
 from werkzeug.utils import secure_filename
 from datetime import datetime
+from urllib.parse import quote
 from excel_processor import ExcelProcessor
 from violations_processor import ViolationsProcessor
-from comparison_processor import ComparisonProcessor
-from merge_processor import MergeProcessor
+from comparison_processor import ComparisonProcessor, iter_txt_chunks, iter_file_chunks, gzip_chunks
+from merge_processor import MERGE_MODES, MergeProcessor
 from database import Database
+from result_store import ResultStore
+from uid_index import UidIndex
 
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['TEMPLATE_FILE'] = os.path.join('static', 'file', 'Шаблон.xlsx')
 app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB max file size
 app.config['ALLOWED_EXTENSIONS'] = {'xlsx', 'xls'}
+app.config['COMPARISON_WORKERS'] = int(os.environ.get('COMPARISON_WORKERS', 1))  # процессов для чтения файлов сравнения
+app.config['MERGE_WORKERS'] = int(os.environ.get('MERGE_WORKERS', 1))  # процессов для разбора файлов объединения
+app.config['COMPARISON_ENGINE'] = os.environ.get('COMPARISON_ENGINE', 'set')  # 'set' или 'array' (uid_arrays)
+# Кэш разобранных UID по хэшу содержимого загруженных файлов; пусто - выключен.
+# Загрузки пользователей хранятся в нём до вытеснения по UID_CACHE_MAX_MB, поэтому включается явно
+app.config['UID_CACHE_DIR'] = os.environ.get('UID_CACHE_DIR', '')
+app.config['UID_CACHE_MAX_BYTES'] = int(os.environ.get('UID_CACHE_MAX_MB', 1024)) * 1024 * 1024
+# > 0: сравнение двух файлов на диске (external_diff) с таким бюджетом памяти, для файлов больше ОЗУ
+app.config['COMPARISON_EXTERNAL_BYTES'] = int(os.environ.get('COMPARISON_EXTERNAL_MB', 0)) * 1024 * 1024
+# Результаты сравнения хранятся на сервере (списки различий - на диске) и скачиваются по result_id
+app.config['RESULT_STORE_DIR'] = os.environ.get('RESULT_STORE_DIR', os.path.join('uploads', 'results'))
+app.config['RESULT_TTL_SECONDS'] = int(os.environ.get('RESULT_TTL_SECONDS', 3600))
+# Постоянный индекс UID по источникам и месяцам (uid_index.py); пусто - выключен.
+# Если задан, сравнение с указанным месяцем сохраняет оба множества под названиями файлов
+app.config['UID_INDEX_DB'] = os.environ.get('UID_INDEX_DB', '')
 
 # Создаем необходимые папки
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
@@ -21,6 +39,9 @@ os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 # Инициализируем БД
 db = Database()
 
+# Хранилище результатов сравнения
+result_store = ResultStore(app.config['RESULT_STORE_DIR'], ttl_seconds=app.config['RESULT_TTL_SECONDS'])
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
@@ -330,37 +351,91 @@ def compare_files():
         file2_name = request.form.get('file2_name', 'Файл 2')
         month_name = request.form.get('month_name', '')
         language = request.form.get('language', 'uz')
+        counts_only = request.form.get('counts_only') in ('1', 'true')
+        provenance = request.form.get('provenance') in ('1', 'true')
+        # Столбец UID для CSV/Excel: имя или кандидаты через запятую (пусто - по умолчанию)
+        column_name = request.form.get('column_name', '').strip() or None
         
         if file1.filename == '' or file2.filename == '':
             return jsonify({'error': 'Выберите оба файла'}), 400
         
-        # Сохраняем файлы временно
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        file1_path = os.path.join(app.config['UPLOAD_FOLDER'], f'compare1_{timestamp}_{secure_filename(file1.filename)}')
-        file2_path = os.path.join(app.config['UPLOAD_FOLDER'], f'compare2_{timestamp}_{secure_filename(file2.filename)}')
-        
-        file1.save(file1_path)
-        file2.save(file2_path)
+        # Сравниваем файлы: загрузки читаются прямо из потока Werkzeug
+        # (большие уже лежат в SpooledTemporaryFile), без копий в uploads/
+        processor = ComparisonProcessor(workers=app.config['COMPARISON_WORKERS'],
+                                        engine=app.config['COMPARISON_ENGINE'],
+                                        cache_dir=app.config['UID_CACHE_DIR'],
+                                        cache_max_bytes=app.config['UID_CACHE_MAX_BYTES'],
+                                        external_memory_bytes=app.config['COMPARISON_EXTERNAL_BYTES'] or None,
+                                        index_db=app.config['UID_INDEX_DB'] or None)
+        # В режиме на диске файлы различий пишутся сразу в папку хранилища
+        # и переносятся в результат без чтения в память
+        with result_store.staging_dir() as list_dir:
+            result = processor.compare_files(
+                file1, 
+                file2, 
+                file1_name, 
+                file2_name,
+                column_name=column_name,
+                counts_only=counts_only,
+                index_period=month_name or None,
+                provenance=provenance,
+                list_dir=list_dir
+            )
+            
+            # Форматируем вывод на нужном языке
+            result['text_output'] = processor._format_comparison_output(result, language)
+            
+            # Добавляем название месяца
+            if month_name:
+                result['month_name'] = month_name
+            
+            # Списки различий остаются на сервере, клиенту - только количество и result_id
+            # (в режиме "только количество" списков нет и сохранять нечего)
+            if not counts_only:
+                result_id = result_store.put(result)
+                result = result_store.get(result_id)
         
-        # Сравниваем файлы
-        processor = ComparisonProcessor()
-        result = processor.compare_files(
-            file1_path, 
-            file2_path, 
-            file1_name, 
-            file2_name
-        )
+        return jsonify({
+            'success': True,
+            'result': result
+        })
+    
+    except Exception as e:
+        return jsonify({'error': f'Ошибка сравнения: {str(e)}'}), 500
+
+@app.route('/comparison/compare-multi', methods=['POST'])
+def compare_multi_files():
+    """N-стороннее сравнение: количество UID в каждой области диаграммы Венна.
+    Если передан region (например 'Pochta+ASBT'), возвращается TXT с UID этой области."""
+    try:
+        files = [f for f in request.files.getlist('files[]') if f.filename != '']
+        if len(files) < 2:
+            return jsonify({'error': 'Необходимо загрузить минимум 2 файла'}), 400
         
-        # Форматируем вывод на нужном языке
-        result['text_output'] = processor._format_comparison_output(result, language)
+        names = request.form.getlist('names[]')
+        if len(names) != len(files):
+            names = [os.path.splitext(f.filename)[0] for f in files]
+        region = request.form.get('region', '').strip()
+        language = request.form.get('language', 'uz')
         
-        # Добавляем название месяца
-        if month_name:
-            result['month_name'] = month_name
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         
-        # Удаляем временные файлы
-        os.remove(file1_path)
-        os.remove(file2_path)
+        processor = ComparisonProcessor(workers=app.config['COMPARISON_WORKERS'],
+                                        engine=app.config['COMPARISON_ENGINE'],
+                                        cache_dir=app.config['UID_CACHE_DIR'],
+                                        cache_max_bytes=app.config['UID_CACHE_MAX_BYTES'])
+        # Загрузки читаются прямо из потока, как в /comparison/compare
+        result = processor.compare_many(files, names, region=region or None, language=language)
+        
+        if region:
+            # Отправляем UID выбранной области потоком (без заголовка, как download-differences)
+            compress = request.form.get('gzip') in ('1', 'true')
+            parts = [part.strip() for part in region.replace(',', '+').split('+')]
+            filename = secure_filename(f"region_{'_'.join(parts)}_{timestamp}.txt")
+            chunks = iter_txt_chunks(result['region_list'])
+            if compress:
+                return _stream_download(gzip_chunks(chunks), filename + '.gz', compress=True)
+            return _stream_download(chunks, filename)
         
         return jsonify({
             'success': True,
@@ -368,42 +443,91 @@ def compare_files():
         })
     
     except Exception as e:
-        # Удаляем временные файлы при ошибке
-        if 'file1_path' in locals() and os.path.exists(file1_path):
-            os.remove(file1_path)
-        if 'file2_path' in locals() and os.path.exists(file2_path):
-            os.remove(file2_path)
         return jsonify({'error': f'Ошибка сравнения: {str(e)}'}), 500
 
+def _uid_index():
+    """Индекс UID или None, если он выключен (UID_INDEX_DB не задан)"""
+    db_path = app.config['UID_INDEX_DB']
+    return UidIndex(db_path) if db_path else None
+
+@app.route('/uid-index/periods')
+def uid_index_periods():
+    """Проиндексированные множества (источник, месяц, количество)"""
+    index = _uid_index()
+    if index is None:
+        return jsonify({'error': 'Индекс UID не настроен (UID_INDEX_DB)'}), 404
+    return jsonify({'success': True, 'sets': index.periods()})
+
+@app.route('/uid-index/lookup')
+def uid_index_lookup():
+    """В каких источниках и месяцах встречается UID"""
+    index = _uid_index()
+    if index is None:
+        return jsonify({'error': 'Индекс UID не настроен (UID_INDEX_DB)'}), 404
+    uid = request.args.get('uid', '').strip()
+    if not uid:
+        return jsonify({'error': 'Укажите uid'}), 400
+    return jsonify({'success': True, 'uid': uid, 'found': index.lookup(uid)})
+
+@app.route('/uid-index/churn')
+def uid_index_churn():
+    """Отток источника между двумя месяцами: исчезнувшие и новые UID"""
+    index = _uid_index()
+    if index is None:
+        return jsonify({'error': 'Индекс UID не настроен (UID_INDEX_DB)'}), 404
+    source = request.args.get('source', '')
+    from_period = request.args.get('from', '')
+    to_period = request.args.get('to', '')
+    if not (source and from_period and to_period):
+        return jsonify({'error': 'Укажите source, from и to'}), 400
+    try:
+        limit = int(request.args.get('limit', 1000))
+    except ValueError:
+        return jsonify({'error': 'limit должен быть числом'}), 400
+    return jsonify({'success': True, 'result': index.churn(source, from_period, to_period, limit=limit)})
+
+def _stream_download(chunks, filename, compress=False, mimetype=None):
+    """Потоковый ответ-вложение из итератора bytes (TXT или .txt.gz; другой тип - mimetype)"""
+    if mimetype is None:
+        mimetype = 'application/gzip' if compress else 'text/plain; charset=utf-8'
+    response = Response(stream_with_context(chunks), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(filename)}"
+    return response
+
 @app.route('/comparison/download-differences', methods=['POST'])
 def download_comparison_differences():
-    """Скачать 2 файла с различиями (как в compare_month.py --export)"""
+    """Скачать файл с различиями (как в compare_month.py --export), потоком; gzip по запросу"""
     try:
+        result_id = request.json.get('result_id')
         comparison_data = request.json.get('comparison_data')
         file_type = request.json.get('file_type', 'file1')  # file1 или file2
+        compress = bool(request.json.get('gzip', False))
+        
+        if result_id:
+            # Результат из хранилища: файл отдается с диска потоком
+            meta = result_store.get(result_id)
+            list_path = result_store.list_path(result_id, 'only_in_file1_list' if file_type == 'file1' else 'only_in_file2_list')
+            if meta is None or list_path is None:
+                return jsonify({'error': 'Результат сравнения не найден или устарел, выполните сравнение заново'}), 404
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            first, second = (meta['file1_name'], meta['file2_name']) if file_type == 'file1' else (meta['file2_name'], meta['file1_name'])
+            filename = f"{first}_minus_{second}_{timestamp}.txt"
+            if compress:
+                return _stream_download(gzip_chunks(iter_file_chunks(list_path)), filename + '.gz', compress=True)
+            return send_file(
+                list_path,
+                as_attachment=True,
+                download_name=filename,
+                mimetype='text/plain; charset=utf-8'
+            )
         
         if not comparison_data:
             return jsonify({'error': 'Нет данных для экспорта'}), 400
         
+        # Строится только запрошенный файл, сразу в ответ
         processor = ComparisonProcessor()
-        file1_content, file1_name, file2_content, file2_name = processor.export_differences(comparison_data)
-        
-        # Отправляем нужный файл
-        if file_type == 'file1':
-            file_stream = io.BytesIO(file1_content)
-            filename = file1_name
-        else:
-            file_stream = io.BytesIO(file2_content)
-            filename = file2_name
-        
-        file_stream.seek(0)
-        
-        return send_file(
-            file_stream,
-            as_attachment=True,
-            download_name=filename,
-            mimetype='text/plain; charset=utf-8'
-        )
+        chunks, filename = processor.stream_differences(comparison_data, file_type, compress=compress)
+        return _stream_download(chunks, filename, compress=compress)
     except Exception as e:
         return jsonify({'error': f'Ошибка экспорта: {str(e)}'}), 500
 
@@ -427,6 +551,17 @@ def merge_files_endpoint():
         
         language = request.form.get('language', 'ru')
         
+        # Режим объединения и K для режима "минимум в K файлах"
+        merge_mode = request.form.get('merge_mode', 'union')
+        if merge_mode not in MERGE_MODES:
+            return jsonify({'error': f'Неизвестный режим объединения: {merge_mode}'}), 400
+        try:
+            min_files = int(request.form.get('min_files', 2))
+        except ValueError:
+            return jsonify({'error': 'Число файлов должно быть целым числом'}), 400
+        if min_files < 1:
+            return jsonify({'error': 'Число файлов должно быть не меньше 1'}), 400
+        
         # Сохраняем файлы временно
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         files_data = []
@@ -456,8 +591,8 @@ def merge_files_endpoint():
             return jsonify({'error': 'Необходимо загрузить минимум 2 корректных файла'}), 400
         
         # Объединяем файлы
-        processor = MergeProcessor()
-        result = processor.merge_files(files_data, column_names)
+        processor = MergeProcessor(workers=app.config['MERGE_WORKERS'])
+        result = processor.merge_files(files_data, column_names, merge_mode, min_files)
         
         # Форматируем вывод на нужном языке
         # Для веб-интерфейса - ограничиваем предпросмотр до 1000 записей
@@ -510,7 +645,7 @@ def download_merged_txt():
 
 @app.route('/merge/download-excel', methods=['POST'])
 def download_merged_excel():
-    """Скачать объединенные данные как Excel"""
+    """Скачать объединенные данные как Excel (write-only книга, отдается потоком)"""
     try:
         merged_data = request.json.get('merged_data')
         
@@ -518,17 +653,9 @@ def download_merged_excel():
             return jsonify({'error': 'Нет данных для экспорта'}), 400
         
         processor = MergeProcessor()
-        excel_content, filename = processor.export_to_excel(merged_data)
-        
-        file_stream = io.BytesIO(excel_content)
-        file_stream.seek(0)
-        
-        return send_file(
-            file_stream,
-            as_attachment=True,
-            download_name=filename,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
+        chunks, filename = processor.stream_excel(merged_data)
+        return _stream_download(chunks, filename,
+                                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
     except Exception as e:
         return jsonify({'error': f'Ошибка экспорта: {str(e)}'}), 500
 
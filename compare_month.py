@@ -18,21 +18,45 @@ Rules:
 - POCHTA TXT files: one UID per line. First line may be a header like "Uid". Ignore blank lines.
 - ASBT CSV: semicolon-separated, quoted; UID in column TV_SERIALNUMBER.
 - Telecom XLSX: UID in column doc_num.
+- --asbt-column/--telecom-column override these with a name or a comma-separated
+  list of candidates; only the header row is read to pick the first one present.
 - Merge files within the same subdirectory (treat as a single combined list for that source).
+- Any of these files may also come gzipped (POCHTA_1.txt.gz) or in .zip archives
+  (every matching member is read); they are decompressed as a stream, not unpacked.
 
 Outputs two blocks:
 1) Pochta vs Telecom
 2) Pochta vs ASBT
+and, with --venn, a third one with every Pochta/Telecom/ASBT Venn region.
 
 Usage:
   python compare_month.py --base-dir "c:/Users/User/CascadeProjects/QOIDA_Buzar/Comparer/AUGUST" --month "Avgust" --export
+  python compare_month.py --base-dir ".../AUGUST" --month "Avgust" --workers 4   # parse files in 4 processes
+  python compare_month.py --base-dir ".../AUGUST" --month "Avgust" --engine array # compact sorted-array sets
+  python compare_month.py --base-dir ".../AUGUST" --month "Avgust" --cache-dir .uid_cache  # skip re-parsing unchanged files
+  python compare_month.py --base-dir ".../AUGUST" --month "Avgust" --venn --export-region "Pochta+ASBT"  # N-way regions
+  python compare_month.py --base-dir ".../AUGUST" --month "Avgust" --external --memory-mb 512 --export  # larger than RAM
+  python compare_month.py --base-dir ".../AUGUST" --month "Avgust" --counts-only  # statistics only, less memory
+  python compare_month.py --base-dir ".../AUGUST" --month "Avgust" --incremental --export  # parse only new/changed files
+  python compare_month.py --root-dir ".../Comparer" --workers 4 --export  # every month, 4 at a time, + summary.csv/json
+  python compare_month.py --base-dir ".../AUGUST" --month "Avgust" --index-db uid_index.db --period 2025-08  # then: uid_index.py churn/lookup
+  python compare_month.py --base-dir ".../AUGUST" --month "Avgust" --provenance --export  # per-file duplicates + origin of each difference
+  python compare_month.py --base-dir ".../AUGUST" --month "Avgust" --telecom-column "doc_num,DOC_NUMBER,uid"  # renamed UID column
 
 """
 from __future__ import annotations
 import argparse
+import contextlib
+import csv
+import io
+import json
 import os
+import shutil
 import sys
-from typing import Iterable, Set, List
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, List, Optional, Set
 
 # We use pandas for CSV/XLSX reading due to varied encodings and Excel support
 try:
@@ -40,6 +64,30 @@ try:
 except Exception as e:
     pd = None
 
+from compressed_input import archive_exts
+from uid_readers import (ColumnSpec, empty_uids, iter_asbt_csv, iter_files, iter_pochta_txt, iter_telecom_excel,
+                         load_file, load_file_counts, reader_tag, with_column)
+
+# Sorted-array UID engine needs numpy (installed together with pandas)
+try:
+    from uid_arrays import UidArray, memory_bytes, membership_masks, partitioned_diff, region_counts, sorted_uids, to_engine  # type: ignore
+except Exception:
+    UidArray = None  # type: ignore
+    membership_masks = None  # type: ignore
+    partitioned_diff = None  # type: ignore
+    memory_bytes = None  # type: ignore
+    to_engine = None  # type: ignore
+
+    def sorted_uids(uids):  # type: ignore
+        return sorted(uids)
+
+try:
+    from uid_cache import UidCache, file_digest  # type: ignore
+    from source_manifest import SourceManifest  # type: ignore
+except Exception:
+    UidCache = None  # type: ignore
+    SourceManifest = None  # type: ignore
+
 # Optional progress bars via tqdm
 try:
     from tqdm import tqdm  # type: ignore
@@ -49,17 +97,6 @@ except Exception:
     _TQDM_AVAILABLE = False
 
 
-def _normalize_uid(value) -> str | None:
-    if value is None:
-        return None
-    s = str(value)
-    # Remove BOM if present and surrounding quotes/whitespace
-    s = s.lstrip('\ufeff').strip().strip('"').strip("'")
-    if not s:
-        return None
-    return s
-
-
 def _write_uids_txt(file_path: str, uids: Set[str]) -> None:
     """Write a TXT file with header 'Uid' and each UID on new line.
     The file will be encoded as UTF-8.
@@ -67,165 +104,616 @@ def _write_uids_txt(file_path: str, uids: Set[str]) -> None:
     os.makedirs(os.path.dirname(file_path), exist_ok=True)
     with open(file_path, 'w', encoding='utf-8', newline='') as f:
         f.write('Uid\n')
-        for uid in sorted(uids):
+        for uid in sorted_uids(uids):
             f.write(f"{uid}\n")
 
 
-def read_pochta_txts(dir_path: str, use_tqdm: bool = True) -> Set[str]:
-    """Read all .txt files, return set of UIDs.
-    First line may be a header (e.g., 'Uid'); ignore if so.
+def _read_file_into(uids: Set[str], reader: Callable[[str], Iterable[str]], fp: str) -> None:
+    try:
+        uids.update(reader(fp))
+    except KeyError as e:
+        print(f"Warning: {e.args[0]}")
+    except Exception as e:
+        print(f"Warning: Could not read {fp}: {e}")
+
+
+# Plain data files of each source; their .gz variants and .zip archives are listed too
+POCHTA_EXTS = archive_exts(('.txt',))
+ASBT_EXTS = archive_exts(('.csv',))
+TELECOM_EXTS = archive_exts(('.xlsx', '.xls'))
+
+
+def _list_files(dir_path: str, exts: tuple) -> List[str]:
+    """Files of a source directory with one of `exts` (empty if the directory is missing)."""
+    if not os.path.isdir(dir_path):
+        return []
+    return sorted(os.path.join(dir_path, f) for f in os.listdir(dir_path) if f.lower().endswith(exts))
+
+
+def _read_files(files: List[str], reader: Callable[[str], Iterable[str]], desc: str,
+                use_tqdm: bool = True, workers: int = 1, engine: str = 'set', cache=None,
+                digests: Optional[Dict[str, str]] = None):
+    """Run `reader` over every file and merge the results into one UID collection:
+    a Set[str], or a UidArray when engine='array'.
+    With workers > 1 each file is parsed in its own process and the partial
+    results are merged as they complete; the progress bar counts finished files.
+    With a UidCache, files whose content was parsed before are not re-parsed;
+    `digests` maps files to content digests already computed by the caller.
     """
+    digests = digests or {}
+    if (engine == 'array' or cache is not None) and UidArray is None:
+        print("Error: numpy is required for --engine array and --cache-dir. Please install dependencies from requirements.txt")
+        sys.exit(1)
     uids: Set[str] = set()
-    if not os.path.isdir(dir_path):
-        return uids
-    txt_files = [os.path.join(dir_path, f) for f in os.listdir(dir_path) if f.lower().endswith('.txt')]
-    files_iter = sorted(txt_files)
-    if use_tqdm and _TQDM_AVAILABLE:
-        files_iter = tqdm(files_iter, desc='POCHTA TXT files', unit='file')  # type: ignore
-    for fp in files_iter:  # type: ignore
-        try:
-            # Try UTF-8 first, then fallback to cp1251/latin1
-            tried_encodings = ['utf-8', 'utf-8-sig', 'cp1251', 'latin1']
-            success = False
-            for enc in tried_encodings:
-                try:
-                    with open(fp, 'r', encoding=enc, errors='ignore') as f:
-                        first = True
-                        for line in f:
-                            s = _normalize_uid(line)
-                            if s is None:
-                                continue
-                            header_tokens = {'uid', 'id', 'doc_num', 'docnum'}
-                            if first and s.lower() in header_tokens:
-                                first = False
-                                continue
-                            first = False
-                            # Also guard against stray header tokens mid-file
-                            if s.lower() in header_tokens:
-                                continue
-                            uids.add(s)
-                    success = True
-                    break
-                except Exception:
-                    continue
-            if not success:
-                print(f"Warning: Failed to read {fp}")
-        except Exception as e:
-            print(f"Warning: Error reading {fp}: {e}")
+    parts = []
+    cache_tag = reader_tag(reader)
+
+    def add(part):
+        nonlocal uids
+        if engine == 'array':
+            parts.append(part)
+        else:
+            if len(part) > len(uids):
+                uids, part = part, uids
+            uids |= part
+
+    files = sorted(files)
+    bar = tqdm(total=len(files), desc=desc, unit='file') if use_tqdm and _TQDM_AVAILABLE else None  # type: ignore
+    try:
+        if workers > 1 and len(files) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(files))) as pool:
+                futures = [pool.submit(load_file, reader, fp, engine, cache, cache_tag, digests.get(fp))
+                           for fp in files]
+                for fut in as_completed(futures):
+                    add(fut.result())
+                    if bar is not None:
+                        bar.update(1)
+        else:
+            for fp in files:
+                if engine == 'array' or cache is not None:
+                    add(load_file(reader, fp, engine, cache, cache_tag, digests.get(fp)))
+                else:
+                    _read_file_into(uids, reader, fp)
+                if bar is not None:
+                    bar.update(1)
+    finally:
+        if bar is not None:
+            bar.close()
+    if engine == 'array':
+        return UidArray.union_all(parts)
     return uids
 
 
-def read_asbt_csv(dir_path: str, use_tqdm: bool = True) -> Set[str]:
-    """Read ASBT CSV file(s), extract TV_SERIALNUMBER as UID set.
+def read_source_incremental(dir_path: str, exts: tuple, reader: Callable[[str], Iterable[str]], desc: str,
+                            state_dir: str, cache, use_tqdm: bool = True, workers: int = 1, engine: str = 'set'):
+    """Read a source directory, parsing only files that are new or changed since
+    the last run (see source_manifest). Per-file contributions come from `cache`;
+    the merged set of the source is kept in `state_dir`.
+    """
+    files = _list_files(dir_path, exts)
+    tag = reader_tag(reader)
+    manifest = SourceManifest(state_dir, os.path.basename(os.path.normpath(dir_path)), tag)
+    unchanged, changed, removed = manifest.plan(files)
+    union = manifest.load_union()
+    # Each new or changed file is hashed once: the digest is both its cache key and its manifest entry
+    digests = {fp: manifest.checked_digest(fp) or file_digest(fp) for fp in changed}
+    new = _read_files(changed, reader, desc, use_tqdm, workers, 'array', cache, digests) if changed else UidArray.empty()
+    if union is not None and not removed and not any(manifest.is_known(fp) for fp in changed):
+        # Files were only added: merge them into the stored set
+        union = UidArray.union_all([union, new])
+    else:
+        # A file changed or disappeared: rebuild from the per-file contributions
+        parts = [new]
+        for fp in unchanged:
+            part = cache.get(cache.key_for_digest(manifest.digest(fp), tag))
+            if part is None:  # evicted from the cache
+                part = load_file(reader, fp, 'array', cache, tag, manifest.digest(fp))
+            parts.append(part)
+        union = UidArray.union_all(parts)
+    manifest.save(files, union, digests)
+    print(f"{desc}: {len(changed)} new/changed, {len(unchanged)} unchanged, {len(removed)} removed")
+    return to_engine(union, engine)
+
+
+def read_pochta_txts(dir_path: str, use_tqdm: bool = True, workers: int = 1, engine: str = 'set', cache=None):
+    """Read all .txt files, return set of UIDs.
+    First line may be a header (e.g., 'Uid'); ignore if so.
+    """
+    txt_files = _list_files(dir_path, POCHTA_EXTS)
+    if not txt_files:
+        return empty_uids(engine)
+    return _read_files(txt_files, iter_pochta_txt, 'POCHTA TXT files', use_tqdm, workers, engine, cache)
+
+
+def read_asbt_csv(dir_path: str, use_tqdm: bool = True, workers: int = 1, engine: str = 'set', cache=None,
+                  column: Optional[ColumnSpec] = None):
+    """Read ASBT CSV file(s), extract TV_SERIALNUMBER (or `column`) as UID set.
     Handles semicolon separator and varied encodings.
     """
-    uids: Set[str] = set()
-    if not os.path.isdir(dir_path):
-        return uids
-    csv_files = [os.path.join(dir_path, f) for f in os.listdir(dir_path) if f.lower().endswith('.csv')]
-    files_iter = sorted(csv_files)
-    if use_tqdm and _TQDM_AVAILABLE:
-        files_iter = tqdm(files_iter, desc='ASBT CSV files', unit='file')  # type: ignore
-    for fp in files_iter:  # type: ignore
-        if pd is None:
-            print("Error: pandas not installed. Please install dependencies from requirements.txt")
-            sys.exit(1)
-        # Try common encodings
-        for enc in ['utf-8', 'utf-8-sig', 'cp1251', 'latin1']:
-            try:
-                df = pd.read_csv(fp, sep=';', quotechar='"', engine='python', encoding=enc, dtype=str, on_bad_lines='skip')
-                break
-            except Exception:
-                df = None  # type: ignore
-                continue
-        if df is None:
-            print(f"Warning: Could not read CSV {fp}")
-            continue
-        # Accept common variants of the column name
-        possible_cols = ['TV_SERIALNUMBER', 'Tv_SerialNumber', 'tv_serialnumber', 'TV_SERIALNUMBER\ufeff']
-        col = None
-        for c in df.columns:
-            if c in possible_cols or c.strip().upper() == 'TV_SERIALNUMBER':
-                col = c
-                break
-        if col is None:
-            print(f"Warning: Column TV_SERIALNUMBER not found in {fp}. Available columns: {list(df.columns)}")
-            continue
-        series = df[col].astype(str)
-        for v in series:
-            s = _normalize_uid(v)
-            if s:
-                uids.add(s)
-    return uids
+    csv_files = _list_files(dir_path, ASBT_EXTS)
+    if not csv_files:
+        return empty_uids(engine)
+    if pd is None:
+        print("Error: pandas not installed. Please install dependencies from requirements.txt")
+        sys.exit(1)
+    return _read_files(csv_files, with_column(iter_asbt_csv, column), 'ASBT CSV files', use_tqdm, workers, engine, cache)
 
 
-def read_telecom_excels(dir_path: str, use_tqdm: bool = True) -> Set[str]:
-    """Read Telecom Excel files, extract doc_num as UID set."""
-    uids: Set[str] = set()
-    if not os.path.isdir(dir_path):
-        return uids
-    xlsx_files = [os.path.join(dir_path, f) for f in os.listdir(dir_path) if f.lower().endswith(('.xlsx', '.xls'))]
-    files_iter = sorted(xlsx_files)
-    if use_tqdm and _TQDM_AVAILABLE:
-        files_iter = tqdm(files_iter, desc='Telecom Excel files', unit='file')  # type: ignore
-    for fp in files_iter:  # type: ignore
-        if pd is None:
-            print("Error: pandas not installed. Please install dependencies from requirements.txt")
-            sys.exit(1)
-        try:
-            # Read only the necessary column to reduce memory if possible
-            df = pd.read_excel(fp, dtype=str, engine=None)  # engine auto-select; openpyxl for xlsx
-        except Exception as e:
-            print(f"Warning: Could not read Excel {fp}: {e}")
-            continue
-        # Try to locate 'doc_num' with case-insensitive matching
-        col = None
-        for c in df.columns:
-            if c.strip().lower() == 'doc_num':
-                col = c
-                break
-        if col is None:
-            print(f"Warning: Column doc_num not found in {fp}. Available columns: {list(df.columns)}")
-            continue
-        series = df[col].astype(str)
-        for v in series:
-            s = _normalize_uid(v)
-            if s:
-                uids.add(s)
-    return uids
+def read_telecom_excels(dir_path: str, use_tqdm: bool = True, workers: int = 1, engine: str = 'set', cache=None,
+                        column: Optional[ColumnSpec] = None):
+    """Read Telecom Excel files, extract doc_num (or `column`) as UID set."""
+    xlsx_files = _list_files(dir_path, TELECOM_EXTS)
+    if not xlsx_files:
+        return empty_uids(engine)
+    return _read_files(xlsx_files, with_column(iter_telecom_excel, column), 'Telecom Excel files',
+                       use_tqdm, workers, engine, cache)
 
 
-def print_stats(month_display: str, po: Set[str], tl: Set[str], asbt: Set[str]) -> None:
-    # Pochta vs Telecom
-    both_pt = po & tl
-    only_po_vs_tl = po - tl
-    only_tl_vs_po = tl - po
+def _fmt(n: int) -> str:
+    return f"{n:,}".replace(',', ' ')
 
+
+def print_pair_counts(month_display: str, pt: dict, pa: dict) -> None:
+    """Print Pochta-Telecom and Pochta-ASBT statistics from precomputed counts
+    (dicts with left_total/right_total/in_both/only_left/only_right, Pochta on the left).
+    """
     print("-" * 10)
     print(f"{month_display} uchun statistika (Pochta-Telecom)")
     print("-" * 44)
-    print(f"Pochta bergan faylda jami: {len(po):,}".replace(',', ' '))
-    print(f"Telecom bergan faylda jami: {len(tl):,}".replace(',', ' '))
+    print(f"Pochta bergan faylda jami: {_fmt(pt['left_total'])}")
+    print(f"Telecom bergan faylda jami: {_fmt(pt['right_total'])}")
     print("-" * 44)
-    print(f"Ikkalasida ham mavjud bo'lganlar soni: {len(both_pt):,}".replace(',', ' '))
-    print(f"Pochta bergan faylda mavjud, Telecom bergan faylda yo'q soni: {len(only_po_vs_tl):,}".replace(',', ' '))
-    print(f"Telecom bergan faylda mavjud, Pochta bergan faylda yo'q soni: {len(only_tl_vs_po):,}".replace(',', ' '))
+    print(f"Ikkalasida ham mavjud bo'lganlar soni: {_fmt(pt['in_both'])}")
+    print(f"Pochta bergan faylda mavjud, Telecom bergan faylda yo'q soni: {_fmt(pt['only_left'])}")
+    print(f"Telecom bergan faylda mavjud, Pochta bergan faylda yo'q soni: {_fmt(pt['only_right'])}")
     print()
 
-    # Pochta vs ASBT
-    both_pa = po & asbt
-    only_po_vs_asbt = po - asbt
-    only_asbt_vs_po = asbt - po
-
     print("-" * 12)
     print(f"{month_display} uchun solishtirma statistika (Pochta - ASBT):")
     print("-" * 50)
-    print(f"TXT (Pochta) fayldagi jami: {len(po):,}".replace(',', ' '))
-    print(f"CSV (ASBT) fayldagi jami: {len(asbt):,}".replace(',', ' '))
+    print(f"TXT (Pochta) fayldagi jami: {_fmt(pa['left_total'])}")
+    print(f"CSV (ASBT) fayldagi jami: {_fmt(pa['right_total'])}")
+    print("-" * 50)
+    print(f"Ikkalasida ham mavjud bo'lganlar soni: {_fmt(pa['in_both'])}")
+    print(f"Faqat TXT (Pochta) faylda mavjud bo'lganlar soni: {_fmt(pa['only_left'])}")
+    print(f"Faqat CSV (ASBT) faylda mavjud bo'lganlar soni: {_fmt(pa['only_right'])}")
+
+
+def count_common(a, b) -> int:
+    """Size of the intersection of two UID collections without building it:
+    the smaller one is probed against the hash index (or sorted array) of the larger.
+    """
+    if UidArray is not None and isinstance(a, UidArray) and isinstance(b, UidArray):
+        return a.count_common(b)
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(map(b.__contains__, a))
+
+
+def _pair_counts(left, right) -> dict:
+    both = count_common(left, right)
+    return {'left_total': len(left), 'right_total': len(right), 'in_both': both,
+            'only_left': len(left) - both, 'only_right': len(right) - both}
+
+
+def print_stats(month_display: str, po: Set[str], tl: Set[str], asbt: Set[str], engine: str = 'set') -> None:
+    """Print Pochta-Telecom and Pochta-ASBT statistics.
+    With engine='array' the sources are (converted to) sorted UidArrays and the
+    memory held by each source is reported after the statistics.
+    """
+    if engine == 'array':
+        po, tl, asbt = (to_engine(u, 'array') for u in (po, tl, asbt))
+
+    print_pair_counts(month_display, _pair_counts(po, tl), _pair_counts(po, asbt))
+
+    if engine == 'array':
+        print()
+        print("-" * 50)
+        print("Xotira (array engine):")
+        for name, uids in (('Pochta', po), ('Telecom', tl), ('ASBT', asbt)):
+            print(f"{name}: {_fmt(len(uids))} UID, {memory_bytes(uids) / (1024 * 1024):.1f} MB")
+
+
+def venn_regions(sources: List[tuple]) -> tuple:
+    """N-way comparison of (name, uids) sources, built in one pass over all of them.
+    Returns (union, masks, counts): every UID of any source as a sorted UidArray,
+    the bitmask of sources each one appears in (bit i = sources[i]) and the
+    number of UIDs in every non-empty Venn region, keyed by mask.
+    """
+    if membership_masks is None:
+        print("Error: numpy is required for N-way comparison. Please install dependencies from requirements.txt")
+        sys.exit(1)
+    union, masks = membership_masks([to_engine(uids, 'array') for _, uids in sources])
+    return union, masks, region_counts(masks)
+
+
+def region_label(mask: int, names: List[str]) -> str:
+    members = [n for i, n in enumerate(names) if mask & (1 << i)]
+    if len(members) == 1:
+        return f"Faqat {members[0]}"
+    return ' + '.join(members)
+
+
+def parse_region(spec: str, names: List[str]) -> int:
+    """'Pochta+Telecom' -> mask of exactly those sources (names are case-insensitive)."""
+    lookup = {n.lower(): i for i, n in enumerate(names)}
+    mask = 0
+    for part in spec.replace(',', '+').split('+'):
+        part = part.strip().lower()
+        if part not in lookup:
+            raise ValueError(f"Unknown source '{part}' in region '{spec}'. Sources: {', '.join(names)}")
+        mask |= 1 << lookup[part]
+    return mask
+
+
+def region_uids(union, masks, mask: int):
+    """UIDs of one Venn region (present in exactly the sources of `mask`), sorted."""
+    return UidArray(union.values[masks == mask])
+
+
+def print_venn(month_display: str, sources: List[tuple]) -> tuple:
+    """Print counts for every Venn region of the sources; returns venn_regions() for exports."""
+    names = [name for name, _ in sources]
+    union, masks, counts = venn_regions(sources)
+
+    print()
+    print("-" * 12)
+    print(f"{month_display} uchun umumiy statistika ({' - '.join(names)}):")
+    print("-" * 50)
+    for name, uids in sources:
+        print(f"{name} faylda jami: {len(uids):,}".replace(',', ' '))
+    print(f"Barcha fayllarda jami noyob: {len(union):,}".replace(',', ' '))
     print("-" * 50)
-    print(f"Ikkalasida ham mavjud bo'lganlar soni: {len(both_pa):,}".replace(',', ' '))
-    print(f"Faqat TXT (Pochta) faylda mavjud bo'lganlar soni: {len(only_po_vs_asbt):,}".replace(',', ' '))
-    print(f"Faqat CSV (ASBT) faylda mavjud bo'lganlar soni: {len(only_asbt_vs_po):,}".replace(',', ' '))
+    # Regions ordered by number of sources, then by source order
+    for mask in sorted(range(1, 1 << len(names)), key=lambda m: (bin(m).count('1'), m)):
+        print(f"{region_label(mask, names)}: {counts.get(mask, 0):,}".replace(',', ' '))
+    return union, masks, counts
+
+
+def compare_external(month_display: str, base_dir: str, export_base: str | None = None,
+                     memory_mb: int = 256, tmp_dir: str | None = None, use_tqdm: bool = True,
+                     asbt_column: ColumnSpec | None = None, telecom_column: ColumnSpec | None = None) -> tuple:
+    """Out-of-core Pochta-Telecom / Pochta-ASBT comparison for months whose UID
+    sets do not fit in memory (see external_diff).
+    Each source is streamed file by file through an external sort bounded by
+    `memory_mb`, written once as a sorted unique file, and the two comparisons are
+    merge-joins over those files. With `export_base` the four difference files are
+    written during the merge, identical to the in-memory --export output.
+    Returns the (Pochta-Telecom, Pochta-ASBT) count dicts.
+    """
+    from external_diff import iter_sorted_file, merge_diff, sort_to_file
+    budget = memory_mb * 1024 * 1024
+    sources = [
+        ('pochta', _list_files(os.path.join(base_dir, 'POCHTA'), POCHTA_EXTS), iter_pochta_txt, 'POCHTA TXT files'),
+        ('asbt', _list_files(os.path.join(base_dir, 'ASBT'), ASBT_EXTS), with_column(iter_asbt_csv, asbt_column),
+         'ASBT CSV files'),
+        ('telecom', _list_files(os.path.join(base_dir, 'Telecom'), TELECOM_EXTS),
+         with_column(iter_telecom_excel, telecom_column), 'Telecom Excel files'),
+    ]
+    work_dir = tempfile.mkdtemp(prefix='compare_month_', dir=tmp_dir)
+    try:
+        sorted_paths = {}
+        for name, files, reader, desc in sources:
+            sorted_paths[name] = os.path.join(work_dir, f'{name}.sorted')
+            sort_to_file(iter_files(files, reader, desc, use_tqdm), sorted_paths[name], budget, work_dir)
+
+        def out(name):
+            return os.path.join(export_base, name) if export_base else None
+
+        pt = merge_diff(iter_sorted_file(sorted_paths['pochta']), iter_sorted_file(sorted_paths['telecom']),
+                        left_path=out('pochta_minus_telecom.txt'), right_path=out('telecom_minus_pochta.txt'))
+        pa = merge_diff(iter_sorted_file(sorted_paths['pochta']), iter_sorted_file(sorted_paths['asbt']),
+                        left_path=out('pochta_minus_asbt.txt'), right_path=out('asbt_minus_pochta.txt'))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    print_pair_counts(month_display, pt, pa)
+    return pt, pa
+
+
+def compare_counts_only(month_display: str, base_dir: str, use_tqdm: bool = True, workers: int = 1,
+                        engine: str = 'set', cache=None, asbt_column: ColumnSpec | None = None,
+                        telecom_column: ColumnSpec | None = None) -> tuple:
+    """Statistics only: no difference sets, no sorting, no exports.
+    Telecom is counted against Pochta and released before ASBT is read, so at
+    most two sources are held in memory at once.
+    Returns the (Pochta-Telecom, Pochta-ASBT) count dicts.
+    """
+    po = read_pochta_txts(os.path.join(base_dir, 'POCHTA'), use_tqdm=use_tqdm, workers=workers, engine=engine, cache=cache)
+    tl = read_telecom_excels(os.path.join(base_dir, 'Telecom'), use_tqdm=use_tqdm, workers=workers, engine=engine,
+                             cache=cache, column=telecom_column)
+    pt = _pair_counts(po, tl)
+    del tl
+    asbt = read_asbt_csv(os.path.join(base_dir, 'ASBT'), use_tqdm=use_tqdm, workers=workers, engine=engine,
+                         cache=cache, column=asbt_column)
+    pa = _pair_counts(po, asbt)
+    print_pair_counts(month_display, pt, pa)
+    return pt, pa
+
+
+def _make_cache(cache_dir: str | None, cache_max_mb: int, incremental: bool = False, state_dir: str | None = None):
+    """UidCache for --cache-dir, or the per-file store of --incremental (None if neither)."""
+    if not cache_dir and not incremental:
+        return None
+    if UidCache is None:
+        print("Error: numpy is required for --cache-dir and --incremental. Please install dependencies from requirements.txt")
+        sys.exit(1)
+    if cache_dir:
+        return UidCache(cache_dir, max_bytes=cache_max_mb * 1024 * 1024)
+    # Per-file contributions are kept next to the manifests
+    return UidCache(os.path.join(state_dir, 'files'), max_bytes=cache_max_mb * 1024 * 1024)
+
+
+def read_month(base_dir: str, use_tqdm: bool = True, workers: int = 1, engine: str = 'set', cache=None,
+               incremental: bool = False, state_dir: str | None = None, asbt_column: ColumnSpec | None = None,
+               telecom_column: ColumnSpec | None = None) -> tuple:
+    """Read the POCHTA, ASBT and Telecom sources of a month directory; returns (pochta, asbt, telecom).
+    `asbt_column`/`telecom_column` override the default UID columns (name or candidate list).
+    """
+    pochta_dir = os.path.join(base_dir, 'POCHTA')
+    asbt_dir = os.path.join(base_dir, 'ASBT')
+    telecom_dir = os.path.join(base_dir, 'Telecom')
+    if incremental:
+        if pd is None:
+            print("Error: pandas not installed. Please install dependencies from requirements.txt")
+            sys.exit(1)
+        opts = dict(state_dir=state_dir or os.path.join(base_dir, '.compare_state'), cache=cache,
+                    use_tqdm=use_tqdm, workers=workers, engine=engine)
+        return (read_source_incremental(pochta_dir, POCHTA_EXTS, iter_pochta_txt, 'POCHTA TXT files', **opts),
+                read_source_incremental(asbt_dir, ASBT_EXTS, with_column(iter_asbt_csv, asbt_column),
+                                        'ASBT CSV files', **opts),
+                read_source_incremental(telecom_dir, TELECOM_EXTS, with_column(iter_telecom_excel, telecom_column),
+                                        'Telecom Excel files', **opts))
+    return (read_pochta_txts(pochta_dir, use_tqdm=use_tqdm, workers=workers, engine=engine, cache=cache),
+            read_asbt_csv(asbt_dir, use_tqdm=use_tqdm, workers=workers, engine=engine, cache=cache, column=asbt_column),
+            read_telecom_excels(telecom_dir, use_tqdm=use_tqdm, workers=workers, engine=engine, cache=cache,
+                                column=telecom_column))
+
+
+def _differences(left, right, workers: int = 1) -> tuple:
+    """(left - right, right - left). Sorted arrays (engine='array') with workers > 1
+    are compared range by range in parallel (uid_arrays.partitioned_diff).
+    """
+    if workers > 1 and UidArray is not None and isinstance(left, UidArray) and isinstance(right, UidArray):
+        _, only_left, only_right = partitioned_diff(left, right, workers)
+        return only_left, only_right
+    return left - right, right - left
+
+
+def export_differences(export_base: str, po, tl, asbt, workers: int = 1) -> None:
+    """Write the four --export files (Pochta vs Telecom, Pochta vs ASBT) to `export_base`."""
+    po_tl, tl_po = _differences(po, tl, workers)
+    _write_uids_txt(os.path.join(export_base, 'pochta_minus_telecom.txt'), po_tl)
+    _write_uids_txt(os.path.join(export_base, 'telecom_minus_pochta.txt'), tl_po)
+    del po_tl, tl_po
+    po_asbt, asbt_po = _differences(po, asbt, workers)
+    _write_uids_txt(os.path.join(export_base, 'pochta_minus_asbt.txt'), po_asbt)
+    _write_uids_txt(os.path.join(export_base, 'asbt_minus_pochta.txt'), asbt_po)
+
+
+def read_source_provenance(name: str, dir_path: str, exts: tuple, reader: Callable[[str], Iterable[str]], desc: str,
+                           use_tqdm: bool = True, workers: int = 1):
+    """Read a source file by file, keeping where each UID came from and how often
+    it occurred (uid_provenance.SourceProvenance).
+    """
+    from uid_provenance import SourceProvenance
+    files = _list_files(dir_path, exts)
+    bar = tqdm(total=len(files), desc=desc, unit='file') if use_tqdm and _TQDM_AVAILABLE else None  # type: ignore
+    try:
+        if workers > 1 and len(files) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(files))) as pool:
+                futures = [pool.submit(load_file_counts, reader, fp) for fp in files]
+                for fut in as_completed(futures):
+                    if bar is not None:
+                        bar.update(1)
+                parts = [fut.result() for fut in futures]
+        else:
+            parts = []
+            for fp in files:
+                parts.append(load_file_counts(reader, fp))
+                if bar is not None:
+                    bar.update(1)
+    finally:
+        if bar is not None:
+            bar.close()
+    return SourceProvenance.from_files(name, files, parts)
+
+
+def read_month_provenance(base_dir: str, use_tqdm: bool = True, workers: int = 1,
+                          asbt_column: ColumnSpec | None = None, telecom_column: ColumnSpec | None = None) -> dict:
+    """{'Pochta': SourceProvenance, 'ASBT': ..., 'Telecom': ...} of a month directory."""
+    if UidArray is None or pd is None:
+        print("Error: numpy and pandas are required for --provenance. Please install dependencies from requirements.txt")
+        sys.exit(1)
+    return {
+        'Pochta': read_source_provenance('Pochta', os.path.join(base_dir, 'POCHTA'), POCHTA_EXTS, iter_pochta_txt,
+                                         'POCHTA TXT files', use_tqdm, workers),
+        'ASBT': read_source_provenance('ASBT', os.path.join(base_dir, 'ASBT'), ASBT_EXTS,
+                                       with_column(iter_asbt_csv, asbt_column), 'ASBT CSV files', use_tqdm, workers),
+        'Telecom': read_source_provenance('Telecom', os.path.join(base_dir, 'Telecom'), TELECOM_EXTS,
+                                          with_column(iter_telecom_excel, telecom_column), 'Telecom Excel files',
+                                          use_tqdm, workers),
+    }
+
+
+def print_provenance(provenance: dict) -> None:
+    """Per-file rows / unique UIDs / duplicates of every source."""
+    for name, prov in provenance.items():
+        print()
+        print("-" * 50)
+        print(f"{name}: fayllar bo'yicha (provenance)")
+        print("-" * 50)
+        for s in prov.file_stats:
+            print(f"{s['file']}: qatorlar {_fmt(s['rows'])}, noyob {_fmt(s['unique'])}, takrorlar {_fmt(s['duplicates'])}")
+        print(f"Jami qatorlar: {_fmt(prov.total_rows)}, noyob UID: {_fmt(len(prov.uids))}")
+        print(f"Bir necha marta kelgan UID: {_fmt(prov.duplicated_uids)}")
+        if prov.masks is not None:
+            print(f"Bir nechta faylda uchragan UID: {_fmt(prov.in_several_files)}")
+
+
+def _write_origins_csv(file_path: str, prov, uids) -> None:
+    """Uid;File;Count for each UID of a difference, File = the source file(s) it came from."""
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f, delimiter=';')
+        writer.writerow(['Uid', 'File', 'Count'])
+        writer.writerows(prov.origins(uids))
+
+
+def export_provenance(export_base: str, provenance: dict, workers: int = 1) -> None:
+    """Next to the four --export TXT files, write <name>_sources.csv with the
+    originating file(s) of every difference, and provenance_files.csv with the
+    per-file duplicate counts.
+    """
+    po, tl, asbt = provenance['Pochta'], provenance['Telecom'], provenance['ASBT']
+    for left, right, l_name, r_name in ((po, tl, 'pochta', 'telecom'), (po, asbt, 'pochta', 'asbt')):
+        only_left, only_right = _differences(left.uids, right.uids, workers)
+        _write_origins_csv(os.path.join(export_base, f'{l_name}_minus_{r_name}_sources.csv'), left, only_left)
+        _write_origins_csv(os.path.join(export_base, f'{r_name}_minus_{l_name}_sources.csv'), right, only_right)
+    with open(os.path.join(export_base, 'provenance_files.csv'), 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f, delimiter=';')
+        writer.writerow(['Source', 'File', 'Rows', 'Unique', 'Duplicates'])
+        for name, prov in provenance.items():
+            for s in prov.file_stats:
+                writer.writerow([name, s['file'], s['rows'], s['unique'], s['duplicates']])
+
+
+# Month folder name -> display name used in the report headers
+MONTH_NAMES = {
+    'JANUARY': 'Yanvar', 'FEBRUARY': 'Fevral', 'MARCH': 'Mart', 'APRIL': 'Aprel',
+    'MAY': 'May', 'JUNE': 'Iyun', 'JULY': 'Iyul', 'AUGUST': 'Avgust',
+    'SEPTEMBER': 'Sentyabr', 'OCTOBER': 'Oktyabr', 'NOVEMBER': 'Noyabr', 'DECEMBER': 'Dekabr',
+}
+_MONTH_ORDER = {name: i for i, name in enumerate(MONTH_NAMES)}
+
+SUMMARY_FIELDS = [
+    'month', 'base_dir', 'pochta_total', 'telecom_total', 'asbt_total',
+    'pochta_telecom_in_both', 'pochta_only_vs_telecom', 'telecom_only_vs_pochta',
+    'pochta_asbt_in_both', 'pochta_only_vs_asbt', 'asbt_only_vs_pochta',
+    'read_seconds', 'compare_seconds', 'total_seconds', 'error',
+]
+
+
+def find_month_dirs(root_dir: str) -> List[str]:
+    """Subdirectories of `root_dir` holding at least one of POCHTA/ASBT/Telecom,
+    in calendar order for English month names, then by name.
+    """
+    found = []
+    for name in os.listdir(root_dir):
+        path = os.path.join(root_dir, name)
+        if os.path.isdir(path) and any(os.path.isdir(os.path.join(path, src)) for src in ('POCHTA', 'ASBT', 'Telecom')):
+            found.append(path)
+    return sorted(found, key=lambda p: (_MONTH_ORDER.get(os.path.basename(p).upper(), len(_MONTH_ORDER)), os.path.basename(p)))
+
+
+def _index_month(index_db: str, period: str, po, tl, asbt) -> None:
+    """Store the month's source sets in the persistent UID index (uid_index)
+    under period_key(period), the key every other indexing path uses too.
+    """
+    from uid_index import index_sources, period_key
+    period = period_key(period)
+    written = index_sources(index_db, period, {'Pochta': po, 'Telecom': tl, 'ASBT': asbt})
+    updated = [name for name, changed in written.items() if changed]
+    print(f"UID index ({index_db}, {period}): {', '.join(updated) if updated else 'no changes'}")
+
+
+def run_month(base_dir: str, month_display: str, export_base: str | None = None, engine: str = 'set',
+              cache_dir: str | None = None, cache_max_mb: int = 2048, incremental: bool = False,
+              index_db: str | None = None, asbt_column: ColumnSpec | None = None,
+              telecom_column: ColumnSpec | None = None) -> dict:
+    """Compare one month directory and return its summary row (the batch worker).
+    The statistics text is captured into summary['output'] instead of printed,
+    so months running in parallel do not interleave their output.
+    """
+    summary = {'month': month_display, 'base_dir': base_dir}
+    buf = io.StringIO()
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(buf):
+            cache = _make_cache(cache_dir, cache_max_mb, incremental, os.path.join(base_dir, '.compare_state'))
+            po, asbt, tl = read_month(base_dir, use_tqdm=False, engine=engine, cache=cache, incremental=incremental,
+                                      asbt_column=asbt_column, telecom_column=telecom_column)
+            read_done = time.perf_counter()
+            pt, pa = _pair_counts(po, tl), _pair_counts(po, asbt)
+            print_pair_counts(month_display, pt, pa)
+            if export_base:
+                export_differences(export_base, po, tl, asbt)
+            if index_db:
+                _index_month(index_db, os.path.basename(os.path.normpath(base_dir)), po, tl, asbt)
+        summary.update({
+            'pochta_total': pt['left_total'], 'telecom_total': pt['right_total'], 'asbt_total': pa['right_total'],
+            'pochta_telecom_in_both': pt['in_both'], 'pochta_only_vs_telecom': pt['only_left'], 'telecom_only_vs_pochta': pt['only_right'],
+            'pochta_asbt_in_both': pa['in_both'], 'pochta_only_vs_asbt': pa['only_left'], 'asbt_only_vs_pochta': pa['only_right'],
+            'read_seconds': round(read_done - start, 3),
+            'compare_seconds': round(time.perf_counter() - read_done, 3),
+        })
+    except Exception as e:
+        summary['error'] = str(e)
+    summary['total_seconds'] = round(time.perf_counter() - start, 3)
+    summary['output'] = buf.getvalue()
+    return summary
+
+
+def run_batch(root_dir: str, export_dir: str | None = None, export: bool = False, workers: int = 1,
+              engine: str = 'set', cache_dir: str | None = None, cache_max_mb: int = 2048,
+              incremental: bool = False, use_tqdm: bool = True, index_db: str | None = None,
+              asbt_column: ColumnSpec | None = None, telecom_column: ColumnSpec | None = None) -> List[dict]:
+    """Compare every month directory under `root_dir`, `workers` months at a time,
+    print each month's statistics in calendar order and write summary.csv and
+    summary.json (to `export_dir`, default `root_dir`).
+    Exports go to <export_dir>/<MONTH>/ or, without --export-dir, <month>/output.
+    """
+    month_dirs = find_month_dirs(root_dir)
+    if not month_dirs:
+        print(f"Error: no month directories with POCHTA/ASBT/Telecom found under {root_dir}")
+        sys.exit(1)
+    jobs = []
+    for path in month_dirs:
+        name = os.path.basename(path)
+        export_base = None
+        if export:
+            export_base = os.path.join(export_dir, name) if export_dir else os.path.join(path, 'output')
+        jobs.append((path, MONTH_NAMES.get(name.upper(), name), export_base, engine, cache_dir, cache_max_mb, incremental,
+                     index_db, asbt_column, telecom_column))
+
+    start = time.perf_counter()
+    results: dict = {}
+    bar = tqdm(total=len(jobs), desc='Months', unit='month') if use_tqdm and _TQDM_AVAILABLE else None  # type: ignore
+    try:
+        if workers > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+                futures = {pool.submit(run_month, *job): job[0] for job in jobs}
+                for fut in as_completed(futures):
+                    results[futures[fut]] = fut.result()
+                    if bar is not None:
+                        bar.update(1)
+        else:
+            for job in jobs:
+                results[job[0]] = run_month(*job)
+                if bar is not None:
+                    bar.update(1)
+    finally:
+        if bar is not None:
+            bar.close()
+
+    summaries = [results[path] for path in month_dirs]
+    for summary in summaries:
+        print(summary.pop('output'), end='')
+        if summary.get('error'):
+            print(f"Warning: {summary['base_dir']}: {summary['error']}")
+        print()
+
+    out_dir = export_dir or root_dir
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, 'summary.csv'), 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS, delimiter=';')
+        writer.writeheader()
+        writer.writerows(summaries)
+    with open(os.path.join(out_dir, 'summary.json'), 'w', encoding='utf-8') as f:
+        json.dump({'root_dir': root_dir, 'workers': workers, 'engine': engine,
+                   'total_seconds': round(time.perf_counter() - start, 3), 'months': summaries},
+                  f, ensure_ascii=False, indent=2)
+    print(f"Jami: {len(summaries)} oy, {time.perf_counter() - start:.1f} s. Summary: {os.path.join(out_dir, 'summary.csv')}")
+    return summaries
 
 
 def main():
@@ -235,36 +723,115 @@ def main():
     parser.add_argument('--no-progress', action='store_true', help='Disable tqdm progress bars')
     parser.add_argument('--export', action='store_true', help='Export UID differences to TXT files')
     parser.add_argument('--export-dir', type=str, default=None, help='Directory to save exported TXT files (defaults to <base-dir>/output)')
+    parser.add_argument('--workers', type=int, default=1, help='Parse files of a source in N parallel processes (default: 1, sequential); with --engine array, also compare in N threads; with --root-dir, months in parallel')
+    parser.add_argument('--engine', choices=['set', 'array'], default='set', help="UID set engine: 'set' (Python sets) or 'array' (sorted NumPy byte arrays, far less memory)")
+    parser.add_argument('--cache-dir', type=str, default=None, help='Cache parsed UID sets here, keyed by file content; unchanged files are not re-parsed')
+    parser.add_argument('--venn', action='store_true', help='Also print an N-way comparison with counts for every Venn region of Pochta/Telecom/ASBT')
+    parser.add_argument('--export-region', action='append', default=[], metavar='SOURCES',
+                        help="Export the UIDs present in exactly these sources, e.g. 'Pochta+ASBT' (repeatable)")
+    parser.add_argument('--cache-max-mb', type=int, default=2048, help='Size limit of the UID cache in MB; least recently used entries are evicted (default: 2048)')
+    parser.add_argument('--external', action='store_true',
+                        help='Out-of-core mode for months larger than RAM: sort each source on disk within --memory-mb and compare by merging')
+    parser.add_argument('--memory-mb', type=int, default=256, help='Memory budget for --external sorting in MB (default: 256)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Re-read only files added or changed since the last run; per-source state is kept in --state-dir')
+    parser.add_argument('--state-dir', type=str, default=None, help='State directory for --incremental (defaults to <base-dir>/.compare_state)')
+    parser.add_argument('--counts-only', action='store_true',
+                        help='Only print the statistics: no difference sets or exports, at most two sources in memory')
+    parser.add_argument('--root-dir', type=str, default=None,
+                        help='Batch mode: compare every month directory under this root (--workers months in parallel) and write summary.csv/json')
+    parser.add_argument('--index-db', type=str, default=None,
+                        help='Also store the Pochta/Telecom/ASBT sets in this persistent UID index (SQLite, see uid_index.py) under --period')
+    parser.add_argument('--period', type=str, default=None,
+                        help="Period label for --index-db, e.g. 2025-08 or 'Avgust 2025' (defaults to --month; with --root-dir, "
+                             "the month folder name). Month names are stored as one key, see uid_index.period_key")
+    parser.add_argument('--provenance', action='store_true',
+                        help='Count every file separately: print per-file duplicates and, with --export, write the originating file(s) of each difference')
+    parser.add_argument('--asbt-column', type=str, default=None,
+                        help="UID column of the ASBT CSV files, or comma-separated candidates tried in order (default: TV_SERIALNUMBER)")
+    parser.add_argument('--telecom-column', type=str, default=None,
+                        help="UID column of the Telecom Excel files, or comma-separated candidates tried in order (default: doc_num)")
+    parser.add_argument('--tmp-dir', type=str, default=None, help='Directory for --external spill files (defaults to the system temp dir)')
     args = parser.parse_args()
+    columns = dict(asbt_column=args.asbt_column, telecom_column=args.telecom_column)
 
     base_dir = args.base_dir
-    asbt_dir = os.path.join(base_dir, 'ASBT')
-    pochta_dir = os.path.join(base_dir, 'POCHTA')
-    telecom_dir = os.path.join(base_dir, 'Telecom')
+    use_tqdm = not args.no_progress
+
+    if args.root_dir:
+        if args.external or args.counts_only or args.venn or args.export_region or args.provenance:
+            print("Error: --root-dir supports --export, --engine, --cache-dir and --incremental only")
+            sys.exit(1)
+        run_batch(args.root_dir, export_dir=args.export_dir, export=args.export, workers=args.workers,
+                  engine=args.engine, cache_dir=args.cache_dir, cache_max_mb=args.cache_max_mb,
+                  incremental=args.incremental, use_tqdm=use_tqdm, index_db=args.index_db, **columns)
+        return
+
+    export_base = args.export_dir or os.path.join(base_dir, 'output')
+
+    if args.provenance and (args.external or args.counts_only or args.incremental):
+        print("Error: --provenance is not supported with --external, --counts-only or --incremental")
+        sys.exit(1)
+
+    if args.external:
+        if args.venn or args.export_region:
+            print("Error: --venn/--export-region are not supported with --external")
+            sys.exit(1)
+        compare_external(args.month, base_dir, export_base if args.export else None,
+                         memory_mb=args.memory_mb, tmp_dir=args.tmp_dir, use_tqdm=use_tqdm, **columns)
+        return
+
+    state_dir = args.state_dir or os.path.join(base_dir, '.compare_state')
+    cache = _make_cache(args.cache_dir, args.cache_max_mb, args.incremental, state_dir)
+
+    if args.counts_only:
+        if args.incremental:
+            print("Error: --incremental is not supported with --counts-only")
+            sys.exit(1)
+        if args.export or args.venn or args.export_region:
+            print("Error: --export/--venn/--export-region need the full comparison; drop --counts-only")
+            sys.exit(1)
+        compare_counts_only(args.month, base_dir, use_tqdm=use_tqdm, workers=args.workers, engine=args.engine,
+                            cache=cache, **columns)
+        return
 
     # Read sources
-    use_tqdm = not args.no_progress
-    pochta_uids = read_pochta_txts(pochta_dir, use_tqdm=use_tqdm)
-    asbt_uids = read_asbt_csv(asbt_dir, use_tqdm=use_tqdm)
-    telecom_uids = read_telecom_excels(telecom_dir, use_tqdm=use_tqdm)
+    provenance = None
+    if args.provenance:
+        # File by file, with occurrence counts; the merged sets are sorted arrays
+        provenance = read_month_provenance(base_dir, use_tqdm=use_tqdm, workers=args.workers, **columns)
+        pochta_uids, asbt_uids, telecom_uids = (provenance[n].uids for n in ('Pochta', 'ASBT', 'Telecom'))
+    else:
+        pochta_uids, asbt_uids, telecom_uids = read_month(base_dir, use_tqdm=use_tqdm, workers=args.workers, engine=args.engine,
+                                                          cache=cache, incremental=args.incremental, state_dir=state_dir,
+                                                          **columns)
 
     # Print stats
-    print_stats(args.month, pochta_uids, telecom_uids, asbt_uids)
+    print_stats(args.month, pochta_uids, telecom_uids, asbt_uids, engine=args.engine)
+    if provenance is not None:
+        print_provenance(provenance)
+
+    if args.index_db:
+        _index_month(args.index_db, args.period or args.month, pochta_uids, telecom_uids, asbt_uids)
+
+    # N-way comparison: every Venn region in one pass
+    if args.venn or args.export_region:
+        sources = [('Pochta', pochta_uids), ('Telecom', telecom_uids), ('ASBT', asbt_uids)]
+        names = [name for name, _ in sources]
+        regions = [parse_region(spec, names) for spec in args.export_region]
+        if args.venn:
+            union, masks, _ = print_venn(args.month, sources)
+        else:
+            union, masks, _ = venn_regions(sources)
+        for mask in regions:
+            members = [n.lower() for i, n in enumerate(names) if mask & (1 << i)]
+            _write_uids_txt(os.path.join(export_base, f"region_{'_'.join(members)}.txt"), region_uids(union, masks, mask))
 
     # Optionally export differences
     if args.export:
-        export_base = args.export_dir or os.path.join(base_dir, 'output')
-        # Pochta vs Telecom differences
-        only_po_vs_tl = pochta_uids - telecom_uids
-        only_tl_vs_po = telecom_uids - pochta_uids
-        _write_uids_txt(os.path.join(export_base, 'pochta_minus_telecom.txt'), only_po_vs_tl)
-        _write_uids_txt(os.path.join(export_base, 'telecom_minus_pochta.txt'), only_tl_vs_po)
-
-        # Pochta vs ASBT differences
-        only_po_vs_asbt = pochta_uids - asbt_uids
-        only_asbt_vs_po = asbt_uids - pochta_uids
-        _write_uids_txt(os.path.join(export_base, 'pochta_minus_asbt.txt'), only_po_vs_asbt)
-        _write_uids_txt(os.path.join(export_base, 'asbt_minus_pochta.txt'), only_asbt_vs_po)
+        export_differences(export_base, pochta_uids, telecom_uids, asbt_uids, workers=args.workers)
+        if provenance is not None:
+            export_provenance(export_base, provenance, workers=args.workers)
 
 
 if __name__ == '__main__':
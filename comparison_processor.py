@@ -1,13 +1,21 @@
 """
 Процессор для сравнения двух файлов
-ИСПОЛЬЗУЕТ функции из compare_month.py напрямую (без дублирования!)
+ИСПОЛЬЗУЕТ функции из compare_month.py и его читатели (uid_readers.py) напрямую (без дублирования!)
 """
 
 import os
 import tempfile
-import io
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
-from compare_month import read_pochta_txts, read_asbt_csv, read_telecom_excels, _write_uids_txt
+from compare_month import count_common, venn_regions, region_label, parse_region, region_uids
+from uid_readers import empty_uids, iter_files, load_file, load_file_counts, reader_tag, with_column, iter_pochta_txt, iter_asbt_csv, iter_telecom_excel
+from external_diff import SortedFile, iter_sorted_file, merge_diff, sort_to_file
+from uid_index import index_sources, source_key
+from uid_cache import UidCache
+from uid_provenance import SourceProvenance
+from compressed_input import data_ext, source_name
+from uid_arrays import UidArray, memory_bytes, partitioned_diff, sorted_uids
 
 class ComparisonProcessor:
     """
@@ -15,105 +23,362 @@ class ComparisonProcessor:
     Вся логика чтения и сравнения - из вашего скрипта!
     """
     
-    def compare_files(self, file1, file2, file1_name, file2_name, column_name='doc_num'):
+    # Тип данных (_source_kind) -> читатель из uid_readers.py
+    _READERS = {
+        'txt': iter_pochta_txt,
+        'csv': iter_asbt_csv,
+        'excel': iter_telecom_excel,
+    }
+    
+    def __init__(self, workers=1, engine='set', cache_dir=None, cache_max_bytes=2 * 1024 ** 3, external_memory_bytes=None,
+                 index_db=None):
+        """
+        Args:
+            workers: число процессов для чтения файлов (1 - последовательно,
+                     >1 - каждый файл разбирается в отдельном процессе; с engine='array'
+                     и само сравнение идет по диапазонам UID в нескольких потоках)
+            engine: 'set' - множества Python, 'array' - отсортированные массивы
+                    NumPy (uid_arrays.UidArray), в разы меньше памяти
+            cache_dir: папка кэша разобранных UID (по хэшу содержимого файла);
+                       None - без кэша
+            cache_max_bytes: предельный размер кэша, старые записи удаляются (LRU)
+            external_memory_bytes: если задано - сравнение на диске (external_diff):
+                    каждый файл сортируется порциями в пределах этого объема памяти,
+                    различия пишутся в файлы слиянием; для файлов больше ОЗУ
+            index_db: путь к постоянному индексу UID (uid_index.py); если задан,
+                      compare_files с index_period сохраняет в него оба множества
+        """
+        self.workers = workers
+        self.engine = engine
+        self.cache = UidCache(cache_dir, max_bytes=cache_max_bytes) if cache_dir else None
+        self.external_memory_bytes = external_memory_bytes
+        self.index_db = index_db
+    
+    def compare_files(self, file1, file2, file1_name, file2_name, column_name=None, counts_only=False,
+                      index_period=None, provenance=False, list_dir=None):
         """
         Сравнивает два файла используя функции из compare_month.py
         
+        Файлы читаются на месте - путь или поток загрузки (FileStorage из Flask,
+        его SpooledTemporaryFile), без копирования во временную папку.
+        
         Args:
-            file1: первый файл (file object из Flask)
-            file2: второй файл (file object из Flask)
+            file1: первый файл (путь или file object из Flask)
+            file2: второй файл (путь или file object из Flask)
             file1_name: название источника (Pochta, Telecom, ASBT)
             file2_name: название источника
-            column_name: не используется (определяется автоматически по типу файла)
+            column_name: столбец UID для CSV и Excel - имя или кандидаты через запятую
+                         (берется первый найденный в заголовке); None - столбец по
+                         умолчанию для типа файла (TV_SERIALNUMBER / doc_num).
+                         Для TXT не используется
+            counts_only: только количество - без множеств различий, сортировки
+                         и списков для экспорта (быстрее и меньше памяти)
+            index_period: период (например, месяц) для записи множеств в индекс UID
+                          (uid_index.period_key); нужен index_db. Названия файлов должны
+                          сопоставляться с Pochta/Telecom/ASBT (uid_index.source_key),
+                          иначе множества не индексируются и в результате 'index_skipped'
+            provenance: считать каждый файл отдельно (uid_provenance): в результат
+                        добавляются строки, уникальные UID и повторы по каждому файлу
+            list_dir: папка для файлов различий в режиме на диске (ResultStore.staging_dir):
+                      списки не читаются в память, в результате - их пути ('list_paths')
             
         Returns:
-            dict с результатами сравнения (точно как в compare_month.py)
+            dict с результатами сравнения (точно как в compare_month.py); списки
+            различий - отсортированные итерируемые UID (UidArray при engine='array')
         """
         try:
-            # Создаем временные директории для каждого файла
-            with tempfile.TemporaryDirectory() as tmpdir:
-                dir1 = os.path.join(tmpdir, 'source1')
-                dir2 = os.path.join(tmpdir, 'source2')
-                os.makedirs(dir1, exist_ok=True)
-                os.makedirs(dir2, exist_ok=True)
-                
-                # Сохраняем файлы с правильными расширениями
-                file1_ext = os.path.splitext(file1.filename)[1].lower() if hasattr(file1, 'filename') else '.txt'
-                file2_ext = os.path.splitext(file2.filename)[1].lower() if hasattr(file2, 'filename') else '.txt'
-                
-                file1_path = os.path.join(dir1, f'file1{file1_ext}')
-                file2_path = os.path.join(dir2, f'file2{file2_ext}')
-                
-                if isinstance(file1, str):
-                    import shutil
-                    shutil.copy(file1, file1_path)
-                else:
-                    file1.save(file1_path)
-                
-                if isinstance(file2, str):
-                    import shutil
-                    shutil.copy(file2, file2_path)
-                else:
-                    file2.save(file2_path)
-                
-                # ИСПОЛЬЗУЕМ ФУНКЦИИ ИЗ compare_month.py
-                set1 = self._read_as_set(dir1)
-                set2 = self._read_as_set(dir2)
-                
-                # Сравниваем множества (как в compare_month.py: print_stats)
-                in_both = set1 & set2
-                only_in_file1 = set1 - set2
-                only_in_file2 = set2 - set1
-                
-                # Формируем результат
+            index_names = self._index_names(file1_name, file2_name) if self.index_db and index_period else None
+            index_skipped = bool(self.index_db and index_period) and index_names is None
+            if self.external_memory_bytes and not counts_only:
+                # Временная папка нужна только для файлов внешней сортировки
+                with tempfile.TemporaryDirectory() as tmpdir:
+                    result = self._compare_external(file1, file2, tmpdir, column_name, list_dir,
+                                                    index_names=index_names, index_period=index_period)
+                result.update({
+                    'file1_name': file1_name,
+                    'file2_name': file2_name,
+                    'comparison_date': datetime.now().isoformat(),
+                    'index_skipped': index_skipped,
+                })
+                if provenance:
+                    # Повторы по файлам требуют счетчиков в памяти - на диске не считаются
+                    result['provenance_skipped'] = True
+                result['text_output'] = self._format_comparison_output(result)
+                return result
+            
+            # ИСПОЛЬЗУЕМ ФУНКЦИИ ИЗ compare_month.py
+            prov1 = prov2 = None
+            if provenance:
+                # Файлы читаются по одному, с количеством повторов каждого UID
+                prov1, prov2 = self._map_sources(self._read_provenance, [file1, file2], [file1_name, file2_name],
+                                                 [column_name] * 2)
+                set1, set2 = prov1.uids, prov2.uids
+            else:
+                # При workers > 1 оба файла разбираются параллельно
+                set1, set2 = self._map_sources(self._read_as_set, [file1, file2], [column_name] * 2)
+            
+            if index_names:
+                index_sources(self.index_db, index_period, dict(zip(index_names, (set1, set2))))
+            
+            if counts_only:
+                # Меньшее множество проверяется по большему, различия не строятся
+                both = count_common(set1, set2)
                 result = {
                     'file1_name': file1_name,
                     'file2_name': file2_name,
                     'file1_total': len(set1),
                     'file2_total': len(set2),
-                    'in_both': len(in_both),
-                    'only_in_file1': len(only_in_file1),
-                    'only_in_file2': len(only_in_file2),
+                    'in_both': both,
+                    'only_in_file1': len(set1) - both,
+                    'only_in_file2': len(set2) - both,
                     'comparison_date': datetime.now().isoformat(),
-                    # Сохраняем сами списки для экспорта
-                    'only_in_file1_list': sorted(only_in_file1),
-                    'only_in_file2_list': sorted(only_in_file2)
+                    'counts_only': True,
+                    'index_skipped': index_skipped,
                 }
-                
-                # Формируем текстовый вывод
+                if provenance:
+                    result['file1_provenance'] = self._provenance_summary(prov1)
+                    result['file2_provenance'] = self._provenance_summary(prov2)
                 result['text_output'] = self._format_comparison_output(result)
-                
                 return result
             
+            # Сравниваем множества (как в compare_month.py: print_stats)
+            if self.engine == 'array' and self.workers > 1:
+                # Отсортированные массивы режутся на одинаковые диапазоны UID,
+                # диапазоны сравниваются параллельно и склеиваются по порядку
+                in_both, only_in_file1, only_in_file2 = partitioned_diff(set1, set2, self.workers)
+            else:
+                in_both = count_common(set1, set2)
+                only_in_file1 = set1 - set2
+                only_in_file2 = set2 - set1
+            
+            # Формируем результат
+            result = {
+                'file1_name': file1_name,
+                'file2_name': file2_name,
+                'file1_total': len(set1),
+                'file2_total': len(set2),
+                'in_both': in_both,
+                'only_in_file1': len(only_in_file1),
+                'only_in_file2': len(only_in_file2),
+                'comparison_date': datetime.now().isoformat(),
+                'index_skipped': index_skipped,
+                # Списки для экспорта: UidArray уже отсортирован и декодируется при
+                # записи (ResultStore), без копии в виде list; множество сортируется
+                'only_in_file1_list': only_in_file1 if isinstance(only_in_file1, UidArray) else sorted_uids(only_in_file1),
+                'only_in_file2_list': only_in_file2 if isinstance(only_in_file2, UidArray) else sorted_uids(only_in_file2)
+            }
+            
+            if provenance:
+                result['file1_provenance'] = self._provenance_summary(prov1)
+                result['file2_provenance'] = self._provenance_summary(prov2)
+            
+            if self.engine == 'array':
+                # Память, занятая каждым источником
+                result['engine'] = self.engine
+                result['file1_memory_bytes'] = memory_bytes(set1)
+                result['file2_memory_bytes'] = memory_bytes(set2)
+            
+            # Формируем текстовый вывод
+            result['text_output'] = self._format_comparison_output(result)
+            
+            return result
+        
         except Exception as e:
             raise Exception(f'Ошибка сравнения файлов: {str(e)}')
     
-    def _read_as_set(self, dir_path):
+    def compare_many(self, files, names, region=None, language='uz'):
         """
-        Читает файлы из директории используя функции compare_month.py
+        N-стороннее сравнение: для каждого UID - битовая маска источников,
+        в которых он встречается (один проход по всем источникам, compare_month.venn_regions)
         
         Args:
-            dir_path: путь к директории с файлами
+            files: список файлов (пути или file objects из Flask)
+            names: названия источников в том же порядке
+            region: необязательная область, например 'Pochta+ASBT' - UID, которые
+                    есть ровно в этих источниках, возвращаются в 'region_list'
+            language: язык текстового вывода
             
         Returns:
-            Set[str]: множество уникальных UID (ИЗ compare_month.py!)
+            dict: итоги по источникам и количество UID в каждой области диаграммы Венна
         """
-        files = os.listdir(dir_path)
-        
-        # TXT файлы → используем read_pochta_txts
-        if any(f.lower().endswith('.txt') for f in files):
-            return read_pochta_txts(dir_path, use_tqdm=False)
-        
-        # CSV файлы → используем read_asbt_csv
-        elif any(f.lower().endswith('.csv') for f in files):
-            return read_asbt_csv(dir_path, use_tqdm=False)
+        try:
+            # Файлы читаются на месте, как в compare_files
+            sets = self._map_sources(self._read_as_set, list(files))
+            
+            sources = list(zip(names, sets))
+            union, masks, counts = venn_regions(sources)
+            
+            result = {
+                'sources': [{'name': name, 'total': len(uids)} for name, uids in sources],
+                'total_unique': len(union),
+                'regions': [
+                    {
+                        'mask': mask,
+                        'sources': [n for i, n in enumerate(names) if mask & (1 << i)],
+                        'label': region_label(mask, names),
+                        'count': counts.get(mask, 0)
+                    }
+                    for mask in sorted(range(1, 1 << len(names)), key=lambda m: (bin(m).count('1'), m))
+                ],
+                'comparison_date': datetime.now().isoformat()
+            }
+            if region:
+                mask = parse_region(region, names)
+                result['region'] = region_label(mask, names)
+                result['region_list'] = region_uids(union, masks, mask).tolist()
+            
+            result['text_output'] = self._format_venn_output(result, language)
+            return result
         
-        # Excel файлы → используем read_telecom_excels
-        elif any(f.lower().endswith(('.xlsx', '.xls')) for f in files):
-            return read_telecom_excels(dir_path, use_tqdm=False)
+        except Exception as e:
+            raise Exception(f'Ошибка сравнения файлов: {str(e)}')
+    
+    def _map_sources(self, fn, sources, *args):
+        """
+        fn(source, *args) для каждого источника, результаты в том же порядке.
+        При workers > 1 пути разбираются в отдельных процессах; поток загрузки
+        нельзя передать в другой процесс, такие источники читаются в потоках
+        (pandas/pyarrow и numpy при этом отпускают GIL)
+        """
+        if self.workers <= 1 or len(sources) < 2:
+            return [fn(*call) for call in zip(sources, *args)]
+        executor = ProcessPoolExecutor if all(isinstance(s, str) for s in sources) else ThreadPoolExecutor
+        with executor(max_workers=min(self.workers, len(sources))) as pool:
+            return list(pool.map(fn, sources, *args))
+    
+    @staticmethod
+    def _index_names(*names):
+        """Канонические имена источников для индекса UID (Pochta/Telecom/ASBT) или None,
+        если название не сопоставляется или оба файла - один источник: иначе месяц
+        попал бы в индекс под произвольными названиями, введенными в форме
+        """
+        keys = [source_key(name) for name in names]
+        if None in keys or len(set(keys)) < len(keys):
+            return None
+        return keys
+    
+    def _compare_external(self, file1, file2, tmpdir, column_name=None, list_dir=None, index_names=None,
+                          index_period=None):
+        """
+        Сравнение на диске: каждый источник сортируется во внешней памяти в
+        отдельный файл, затем один проход слиянием считает пересечение и пишет
+        различия в файлы. С list_dir файлы различий остаются там и в память не
+        читаются; без него списки читаются обратно для ответа.
+        index_names (имена двух источников) - отсортированные файлы источников
+        записываются в индекс UID под index_period потоком, без чтения в память (index_db)
         
+        Returns:
+            dict: те же ключи, что и в compare_files (без имен и даты)
+        """
+        sorted_paths = []
+        for i, source in enumerate((file1, file2), 1):
+            path = os.path.join(tmpdir, f'sorted{i}.txt')
+            sort_to_file(self._iter_uids(source, column_name), path, self.external_memory_bytes, tmpdir)
+            sorted_paths.append(path)
+        if self.index_db and index_names:
+            index_sources(self.index_db, index_period,
+                          {name: SortedFile(path) for name, path in zip(index_names, sorted_paths)}, presorted=True)
+        only1_path = os.path.join(list_dir or tmpdir, 'only_in_file1.txt')
+        only2_path = os.path.join(list_dir or tmpdir, 'only_in_file2.txt')
+        counts = merge_diff(iter_sorted_file(sorted_paths[0]), iter_sorted_file(sorted_paths[1]),
+                            left_path=only1_path, right_path=only2_path, header=None)
+        result = {
+            'file1_total': counts['left_total'],
+            'file2_total': counts['right_total'],
+            'in_both': counts['in_both'],
+            'only_in_file1': counts['only_left'],
+            'only_in_file2': counts['only_right'],
+            'engine': 'external',
+        }
+        if list_dir:
+            # Файлы уже в формате ResultStore: put() переносит их, не читая
+            result['list_paths'] = {'only_in_file1_list': only1_path, 'only_in_file2_list': only2_path}
         else:
-            return set()
+            result['only_in_file1_list'] = list(iter_sorted_file(only1_path))
+            result['only_in_file2_list'] = list(iter_sorted_file(only2_path))
+        return result
+    
+    def _reader(self, kind, column_name=None):
+        """
+        Читатель uid_readers.py для типа данных; для CSV и Excel он
+        привязывается к column_name (в TXT один UID в строке, столбцов нет)
+        """
+        reader = self._READERS[kind]
+        if kind == 'txt':
+            return reader
+        return with_column(reader, column_name)
+    
+    def _iter_uids(self, source, column_name=None):
+        """
+        Потоково отдает UID файла (с повторами), тем же читателем
+        uid_readers.py, который выбрал бы _read_as_set
+        """
+        kind = self._source_kind(source)
+        if kind is None:
+            return iter(())
+        return iter_files([source], self._reader(kind, column_name), '', use_tqdm=False)
+    
+    def _read_provenance(self, source, name, column_name=None):
+        """
+        Читает файл с количеством повторов каждого UID (uid_provenance):
+        UID источника + откуда и сколько раз пришел каждый
+        """
+        kind = self._source_kind(source)
+        if kind is None:
+            # Неизвестный тип: пустой источник
+            return SourceProvenance.from_files(name, [], [])
+        part = load_file_counts(self._reader(kind, column_name), source)
+        return SourceProvenance.from_files(name, [source_name(source)], [part])
+    
+    @staticmethod
+    def _provenance_summary(prov):
+        """
+        Итоги provenance для ответа: строки, уникальные UID и повторы (всего и по файлам).
+        Имя файла - имя загруженного файла (FileStorage.filename)
+        """
+        return {
+            'rows': prov.total_rows,
+            'unique': len(prov.uids),
+            'duplicates': prov.total_rows - len(prov.uids),
+            'duplicated_uids': prov.duplicated_uids,
+            'files': prov.file_stats,
+        }
+    
+    @staticmethod
+    def _source_kind(source):
+        """
+        Тип данных файла по расширению: 'txt', 'csv', 'excel' или None.
+        Для .gz берется расширение под ним, для .zip - расширение первого файла в архиве;
+        поток без имени читается как TXT
+        """
+        if not source_name(source):
+            return 'txt'
+        ext = data_ext(source)
+        if ext == '.txt':
+            return 'txt'
+        if ext == '.csv':
+            return 'csv'
+        if ext in ('.xlsx', '.xls'):
+            return 'excel'
+        return None
+    
+    def _read_as_set(self, source, column_name=None):
+        """
+        Читает файл используя функции compare_month.py
+        
+        Args:
+            source: путь к файлу или поток загрузки (в т.ч. .gz и .zip)
+            column_name: столбец UID (или кандидаты) для CSV и Excel; None - по умолчанию
+            
+        Returns:
+            Set[str] или UidArray (engine='array'): уникальные UID (ИЗ compare_month.py!)
+        """
+        kind = self._source_kind(source)
+        if kind is None:
+            return empty_uids(self.engine)
+        # TXT → iter_pochta_txt, CSV → iter_asbt_csv, Excel → iter_telecom_excel
+        reader = self._reader(kind, column_name)
+        return load_file(reader, source, self.engine, self.cache, reader_tag(reader))
     
     def _format_comparison_output(self, result, language='uz'):
         """
@@ -142,6 +407,19 @@ class ComparisonProcessor:
             lines.append(f"{result['file2_name']} bergan faylda mavjud, Pochta bergan faylda yo'q soni: {format_number(result['only_in_file2'])}")
             lines.append("")
             lines.append("-" * 44)
+            for key in ('file1', 'file2'):
+                prov = result.get(f'{key}_provenance')
+                if prov:
+                    lines.append("")
+                    lines.append(f"{result[f'{key}_name']}: qatorlar {format_number(prov['rows'])}, "
+                                 f"takrorlar {format_number(prov['duplicates'])} "
+                                 f"({format_number(prov['duplicated_uids'])} UID bir necha marta kelgan)")
+            if result.get('provenance_skipped'):
+                lines.append("")
+                lines.append("Fayllar bo'yicha takrorlar hisoblanmadi: solishtirish diskda bajarildi")
+            if result.get('index_skipped'):
+                lines.append("")
+                lines.append("UID indeksiga yozilmadi: manba nomlari Pochta, Telecom yoki ASBT bo'lishi kerak")
             return "\n".join(lines)
         else:  # ru
             lines = []
@@ -159,8 +437,54 @@ class ComparisonProcessor:
             lines.append(f"Есть в {result['file2_name']}, нет в {result['file1_name']}: {format_number(result['only_in_file2'])}")
             lines.append("")
             lines.append("-" * 44)
+            for key in ('file1', 'file2'):
+                prov = result.get(f'{key}_provenance')
+                if prov:
+                    lines.append("")
+                    lines.append(f"{result[f'{key}_name']}: строк {format_number(prov['rows'])}, "
+                                 f"повторов {format_number(prov['duplicates'])} "
+                                 f"({format_number(prov['duplicated_uids'])} UID встречаются несколько раз)")
+            if result.get('provenance_skipped'):
+                lines.append("")
+                lines.append("Повторы по файлам не посчитаны: сравнение выполнено на диске")
+            if result.get('index_skipped'):
+                lines.append("")
+                lines.append("В индекс UID не записано: названия источников должны быть Pochta, Telecom или ASBT")
             return "\n".join(lines)
     
+    def _format_venn_output(self, result, language='uz'):
+        """
+        Форматирует N-стороннее сравнение (формат как в compare_month.py::print_venn)
+        
+        Returns:
+            str: отформатированный текст
+        """
+        def format_number(num):
+            return f"{num:,}".replace(',', ' ')
+        
+        lines = []
+        lines.append("-" * 50)
+        for source in result['sources']:
+            if language == 'uz':
+                lines.append(f"{source['name']} faylda jami: {format_number(source['total'])}")
+            else:
+                lines.append(f"В файле от {source['name']} всего: {format_number(source['total'])}")
+        if language == 'uz':
+            lines.append(f"Barcha fayllarda jami noyob: {format_number(result['total_unique'])}")
+        else:
+            lines.append(f"Всего уникальных во всех файлах: {format_number(result['total_unique'])}")
+        lines.append("-" * 50)
+        for region in result['regions']:
+            if language == 'uz':
+                label = region['label']
+            elif len(region['sources']) == 1:
+                label = f"Только {region['sources'][0]}"
+            else:
+                label = ' + '.join(region['sources'])
+            lines.append(f"{label}: {format_number(region['count'])}")
+        lines.append("-" * 50)
+        return "\n".join(lines)
+    
     def export_comparison(self, comparison_data, month_name='', language='uz'):
         """
         Экспортирует результат сравнения в текстовый файл
@@ -194,31 +518,76 @@ class ComparisonProcessor:
         Returns:
             tuple: (file1_content, file1_name, file2_content, file2_name)
         """
-        # Создаем временную директорию для экспорта
-        with tempfile.TemporaryDirectory() as tmpdir:
-            # Файл 1: записи только в первом файле (БЕЗ заголовка!)
-            file1_path = os.path.join(tmpdir, 'only_in_file1.txt')
-            uids1 = comparison_data.get('only_in_file1_list', [])
-            with open(file1_path, 'w', encoding='utf-8', newline='') as f:
-                for uid in sorted(uids1):
-                    f.write(f"{uid}\n")
-            
-            with open(file1_path, 'rb') as f:
-                file1_content = f.read()
-            
-            # Файл 2: записи только во втором файле (БЕЗ заголовка!)
-            file2_path = os.path.join(tmpdir, 'only_in_file2.txt')
-            uids2 = comparison_data.get('only_in_file2_list', [])
-            with open(file2_path, 'w', encoding='utf-8', newline='') as f:
-                for uid in sorted(uids2):
-                    f.write(f"{uid}\n")
-            
-            with open(file2_path, 'rb') as f:
-                file2_content = f.read()
-            
-            # Генерируем имена файлов
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            file1_name = f"{comparison_data['file1_name']}_minus_{comparison_data['file2_name']}_{timestamp}.txt"
-            file2_name = f"{comparison_data['file2_name']}_minus_{comparison_data['file1_name']}_{timestamp}.txt"
-            
-            return file1_content, file1_name, file2_content, file2_name
+        file1_chunks, file1_name = self.stream_differences(comparison_data, 'file1')
+        file2_chunks, file2_name = self.stream_differences(comparison_data, 'file2')
+        return b''.join(file1_chunks), file1_name, b''.join(file2_chunks), file2_name
+    
+    def stream_differences(self, comparison_data, file_type='file1', compress=False):
+        """
+        Потоковый экспорт одной стороны различий (без заголовка "Uid"):
+        отсортированные UID отдаются блоками по ~1 MB, без временного файла
+        и без полной копии в памяти; вторая сторона не строится
+        
+        Args:
+            comparison_data: данные сравнения (only_in_file1_list / only_in_file2_list)
+            file_type: 'file1' или 'file2'
+            compress: True - поток в формате gzip (.txt.gz)
+            
+        Returns:
+            tuple: (итератор bytes, имя файла)
+        """
+        if file_type == 'file1':
+            uids = comparison_data.get('only_in_file1_list', [])
+            first, second = comparison_data['file1_name'], comparison_data['file2_name']
+        else:
+            uids = comparison_data.get('only_in_file2_list', [])
+            first, second = comparison_data['file2_name'], comparison_data['file1_name']
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        filename = f"{first}_minus_{second}_{timestamp}.txt"
+        chunks = iter_txt_chunks(sorted_uids(uids))
+        if compress:
+            return gzip_chunks(chunks), filename + '.gz'
+        return chunks, filename
+
+
+def iter_txt_chunks(uids, chunk_size=1024 * 1024):
+    """
+    UID по одному на строку (UTF-8), блоками примерно по chunk_size байт
+    """
+    batch = []
+    size = 0
+    for uid in uids:
+        batch.append(uid)
+        size += len(uid) + 1
+        if size >= chunk_size:
+            batch.append('')
+            yield '\n'.join(batch).encode('utf-8')
+            batch = []
+            size = 0
+    if batch:
+        batch.append('')
+        yield '\n'.join(batch).encode('utf-8')
+
+
+def iter_file_chunks(path, chunk_size=1024 * 1024):
+    """
+    Содержимое файла блоками (для потоковой отдачи уже записанных списков)
+    """
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(chunk_size)
+            if not block:
+                break
+            yield block
+
+
+def gzip_chunks(chunks, level=6):
+    """
+    Сжимает поток блоков в формат gzip на лету
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31: заголовок gzip
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,152 @@
+"""
+Streaming access to compressed and archived source files.
+
+Partners send Pochta TXT / ASBT CSV / Telecom Excel files as `.gz` or `.zip`
+bundles. Instead of unpacking them to disk, the readers in uid_readers ask
+open_members() for the data streams inside such a file:
+
+  - `name.txt.gz`      -> one stream, decompressed on the fly by gzip
+  - `bundle.zip`       -> one stream per member with a wanted extension
+                          (directories and __MACOSX/ entries are skipped)
+
+Each stream comes with an opener, so a reader that needs two passes (sniff the
+head, then parse) simply opens the member again.
+
+Instead of a path, `fp` may also be an uploaded file: a seekable binary stream
+with a name (Werkzeug's FileStorage, a spooled temp file, an open file). It is
+read in place through open_stream(), so an upload is never copied to disk.
+"""
+from __future__ import annotations
+import gzip
+import io
+import os
+import zipfile
+from typing import BinaryIO, Callable, Iterator, Optional, Tuple, Union
+
+GZIP_EXT = '.gz'
+ZIP_EXT = '.zip'
+
+# A file path, or an uploaded file (seekable binary stream)
+Source = Union[str, BinaryIO]
+
+
+class _StreamView(io.BufferedIOBase):
+    """An upload stream rewound to its start. Closing the view leaves the upload
+    open, so each opener (sniff, then parse) reads the same stream again.
+    """
+
+    def __init__(self, f):
+        super().__init__()
+        self._f = f
+        f.seek(0)
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        return self._f.read(-1 if size is None else size)
+
+    read1 = read
+
+    def readinto(self, b) -> int:
+        data = self._f.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+    def seek(self, pos: int, whence: int = 0) -> int:
+        return self._f.seek(pos, whence)
+
+    def tell(self) -> int:
+        return self._f.tell()
+
+
+def open_stream(f) -> BinaryIO:
+    """A rewound view of the upload stream `f` that does not close it."""
+    return _StreamView(f)
+
+
+def source_name(fp: Source) -> str:
+    """Path of a file, or the original name of an upload (FileStorage.filename, file.name)."""
+    if isinstance(fp, str):
+        return fp
+    name = getattr(fp, 'filename', None) or getattr(fp, 'name', None)
+    return name if isinstance(name, str) else ''
+
+
+def archive_exts(exts: Tuple[str, ...]) -> Tuple[str, ...]:
+    """`exts` plus their .gz variants and .zip, for listing a source directory."""
+    return exts + tuple(e + GZIP_EXT for e in exts) + (ZIP_EXT,)
+
+
+def is_compressed(fp: Source) -> bool:
+    return source_name(fp).lower().endswith((GZIP_EXT, ZIP_EXT))
+
+
+def full_ext(name: str) -> str:
+    """Extension including a compression suffix: 'a.TXT.gz' -> '.txt.gz', 'b.zip' -> '.zip'."""
+    root, ext = os.path.splitext(name.lower())
+    if ext == GZIP_EXT:
+        return os.path.splitext(root)[1] + ext
+    return ext
+
+
+def _zip_data_names(zf: zipfile.ZipFile, exts: Optional[Tuple[str, ...]]):
+    for info in zf.infolist():
+        name = info.filename
+        if info.is_dir() or name.startswith('__MACOSX/') or os.path.basename(name).startswith('.'):
+            continue
+        if exts is None or name.lower().endswith(exts):
+            yield name
+
+
+def _zip_file(fp: Source) -> zipfile.ZipFile:
+    return zipfile.ZipFile(fp if isinstance(fp, str) else open_stream(fp))
+
+
+def _zip_opener(fp: Source, name: str) -> Callable[[], BinaryIO]:
+    def open_member() -> BinaryIO:
+        # The member stream keeps the archive file open after zf.close() until it is closed itself
+        with _zip_file(fp) as zf:
+            return zf.open(name)
+    return open_member
+
+
+def _gzip_opener(fp: Source) -> Callable[[], BinaryIO]:
+    if isinstance(fp, str):
+        return lambda: gzip.open(fp, 'rb')
+    return lambda: gzip.GzipFile(fileobj=open_stream(fp), mode='rb')
+
+
+def open_members(fp: Source, exts: Tuple[str, ...]) -> Iterator[Tuple[str, Callable[[], BinaryIO]]]:
+    """(member name, opener) for every data stream of a .gz or .zip file (or
+    upload) whose name ends with one of `exts`. Openers return binary,
+    decompressing streams.
+    """
+    lower = source_name(fp).lower()
+    if lower.endswith(GZIP_EXT):
+        name = os.path.basename(source_name(fp))[:-len(GZIP_EXT)]
+        if name.lower().endswith(exts):
+            yield name, _gzip_opener(fp)
+    elif lower.endswith(ZIP_EXT):
+        with _zip_file(fp) as zf:
+            names = list(_zip_data_names(zf, exts))
+        for name in names:
+            yield name, _zip_opener(fp, name)
+
+
+def data_ext(fp: Source) -> str:
+    """Extension of the data inside `fp`: its own, the one under .gz, or that of
+    the first data member of a .zip ('' if the archive holds nothing usable).
+    """
+    ext = full_ext(source_name(fp))
+    if ext.endswith(GZIP_EXT):
+        return ext[:-len(GZIP_EXT)]
+    if ext == ZIP_EXT:
+        with _zip_file(fp) as zf:
+            for name in _zip_data_names(zf, None):
+                return os.path.splitext(name)[1].lower()
+        return ''
+    return ext
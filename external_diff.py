@@ -0,0 +1,195 @@
+"""
+Disk-backed (out-of-core) comparison of UID sources that do not fit in RAM.
+
+Each source is fed through an ExternalSorter: UIDs are buffered up to a memory
+budget, each full buffer is sorted, de-duplicated and spilled to a run file,
+and the runs are k-way merged (heapq.merge) into one sorted, unique stream.
+Two such streams are then compared with a single merge-join pass that writes
+both / only-left / only-right UIDs straight to their output files.
+
+Ordering is Python str order, the same as sorted(set), so counts and exported
+files match the in-memory comparison exactly.
+"""
+from __future__ import annotations
+import heapq
+import os
+import shutil
+import tempfile
+from typing import Dict, Iterable, Iterator, List, Optional
+
+# Rough per-UID cost of a buffered str in a list: object header + pointer
+_STR_OVERHEAD = 57
+# Maximum number of run files merged at once
+_MAX_FAN_IN = 64
+_IO_BUFFER = 1024 * 1024
+
+
+def _read_run(path: str) -> Iterator[str]:
+    with open(path, 'r', encoding='utf-8', newline='\n', buffering=_IO_BUFFER) as f:
+        for line in f:
+            yield line[:-1]
+
+
+def _dedupe(sorted_uids: Iterable[str]) -> Iterator[str]:
+    prev = None
+    for uid in sorted_uids:
+        if uid != prev:
+            yield uid
+            prev = uid
+
+
+class ExternalSorter:
+    """Sort and de-duplicate an unbounded stream of UIDs within a memory budget."""
+
+    def __init__(self, memory_bytes: int = 256 * 1024 * 1024, tmp_dir: Optional[str] = None):
+        self.memory_bytes = memory_bytes
+        self.tmp_dir = tempfile.mkdtemp(prefix='uid_runs_', dir=tmp_dir)
+        self._buffer: List[str] = []
+        self._buffered = 0
+        self._runs: List[str] = []
+        # Run files are numbered by a counter: merged runs must never reuse a pending run's name
+        self._next_run = 0
+
+    def add(self, uids: Iterable[str]) -> None:
+        buf = self._buffer
+        for uid in uids:
+            buf.append(uid)
+            self._buffered += len(uid) + _STR_OVERHEAD
+            if self._buffered >= self.memory_bytes:
+                self._spill()
+                buf = self._buffer
+
+    def _write_run(self, uids: Iterable[str]) -> str:
+        path = os.path.join(self.tmp_dir, f'run_{self._next_run:05d}.txt')
+        self._next_run += 1
+        with open(path, 'w', encoding='utf-8', newline='\n', buffering=_IO_BUFFER) as f:
+            for uid in uids:
+                f.write(uid + '\n')
+        return path
+
+    def _spill(self) -> None:
+        if self._buffer:
+            self._runs.append(self._write_run(_dedupe(sorted(self._buffer))))
+        self._buffer = []
+        self._buffered = 0
+
+    def sorted_uids(self) -> Iterator[str]:
+        """Sorted unique stream of everything added so far."""
+        if not self._runs:
+            # Everything fit in the budget: no disk round-trip
+            yield from _dedupe(sorted(self._buffer))
+            return
+        self._spill()
+        runs = self._runs
+        # Reduce the number of runs so no more than _MAX_FAN_IN files are open at once
+        while len(runs) > _MAX_FAN_IN:
+            merged = []
+            for i in range(0, len(runs), _MAX_FAN_IN):
+                group = runs[i:i + _MAX_FAN_IN]
+                merged.append(self._write_run(_dedupe(heapq.merge(*[_read_run(p) for p in group]))))
+                for p in group:
+                    os.remove(p)
+            runs = merged
+        self._runs = runs
+        yield from _dedupe(heapq.merge(*[_read_run(p) for p in runs]))
+
+    def cleanup(self) -> None:
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def __enter__(self) -> 'ExternalSorter':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.cleanup()
+
+
+def sort_to_file(uids: Iterable[str], path: str, memory_bytes: int = 256 * 1024 * 1024,
+                 tmp_dir: Optional[str] = None) -> int:
+    """Externally sort `uids` into `path` (one UID per line, unique). Returns the count."""
+    count = 0
+    with ExternalSorter(memory_bytes, tmp_dir) as sorter:
+        sorter.add(uids)
+        with open(path, 'w', encoding='utf-8', newline='\n', buffering=_IO_BUFFER) as f:
+            for uid in sorter.sorted_uids():
+                f.write(uid + '\n')
+                count += 1
+    return count
+
+
+def iter_sorted_file(path: str) -> Iterator[str]:
+    """Read back a file written by sort_to_file."""
+    return _read_run(path)
+
+
+class SortedFile:
+    """A file written by sort_to_file as a re-iterable: every iteration reads it again."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def __iter__(self) -> Iterator[str]:
+        return _read_run(self.path)
+
+
+class _Sink:
+    """Optional output file in the compare_month export format ('Uid' header + one UID per line)."""
+
+    def __init__(self, path: Optional[str], header: Optional[str]):
+        self.count = 0
+        self.f = None
+        if path:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            self.f = open(path, 'w', encoding='utf-8', newline='', buffering=_IO_BUFFER)
+            if header is not None:
+                self.f.write(header + '\n')
+
+    def write(self, uid: str) -> None:
+        self.count += 1
+        if self.f is not None:
+            self.f.write(uid + '\n')
+
+    def close(self) -> None:
+        if self.f is not None:
+            self.f.close()
+
+
+def merge_diff(left: Iterable[str], right: Iterable[str], both_path: Optional[str] = None,
+               left_path: Optional[str] = None, right_path: Optional[str] = None,
+               header: Optional[str] = 'Uid') -> Dict[str, int]:
+    """Merge-join two sorted unique UID streams in one pass.
+    UIDs are written to the given files as they are classified; returns
+    {'left_total', 'right_total', 'in_both', 'only_left', 'only_right'}.
+    """
+    both, only_l, only_r = _Sink(both_path, header), _Sink(left_path, header), _Sink(right_path, header)
+    try:
+        li, ri = iter(left), iter(right)
+        l = next(li, None)
+        r = next(ri, None)
+        while l is not None and r is not None:
+            if l == r:
+                both.write(l)
+                l = next(li, None)
+                r = next(ri, None)
+            elif l < r:
+                only_l.write(l)
+                l = next(li, None)
+            else:
+                only_r.write(r)
+                r = next(ri, None)
+        while l is not None:
+            only_l.write(l)
+            l = next(li, None)
+        while r is not None:
+            only_r.write(r)
+            r = next(ri, None)
+    finally:
+        both.close()
+        only_l.close()
+        only_r.close()
+    return {
+        'left_total': both.count + only_l.count,
+        'right_total': both.count + only_r.count,
+        'in_both': both.count,
+        'only_left': only_l.count,
+        'only_right': only_r.count,
+    }
@@ -2,80 +2,137 @@
 Процессор для объединения нескольких файлов по указанным столбцам
 """
 
+import numpy as np
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
 import io
+import csv
+import tempfile
+from itertools import islice, zip_longest
+from openpyxl import Workbook
+from uid_readers import CSV_ENGINE, iter_pochta_txt, sniff_csv_head
+from compressed_input import open_stream, source_name
+import xlsx_stream
+from uid_normalize import normalize_values
+from uid_arrays import UidArray, member_counts, membership_masks, region_counts
+
+# Сигнатуры начала файла: xlsx - zip-архив, xls - составной документ OLE2
+_ZIP_MAGIC = b'PK\x03\x04'
+_OLE2_MAGIC = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+# Сколько байт начала файла смотрит sniff_format
+SNIFF_BYTES = 64 * 1024
+
+# Режимы объединения: все значения, значения во всех файлах, минимум в K файлах, только в одном файле
+MERGE_MODES = ('union', 'intersection', 'at_least', 'unique')
+# Битовая маска файлов (membership_masks) - не больше 64 файлов
+MAX_MASK_FILES = 64
+# Сколько самых частых комбинаций файлов попадает в отчет
+MAX_PATTERNS = 100
+# Строк на листе Excel (вместе с заголовком)
+EXCEL_MAX_ROWS = 1_048_576
+
+
+def sniff_format(head, complete=True, name=''):
+    """
+    Формат файла по первым байтам
+    
+    Args:
+        head: начало файла (до SNIFF_BYTES байт)
+        complete: head - это весь файл (иначе последняя, обрезанная строка не учитывается)
+        name: имя файла; файл .csv с одним столбцом - тоже CSV, а не список UID
+        
+    Returns:
+        tuple: (format, encoding, sep) - format 'xlsx', 'xls', 'csv' или 'text';
+               для Excel encoding и sep - None, для текста sep - None
+    """
+    if head.startswith(_ZIP_MAGIC):
+        return 'xlsx', None, None
+    if head.startswith(_OLE2_MAGIC):
+        return 'xls', None, None
+    encoding, sep = sniff_csv_head(head, complete)
+    lines = head.decode(encoding, errors='ignore').splitlines()
+    if not complete:
+        lines = lines[:-1]
+    lines = [line for line in lines[:100] if line.strip()]
+    # CSV - если разделитель делит заголовок на несколько полей (или это файл .csv)
+    # и почти все строки на столько же; иначе это список UID по строкам
+    fields = [len(row) for row in csv.reader(lines, delimiter=sep, quotechar='"')]
+    several = fields and (fields[0] > 1 or name.lower().endswith('.csv'))
+    if several and sum(n == fields[0] for n in fields) >= 0.9 * len(fields):
+        return 'csv', encoding, sep
+    return 'text', encoding, None
+
 
 class MergeProcessor:
     """
     Процессор для объединения данных из нескольких Excel или текстовых файлов
-    Логика нормализации основана на compare_month.py
+    Нормализация значений - uid_normalize (общая с compare_month.py)
     """
     
-    @staticmethod
-    def _normalize_uid(value) -> str:
+    def __init__(self, workers=1):
         """
-        Нормализует UID: убирает BOM, кавычки, пробелы
+        Args:
+            workers: число процессов для разбора файлов (1 - последовательно,
+                     >1 - каждый файл разбирается в отдельном процессе)
         """
-        if value is None or pd.isna(value):
-            return None
-        
-        s = str(value)
-        # Убираем BOM и окружающие символы
-        s = s.lstrip('\ufeff').strip().strip('"').strip("'").strip()
-        
-        if not s or s.lower() in {'uid', 'id', 'doc_num', 'docnum', 'nan', 'none'}:
-            return None
-        
-        return s
+        self.workers = workers
     
-    def merge_files(self, files_data, column_names, merge_mode='union'):
+    def merge_files(self, files_data, column_names, merge_mode='union', min_files=2):
         """
         Объединяет несколько файлов по указанным столбцам
         
         Args:
             files_data: список словарей [{file: путь или объект, name: название}]
             column_names: список названий столбцов для извлечения
-            merge_mode: режим объединения ('union' - все уникальные, 'intersection' - только общие)
+            merge_mode: режим объединения (MERGE_MODES): 'union' - все уникальные,
+                        'intersection' - есть во всех файлах со столбцом,
+                        'at_least' - есть минимум в min_files файлах, 'unique' - только в одном файле
+            min_files: K для режима 'at_least'
             
         Returns:
             dict с результатами объединения
         """
+        if merge_mode not in MERGE_MODES:
+            raise ValueError(f'Неизвестный режим объединения: {merge_mode}')
         try:
-            all_data = {}
+            parts = {}
             file_stats = []
             
-            # Читаем каждый файл
-            for file_info in files_data:
-                file_obj = file_info['file']
-                file_name = file_info['name']
-                
-                # Извлекаем данные из файла
-                extracted_data = self._extract_columns(file_obj, column_names)
-                
-                # Сохраняем статистику
+            # Читаем файлы (при workers > 1 - параллельно, результаты в порядке files_data)
+            extracted = self._extract_all([file_info['file'] for file_info in files_data], column_names)
+            for file_info, (extracted_data, file_format) in zip(files_data, extracted):
+                # Сохраняем статистику (и какой формат/кодировка были определены)
                 file_stats.append({
-                    'name': file_name,
+                    'name': file_info['name'],
                     'total_rows': len(extracted_data),
-                    'columns_found': list(extracted_data.keys())
+                    'columns_found': list(extracted_data.keys()),
+                    **file_format
                 })
                 
-                # Объединяем данные
+                # Значения по столбцам, по номеру файла
                 for col_name, values in extracted_data.items():
-                    if col_name not in all_data:
-                        all_data[col_name] = []
-                    all_data[col_name].extend(values)
+                    parts.setdefault(col_name, {})[len(file_stats) - 1] = values
             
-            # Убираем дубликаты если нужно
-            if merge_mode == 'union':
-                for col_name in all_data:
-                    all_data[col_name] = list(set(all_data[col_name]))
+            # По каждому столбцу - один отсортированный массив на файл и битовая маска файлов на значение
+            names = [stat['name'] for stat in file_stats]
+            all_data = {}
+            membership = {}
+            for col_name, by_file in parts.items():
+                present = len(by_file)
+                # Списки значений освобождаются по мере построения массивов
+                arrays = [UidArray.from_iterable(by_file.pop(i, ())) for i in range(len(names))]
+                values, membership[col_name] = self._combine(arrays, names, present, merge_mode, min_files)
+                all_data[col_name] = values.tolist()
             
             # Формируем результат
             result = {
                 'merged_data': all_data,
                 'file_stats': file_stats,
                 'total_unique_records': {col: len(vals) for col, vals in all_data.items()},
+                'merge_mode': merge_mode,
+                'min_files': min_files,
+                'membership': membership,
                 'merge_date': datetime.now().isoformat()
             }
             
@@ -87,167 +144,197 @@ class MergeProcessor:
         except Exception as e:
             raise Exception(f'Ошибка объединения файлов: {str(e)}')
     
+    @staticmethod
+    def _combine(arrays, names, present, merge_mode, min_files):
+        """
+        Значения одного столбца по режиму объединения и статистика принадлежности
+        
+        Args:
+            arrays: UidArray значений каждого файла (пустой - у файла нет столбца)
+            names: названия файлов (в том же порядке)
+            present: сколько файлов содержат столбец
+            merge_mode, min_files: как в merge_files
+            
+        Returns:
+            tuple: (UidArray отобранных значений, {'by_file_count': {число файлов: значений},
+                    'patterns': [{'files': [...], 'count': n}], 'patterns_total': n})
+        """
+        if len(arrays) <= MAX_MASK_FILES:
+            # Один проход по каждому файлу: бит файла в маске каждого его значения
+            union, masks = membership_masks(arrays)
+            counts = member_counts(masks)
+        else:
+            # Масок не хватает - только число файлов на значение
+            union, masks = UidArray.union_all(arrays), None
+            counts = np.zeros(len(union), dtype=np.uint16)
+            for a in arrays:
+                if len(a):
+                    counts[np.searchsorted(union.values, a.values)] += 1
+        
+        if merge_mode == 'intersection':
+            keep = counts == present
+        elif merge_mode == 'at_least':
+            keep = counts >= min_files
+        elif merge_mode == 'unique':
+            keep = counts == 1
+        else:
+            keep = None
+        values = union if keep is None else UidArray(union.values[keep])
+        
+        file_counts, totals = np.unique(counts, return_counts=True)
+        stats = {'by_file_count': {str(int(k)): int(n) for k, n in zip(file_counts, totals)}}
+        if masks is not None:
+            regions = sorted(region_counts(masks).items(), key=lambda item: (-item[1], item[0]))
+            stats['patterns'] = [
+                {'files': [name for i, name in enumerate(names) if mask >> i & 1], 'count': count}
+                for mask, count in regions[:MAX_PATTERNS]
+            ]
+            stats['patterns_total'] = len(regions)
+        return values, stats
+    
+    def _extract_all(self, files, column_names):
+        """
+        _extract_columns для каждого файла, результаты в том же порядке.
+        Пути разбираются в пуле процессов; file objects нельзя передать в
+        другой процесс - они читаются в потоках
+        """
+        if self.workers <= 1 or len(files) < 2:
+            return [self._extract_columns(f, column_names) for f in files]
+        executor = ProcessPoolExecutor if all(isinstance(f, str) for f in files) else ThreadPoolExecutor
+        with executor(max_workers=min(self.workers, len(files))) as pool:
+            return list(pool.map(self._extract_columns, files, [column_names] * len(files)))
+    
     def _extract_columns(self, file, column_names):
         """
-        Извлекает указанные столбцы из файла с улучшенной нормализацией
+        Извлекает указанные столбцы из файла с улучшенной нормализацией.
+        Формат определяется по первым байтам (sniff_format), и файл читается
+        ровно одним парсером - без перебора Excel / CSV / текста.
+        Сначала читается только строка заголовка, по ней находятся запрошенные
+        столбцы; затем загружаются только они (usecols). Не найденные столбцы
+        не подменяются первым, а попадают в 'unresolved_columns'
         
         Args:
             file: путь к файлу или file object
             column_names: список названий столбцов
             
         Returns:
-            dict: {column_name: [values]} - с нормализованными значениями
+            tuple: ({column_name: [values]} - с нормализованными значениями,
+                    {'format': 'xlsx'|'xls'|'csv'|'text', 'encoding': ...})
         """
         result = {}
         
-        # Определяем тип файла и читаем его
-        if isinstance(file, str):
-            file_path = file
-            
-            # Excel файл
-            if file_path.endswith(('.xlsx', '.xls')):
-                df = pd.read_excel(file_path, dtype=str)
-                for col_name in column_names:
-                    result[col_name] = self._extract_column_from_df(df, col_name)
-            
-            # CSV файл
-            elif file_path.endswith('.csv'):
-                for sep in [';', ',', '\t']:
-                    for enc in ['utf-8', 'utf-8-sig', 'cp1251', 'latin1']:
-                        try:
-                            df = pd.read_csv(file_path, sep=sep, quotechar='"',
-                                           engine='python', encoding=enc, dtype=str,
-                                           on_bad_lines='skip')
-                            if len(df.columns) > 0:
-                                for col_name in column_names:
-                                    result[col_name] = self._extract_column_from_df(df, col_name)
-                                break
-                        except:
-                            continue
-                    if result:
-                        break
-            
-            # Текстовый файл (TXT)
-            else:
-                for enc in ['utf-8', 'utf-8-sig', 'cp1251', 'latin1']:
-                    try:
-                        with open(file_path, 'r', encoding=enc, errors='ignore') as f:
-                            values = []
-                            first_line = True
-                            for line in f:
-                                normalized = self._normalize_uid(line)
-                                if normalized:
-                                    # Пропускаем заголовок
-                                    if first_line and normalized.lower() in {'uid', 'id', 'doc_num'}:
-                                        first_line = False
-                                        continue
-                                    first_line = False
-                                    values.append(normalized)
-                        # Присваиваем всем запрошенным столбцам
-                        for col_name in column_names:
-                            result[col_name] = values
-                        break
-                    except:
-                        continue
+        with (open(file, 'rb') if isinstance(file, str) else open_stream(file)) as f:
+            head = f.read(SNIFF_BYTES)
+        complete = len(head) < SNIFF_BYTES
+        fmt, encoding, sep = sniff_format(head, complete, source_name(file))
+        if fmt == 'text' and self._header_line_matches(head, encoding, column_names):
+            # Первая строка - название запрошенного столбца: CSV из одного столбца
+            fmt, sep = 'csv', sniff_csv_head(head, complete)[1]
+        info = {'format': fmt, 'encoding': encoding, 'unresolved_columns': []}
         
-        else:
-            # File object
-            file.seek(0)
-            content = file.read()
-            
-            # Пробуем как Excel
-            try:
-                df = pd.read_excel(io.BytesIO(content), dtype=str)
-                for col_name in column_names:
-                    result[col_name] = self._extract_column_from_df(df, col_name)
-            except:
-                pass
-            
-            # Если не получилось, пробуем CSV
-            if not result:
-                for sep in [';', ',', '\t']:
-                    for enc in ['utf-8', 'utf-8-sig', 'cp1251', 'latin1']:
-                        try:
-                            text = content.decode(enc)
-                            df = pd.read_csv(io.StringIO(text), sep=sep, quotechar='"',
-                                           engine='python', dtype=str, on_bad_lines='skip')
-                            if len(df.columns) > 0:
-                                for col_name in column_names:
-                                    result[col_name] = self._extract_column_from_df(df, col_name)
-                                break
-                        except:
-                            continue
-                    if result:
-                        break
+        def source():
+            # file object читается на месте (каждый раз с начала), без копии содержимого в памяти
+            return file if isinstance(file, str) else open_stream(file)
+        
+        if fmt == 'text':
+            # Текстовый файл (TXT): UID по строкам, заголовок (Uid, doc_num...) отбрасывается.
+            # Столбец в нем один - он отдается первому запрошенному, остальные не найдены
+            # (строка, совпавшая с запрошенным столбцом, уже разобрана выше как CSV)
+            if column_names:
+                result[column_names[0]] = list(iter_pochta_txt(file))
+                info['unresolved_columns'] = list(column_names[1:])
+            return result, info
+        
+        try:
+            # 1) Только строка заголовка: каждый запрошенный столбец сопоставляется один раз
+            if fmt == 'xlsx':
+                header = xlsx_stream.read_header(source())
+            elif fmt == 'xls':
+                header = list(pd.read_excel(source(), nrows=0).columns)
+            else:
+                header = list(pd.read_csv(source(), sep=sep, quotechar='"', encoding=encoding,
+                                          nrows=0, engine='python').columns)
+            resolved = {}
+            for col_name in column_names:
+                idx = self._match_column(header, col_name)
+                if idx is None:
+                    info['unresolved_columns'].append(col_name)
+                else:
+                    resolved[col_name] = idx
+            if not resolved:
+                return result, info
             
-            # Если все еще нет, пробуем как текстовый
-            if not result:
-                for enc in ['utf-8', 'utf-8-sig', 'cp1251', 'latin1']:
-                    try:
-                        text = content.decode(enc)
-                        values = []
-                        first_line = True
-                        for line in text.split('\n'):
-                            normalized = self._normalize_uid(line)
-                            if normalized:
-                                if first_line and normalized.lower() in {'uid', 'id', 'doc_num'}:
-                                    first_line = False
-                                    continue
-                                first_line = False
-                                values.append(normalized)
-                        for col_name in column_names:
-                            result[col_name] = values
-                        break
-                    except:
-                        continue
+            # 2) Читаются только найденные столбцы
+            indices = sorted(set(resolved.values()))
+            if fmt == 'xlsx':
+                # Потоковое чтение нужных ячеек листа (как Telecom в compare_month.py)
+                columns = xlsx_stream.read_columns(source(), indices)
+            elif fmt == 'xls':
+                df = pd.read_excel(source(), dtype=str, usecols=indices)
+                columns = {idx: df[header[idx]] for idx in indices}
+            else:
+                usecols = [header[idx] for idx in indices]
+                try:
+                    df = pd.read_csv(source(), sep=sep, quotechar='"', encoding=encoding, dtype=str,
+                                     usecols=usecols, engine=CSV_ENGINE, on_bad_lines='skip')
+                except Exception:
+                    # Тот же разделитель и кодировка, более терпимый парсер
+                    df = pd.read_csv(source(), sep=sep, quotechar='"', encoding=encoding, dtype=str,
+                                     usecols=usecols, engine='python', on_bad_lines='skip')
+                columns = {idx: df[header[idx]] for idx in indices}
+        except Exception as e:
+            info['error'] = str(e)
+            return result, info
         
-        return result
+        for col_name, idx in resolved.items():
+            # Векторная нормализация всего столбца (uid_normalize)
+            result[col_name] = normalize_values(columns[idx])
+        return result, info
     
-    def _extract_column_from_df(self, df, column_name):
+    @classmethod
+    def _header_line_matches(cls, head, encoding, column_names):
+        """
+        Первая непустая строка текста совпадает (_match_column) с одним из запрошенных столбцов
         """
-        Извлекает столбец из DataFrame с нормализацией
+        for line in head.decode(encoding, errors='ignore').splitlines():
+            line = line.lstrip('\ufeff').strip()
+            if line:
+                return any(cls._match_column([line], col) is not None for col in column_names)
+        return False
+    
+    @staticmethod
+    def _match_column(header, column_name):
+        """
+        Ищет столбец в строке заголовка
+        
+        Правила по порядку: точное совпадение, без учета регистра, по части
+        названия (например, TV_SERIALNUMBER)
         
         Args:
-            df: pandas DataFrame
-            column_name: название столбца
+            header: названия столбцов (None - пустая ячейка заголовка)
+            column_name: запрошенное название
             
         Returns:
-            list: нормализованные значения
+            int или None: индекс столбца; None - не найден
         """
-        values = []
-        
-        # Ищем столбец (case-insensitive)
-        col = None
+        names = [(i, str(c)) for i, c in enumerate(header) if c is not None and str(c) != '']
+        wanted = column_name.lower()
         
         # Точное совпадение
-        if column_name in df.columns:
-            col = column_name
-        else:
-            # Case-insensitive поиск
-            for c in df.columns:
-                if c.strip().lower() == column_name.lower():
-                    col = c
-                    break
-            
-            # Поиск по части названия (например, TV_SERIALNUMBER)
-            if col is None:
-                for c in df.columns:
-                    if column_name.lower() in c.lower() or c.lower() in column_name.lower():
-                        col = c
-                        break
-            
-            # Если не нашли, используем первый столбец
-            if col is None and len(df.columns) > 0:
-                col = df.columns[0]
+        for i, c in names:
+            if c == column_name:
+                return i
         
-        if col is not None:
-            series = df[col].astype(str)
-            for v in series:
-                normalized = self._normalize_uid(v)
-                if normalized:
-                    values.append(normalized)
+        # Case-insensitive поиск
+        for i, c in names:
+            if c.strip().lower() == wanted:
+                return i
         
-        return values
+        # Поиск по части названия
+        for i, c in names:
+            if wanted in c.lower() or c.lower() in wanted:
+                return i
+        return None
     
     def _format_merged_output(self, result, language='ru', limit_preview=1000):
         """
@@ -274,6 +361,11 @@ class MergeProcessor:
                 lines.append(f"{i}. {stat['name']}")
                 lines.append(f"   Qatorlar: {stat['total_rows']:,}")
                 lines.append(f"   Topilgan ustunlar: {', '.join(stat['columns_found'])}")
+                if stat.get('unresolved_columns'):
+                    lines.append(f"   Topilmagan ustunlar: {', '.join(stat['unresolved_columns'])}")
+                if stat.get('format'):
+                    encoding = f", {stat['encoding']}" if stat.get('encoding') else ''
+                    lines.append(f"   Format: {stat['format']}{encoding}")
                 lines.append("")
             
             lines.append("-------------------------------------------------")
@@ -283,6 +375,26 @@ class MergeProcessor:
             for col_name, count in result['total_unique_records'].items():
                 lines.append(f"{col_name}: {count:,} noyob yozuv")
             
+            mode = result.get('merge_mode', 'union')
+            mode_names = {
+                'union': "barcha qiymatlar",
+                'intersection': "barcha fayllardagi qiymatlar",
+                'at_least': f"kamida {result.get('min_files', 2)} ta fayldagi qiymatlar",
+                'unique': "faqat bitta fayldagi qiymatlar",
+            }
+            lines.append(f"Rejim: {mode_names[mode]}")
+            
+            # Qiymat nechta faylda uchraydi va fayllar kombinatsiyalari
+            for col_name, stats in result.get('membership', {}).items():
+                lines.append("")
+                lines.append(f"{col_name} - fayllar soni bo'yicha:")
+                for n, count in stats['by_file_count'].items():
+                    lines.append(f"   {n} ta faylda: {count:,}")
+                if stats.get('patterns'):
+                    lines.append(f"{col_name} - fayllar kombinatsiyalari ({stats['patterns_total']:,}):")
+                    for pattern in stats['patterns']:
+                        lines.append(f"   {' + '.join(pattern['files'])}: {pattern['count']:,}")
+            
             lines.append("-------------------------------------------------")
             lines.append("")
             
@@ -320,6 +432,11 @@ class MergeProcessor:
                 lines.append(f"{i}. {stat['name']}")
                 lines.append(f"   Строк: {stat['total_rows']:,}")
                 lines.append(f"   Найдено столбцов: {', '.join(stat['columns_found'])}")
+                if stat.get('unresolved_columns'):
+                    lines.append(f"   Не найдены столбцы: {', '.join(stat['unresolved_columns'])}")
+                if stat.get('format'):
+                    encoding = f", {stat['encoding']}" if stat.get('encoding') else ''
+                    lines.append(f"   Формат: {stat['format']}{encoding}")
                 lines.append("")
             
             lines.append("-------------------------------------------------")
@@ -329,6 +446,26 @@ class MergeProcessor:
             for col_name, count in result['total_unique_records'].items():
                 lines.append(f"{col_name}: {count:,} уникальных записей")
             
+            mode = result.get('merge_mode', 'union')
+            mode_names = {
+                'union': "все значения",
+                'intersection': "значения, которые есть во всех файлах",
+                'at_least': f"значения минимум в {result.get('min_files', 2)} файлах",
+                'unique': "значения только из одного файла",
+            }
+            lines.append(f"Режим: {mode_names[mode]}")
+            
+            # В скольких файлах встречается значение и комбинации файлов
+            for col_name, stats in result.get('membership', {}).items():
+                lines.append("")
+                lines.append(f"{col_name} - по числу файлов:")
+                for n, count in stats['by_file_count'].items():
+                    lines.append(f"   в {n} файл(ах): {count:,}")
+                if stats.get('patterns'):
+                    lines.append(f"{col_name} - комбинации файлов ({stats['patterns_total']:,}):")
+                    for pattern in stats['patterns']:
+                        lines.append(f"   {' + '.join(pattern['files'])}: {pattern['count']:,}")
+            
             lines.append("-------------------------------------------------")
             lines.append("")
             
@@ -378,37 +515,95 @@ class MergeProcessor:
         
         return text_content.encode('utf-8'), filename
     
-    def export_to_excel(self, merged_data, filename=None):
+    def write_excel(self, merged_data, output, max_rows=EXCEL_MAX_ROWS):
         """
-        Экспортирует объединенные данные в Excel
+        Записывает объединенные данные в xlsx в режиме write-only: строки берутся
+        прямо из списков столбцов (без дополнения до одной длины и без DataFrame),
+        openpyxl сбрасывает их во временный файл листа - память не растет с числом строк.
+        Строки сверх max_rows (вместе с заголовком) продолжаются на следующих листах
+        
+        Args:
+            merged_data: данные объединения
+            output: путь или двоичный файл для записи
+            max_rows: строк на листе (лимит Excel - 1 048 576)
+            
+        Returns:
+            int: число листов
+        """
+        columns = merged_data['merged_data']
+        header = list(columns.keys())
+        # Короткие столбцы дополняются пустыми ячейками (None) на лету
+        rows = zip_longest(*columns.values())
+        
+        wb = Workbook(write_only=True)
+        sheets = 0
+        while True:
+            batch = islice(rows, max_rows - 1)
+            first = next(batch, None)
+            if first is None and sheets:
+                break
+            sheets += 1
+            ws = wb.create_sheet('Merged Data' if sheets == 1 else f'Merged Data {sheets}')
+            ws.append(header)
+            if first is None:
+                break
+            ws.append(first)
+            for row in batch:
+                ws.append(row)
+        wb.save(output)
+        return sheets
+    
+    def stream_excel(self, merged_data, filename=None, chunk_size=1024 * 1024):
+        """
+        Потоковый экспорт в Excel: книга пишется во временный файл на диске
+        (write_excel) и отдается блоками; файл удаляется после отдачи
         
         Args:
             merged_data: данные объединения
             filename: имя файла
+            chunk_size: размер блока
             
         Returns:
-            bytes, filename
+            tuple: (итератор bytes, имя файла)
         """
         if filename is None:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             filename = f'merged_data_{timestamp}.xlsx'
         
-        # Создаем DataFrame
-        max_len = max(len(vals) for vals in merged_data['merged_data'].values())
+        # Книга записывается сразу - ошибка записи видна до начала ответа
+        output = tempfile.TemporaryFile()
+        try:
+            self.write_excel(merged_data, output)
+        except Exception:
+            output.close()
+            raise
         
-        data_for_df = {}
-        for col_name, values in merged_data['merged_data'].items():
-            # Дополняем пустыми значениями до максимальной длины
-            padded_values = values + [''] * (max_len - len(values))
-            data_for_df[col_name] = padded_values
+        def chunks():
+            with output:
+                output.seek(0)
+                while True:
+                    block = output.read(chunk_size)
+                    if not block:
+                        break
+                    yield block
         
-        df = pd.DataFrame(data_for_df)
+        return chunks(), filename
+    
+    def export_to_excel(self, merged_data, filename=None):
+        """
+        Экспортирует объединенные данные в Excel
         
-        # Сохраняем в BytesIO
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='Merged Data')
+        Args:
+            merged_data: данные объединения
+            filename: имя файла
+            
+        Returns:
+            bytes, filename
+        """
+        if filename is None:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            filename = f'merged_data_{timestamp}.xlsx'
         
-        output.seek(0)
+        output = io.BytesIO()
+        self.write_excel(merged_data, output)
         return output.getvalue(), filename
-
@@ -0,0 +1,140 @@
+"""
+Server-side store of comparison results, addressed by result ID.
+
+/comparison/compare used to return the full difference lists to the browser,
+which then POSTed them back to download a TXT. Instead, each result is kept
+under a random ID: the difference lists are spilled straight to disk as TXT
+files (one UID per line, no header - the download format) and only the counts
+go back to the client. Downloads stream those files. Lists that were already
+written to disk (external comparison) are moved into the entry, not rewritten.
+
+Entries expire after `ttl_seconds` (measured from the last access, like the LRU
+mtime in uid_cache). Metadata is also held in memory for fast lookups; the
+directory is the source of truth, so several worker processes can share it.
+"""
+from __future__ import annotations
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from typing import Dict, Iterable, Optional
+
+_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+# Result keys holding UID lists -> file name of the spilled list
+LIST_FILES = {
+    'only_in_file1_list': 'only_in_file1.txt',
+    'only_in_file2_list': 'only_in_file2.txt',
+}
+
+
+class ResultStore:
+    """TTL-bounded comparison results: counts in memory, UID lists on disk."""
+
+    def __init__(self, store_dir: str, ttl_seconds: int = 3600):
+        self.store_dir = os.path.abspath(store_dir)
+        self.ttl_seconds = ttl_seconds
+        self._meta: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        os.makedirs(store_dir, exist_ok=True)
+
+    def _dir(self, result_id: str) -> Optional[str]:
+        if not result_id or not _ID_RE.match(result_id):
+            return None
+        return os.path.join(self.store_dir, result_id)
+
+    @staticmethod
+    def _write_list(path: str, uids: Iterable[str]) -> int:
+        count = 0
+        with open(path, 'w', encoding='utf-8', newline='', buffering=1024 * 1024) as f:
+            for uid in uids:
+                f.write(uid + '\n')
+                count += 1
+        return count
+
+    def staging_dir(self) -> tempfile.TemporaryDirectory:
+        """Scratch directory on the store's file system, for lists written
+        before put() (compare_files(list_dir=...)): moving them in is a rename.
+        """
+        return tempfile.TemporaryDirectory(prefix='staging_', dir=self.store_dir)
+
+    def put(self, result: dict) -> str:
+        """Store a compare_files() result; returns its ID.
+        The lists are written to disk and left out of the stored metadata;
+        files named in result['list_paths'] ({list key: path}) are moved instead.
+        """
+        self.purge_expired()
+        result_id = uuid.uuid4().hex
+        final_dir = os.path.join(self.store_dir, result_id)
+        tmp_dir = final_dir + '.tmp'
+        os.makedirs(tmp_dir)
+        list_paths = result.get('list_paths') or {}
+        meta = {k: v for k, v in result.items() if k not in LIST_FILES and k != 'list_paths'}
+        for key, name in LIST_FILES.items():
+            if key in list_paths:
+                shutil.move(list_paths[key], os.path.join(tmp_dir, name))
+            else:
+                self._write_list(os.path.join(tmp_dir, name), result.get(key) or [])
+        with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_dir, final_dir)
+        meta['result_id'] = result_id
+        with self._lock:
+            self._meta[result_id] = meta
+        return result_id
+
+    def get(self, result_id: str) -> Optional[dict]:
+        """Metadata (counts, names, ...) of a stored result, or None if unknown/expired."""
+        entry_dir = self._dir(result_id)
+        if entry_dir is None or not os.path.isdir(entry_dir):
+            with self._lock:
+                self._meta.pop(result_id, None)
+            return None
+        if self._expired(entry_dir):
+            self.delete(result_id)
+            return None
+        os.utime(entry_dir)  # extend the TTL on access
+        with self._lock:
+            meta = self._meta.get(result_id)
+        if meta is None:
+            try:
+                with open(os.path.join(entry_dir, 'meta.json'), encoding='utf-8') as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                return None
+            meta['result_id'] = result_id
+            with self._lock:
+                self._meta[result_id] = meta
+        return meta
+
+    def list_path(self, result_id: str, key: str) -> Optional[str]:
+        """Path of a spilled UID list ('only_in_file1_list' / 'only_in_file2_list')."""
+        if key not in LIST_FILES or self.get(result_id) is None:
+            return None
+        path = os.path.join(self._dir(result_id), LIST_FILES[key])
+        return path if os.path.exists(path) else None
+
+    def delete(self, result_id: str) -> None:
+        entry_dir = self._dir(result_id)
+        with self._lock:
+            self._meta.pop(result_id, None)
+        if entry_dir is not None:
+            shutil.rmtree(entry_dir, ignore_errors=True)
+
+    def _expired(self, entry_dir: str) -> bool:
+        try:
+            return time.time() - os.stat(entry_dir).st_mtime > self.ttl_seconds
+        except OSError:
+            return True
+
+    def purge_expired(self) -> None:
+        """Remove every entry (and abandoned .tmp directory) past its TTL."""
+        for name in os.listdir(self.store_dir):
+            entry_dir = os.path.join(self.store_dir, name)
+            if os.path.isdir(entry_dir) and self._expired(entry_dir):
+                with self._lock:
+                    self._meta.pop(name, None)
+                shutil.rmtree(entry_dir, ignore_errors=True)
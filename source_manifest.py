@@ -0,0 +1,116 @@
+"""
+Per-source manifest for incremental month comparisons.
+
+A month directory grows during the month (POCHTA_AVGUST_1.txt, _2.txt, ...).
+For each source directory the manifest records every file's size, mtime and
+content digest, and the merged UID set of the whole source (union.npy). The
+per-file parsed contributions live in a UidCache under the same digest keys.
+
+On the next run plan() sorts the files into unchanged / new or changed /
+removed using size+mtime first (no hashing for untouched files), so only the
+new or changed files are parsed:
+  - files only added: the stored union is merged with their contributions;
+  - a file changed or removed: the union is rebuilt from the cached per-file
+    contributions, without re-parsing the unchanged files.
+"""
+from __future__ import annotations
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from uid_arrays import UidArray
+from uid_cache import CACHE_FORMAT, file_digest
+
+MANIFEST_VERSION = 1
+
+
+class SourceManifest:
+    """State of one source directory (e.g. POCHTA) kept under `state_dir/<name>/`."""
+
+    def __init__(self, state_dir: str, name: str, tag: str):
+        self.dir = os.path.join(state_dir, name)
+        self.tag = tag
+        self.manifest_path = os.path.join(self.dir, 'manifest.json')
+        self.union_path = os.path.join(self.dir, 'union.npy')
+        os.makedirs(self.dir, exist_ok=True)
+        self.entries: Dict[str, dict] = self._load_entries()
+        self._checked: Dict[str, str] = {}  # digests computed by plan() for files found changed
+
+    def _load_entries(self) -> Dict[str, dict]:
+        try:
+            with open(self.manifest_path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        # Another reader, or a parser whose output may differ: start over
+        if data.get('version') != MANIFEST_VERSION or data.get('cache_format') != CACHE_FORMAT \
+                or data.get('tag') != self.tag:
+            return {}
+        return data.get('files', {})
+
+    def plan(self, files: List[str]) -> Tuple[List[str], List[str], List[str]]:
+        """Split `files` into (unchanged, new_or_changed, removed names).
+        Files whose size and mtime match the manifest are not hashed; a file
+        that was only touched (same digest) counts as unchanged.
+        """
+        unchanged, changed = [], []
+        names = set()
+        for fp in files:
+            name = os.path.basename(fp)
+            names.add(name)
+            entry = self.entries.get(name)
+            st = os.stat(fp)
+            if entry and entry['size'] == st.st_size and entry['mtime_ns'] == st.st_mtime_ns:
+                unchanged.append(fp)
+            elif entry and entry['size'] == st.st_size:
+                digest = file_digest(fp)
+                if digest == entry['digest']:
+                    entry['mtime_ns'] = st.st_mtime_ns
+                    unchanged.append(fp)
+                else:
+                    self._checked[fp] = digest
+                    changed.append(fp)
+            else:
+                changed.append(fp)
+        removed = [name for name in self.entries if name not in names]
+        return unchanged, changed, removed
+
+    def is_known(self, fp: str) -> bool:
+        return os.path.basename(fp) in self.entries
+
+    def checked_digest(self, fp: str) -> Optional[str]:
+        """Digest of a changed file if plan() already had to hash it, else None."""
+        return self._checked.get(fp)
+
+    def digest(self, fp: str) -> str:
+        """Stored content digest of a known file (its UidCache key, with the tag)."""
+        return self.entries[os.path.basename(fp)]['digest']
+
+    def load_union(self) -> Optional[UidArray]:
+        if not self.entries:
+            return None
+        try:
+            return UidArray(np.load(self.union_path, allow_pickle=False))
+        except (OSError, ValueError):
+            return None
+
+    def save(self, files: List[str], union: UidArray, digests: Dict[str, str]) -> None:
+        """Record the current files (digests of new/changed ones in `digests`) and the merged set."""
+        entries = {}
+        for fp in files:
+            name = os.path.basename(fp)
+            st = os.stat(fp)
+            digest = digests.get(fp) or self.entries[name]['digest']
+            entries[name] = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'digest': digest}
+        tmp = f"{self.union_path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            np.save(f, union.values, allow_pickle=False)
+        os.replace(tmp, self.union_path)
+        tmp = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'cache_format': CACHE_FORMAT, 'tag': self.tag,
+                       'files': entries}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.manifest_path)
+        self.entries = entries
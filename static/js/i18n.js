@@ -59,6 +59,10 @@ const translations = {
         file1: 'Файл 1:',
         file2: 'Файл 2:',
         monthName: 'Название месяца (необязательно):',
+        uidColumn: 'Столбец UID для CSV/Excel (необязательно):',
+        uidColumnHint: 'Можно указать несколько вариантов через запятую - будет взят первый найденный',
+        countsOnly: 'Только количество (быстрее, без файлов различий)',
+        provenance: 'Показать повторы UID в каждом файле',
         compare: 'Сравнить',
         comparisonResults: 'Результаты сравнения',
         comparisonReport: 'Отчет сравнения',
@@ -67,6 +71,12 @@ const translations = {
         mergeDescription: 'Загрузите несколько файлов (Excel или текстовые) и укажите названия столбцов. Система соберет все данные из этих столбцов в один файл.',
         columnNames: 'Названия столбцов (через запятую):',
         columnNamesHint: 'Укажите названия столбцов, которые нужно извлечь из файлов',
+        mergeMode: 'Режим объединения:',
+        mergeModeUnion: 'Все значения',
+        mergeModeIntersection: 'Только общие для всех файлов',
+        mergeModeAtLeast: 'Есть минимум в K файлах',
+        mergeModeUnique: 'Только в одном файле',
+        minFiles: 'K (минимум файлов):',
         selectFiles: 'Выберите файлы (минимум 2):',
         mergeFilesHint: 'Можно выбрать несколько файлов одновременно',
         merge: 'Объединить',
@@ -134,6 +144,10 @@ const translations = {
         file1: 'Fayl 1:',
         file2: 'Fayl 2:',
         monthName: 'Oy nomi (ixtiyoriy):',
+        uidColumn: 'CSV/Excel uchun UID ustuni (ixtiyoriy):',
+        uidColumnHint: "Bir nechta variantni vergul bilan yozish mumkin - birinchi topilgani olinadi",
+        countsOnly: 'Faqat soni (tezroq, farqlar fayllarisiz)',
+        provenance: "Har bir fayldagi takroriy UIDlarni ko'rsatish",
         compare: 'Solishtirish',
         comparisonResults: 'Solishtirish natijalari',
         comparisonReport: 'Solishtirish hisoboti',
@@ -142,6 +156,12 @@ const translations = {
         mergeDescription: 'Bir nechta fayllarni (Excel yoki matnli) yuklang va ustun nomlarini ko\'rsating. Tizim bu ustunlardagi barcha ma\'lumotlarni bitta faylga to\'playdi.',
         columnNames: 'Ustun nomlari (vergul bilan):',
         columnNamesHint: 'Fayllardan ajratib olinadigan ustun nomlarini ko\'rsating',
+        mergeMode: 'Birlashtirish rejimi:',
+        mergeModeUnion: 'Barcha qiymatlar',
+        mergeModeIntersection: 'Faqat barcha fayllarda borlari',
+        mergeModeAtLeast: 'Kamida K ta faylda borlari',
+        mergeModeUnique: 'Faqat bitta faylda borlari',
+        minFiles: 'K (kamida fayllar soni):',
         selectFiles: 'Fayllarni tanlang (kamida 2 ta):',
         mergeFilesHint: 'Bir vaqtning o\'zida bir nechta faylni tanlash mumkin',
         merge: 'Birlashtirish',
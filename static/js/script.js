@@ -178,6 +178,9 @@ document.addEventListener('DOMContentLoaded', function() {
     const file1Name = document.getElementById('file1Name');
     const file2Name = document.getElementById('file2Name');
     const monthNameCompare = document.getElementById('monthNameCompare');
+    const uidColumnCompare = document.getElementById('uidColumnCompare');
+    const countsOnlyCompare = document.getElementById('countsOnlyCompare');
+    const provenanceCompare = document.getElementById('provenanceCompare');
     const compareBtn = document.getElementById('compareBtn');
     const compareBtnText = document.getElementById('compareBtnText');
     const compareBtnLoader = document.getElementById('compareBtnLoader');
@@ -205,7 +208,14 @@ document.addEventListener('DOMContentLoaded', function() {
         formData.append('file1_name', file1Name.value || 'Файл 1');
         formData.append('file2_name', file2Name.value || 'Файл 2');
         formData.append('month_name', monthNameCompare.value);
+        formData.append('column_name', uidColumnCompare.value);
         formData.append('language', currentLang);
+        if (countsOnlyCompare.checked) {
+            formData.append('counts_only', '1');
+        }
+        if (provenanceCompare.checked) {
+            formData.append('provenance', '1');
+        }
         
         // Блокируем форму
         compareBtn.disabled = true;
@@ -242,6 +252,8 @@ document.addEventListener('DOMContentLoaded', function() {
     const mergeFilesForm = document.getElementById('mergeFilesForm');
     const mergeFiles = document.getElementById('mergeFiles');
     const columnNames = document.getElementById('columnNames');
+    const mergeMode = document.getElementById('mergeMode');
+    const minFiles = document.getElementById('minFiles');
     const selectedFilesList = document.getElementById('selectedFilesList');
     const mergeBtn = document.getElementById('mergeBtn');
     const mergeBtnText = document.getElementById('mergeBtnText');
@@ -288,6 +300,8 @@ document.addEventListener('DOMContentLoaded', function() {
             formData.append('files[]', file);
         });
         formData.append('column_names', columnNames.value);
+        formData.append('merge_mode', mergeMode.value);
+        formData.append('min_files', minFiles.value || '2');
         formData.append('language', currentLang);
         
         // Блокируем форму
@@ -394,7 +408,7 @@ document.addEventListener('DOMContentLoaded', function() {
                     'Content-Type': 'application/json',
                 },
                 body: JSON.stringify({
-                    comparison_data: currentComparisonData,
+                    result_id: currentComparisonData.result_id,
                     file_type: 'file1'
                 })
             });
@@ -409,6 +423,9 @@ document.addEventListener('DOMContentLoaded', function() {
                 a.click();
                 window.URL.revokeObjectURL(url);
                 document.body.removeChild(a);
+            } else {
+                const data = await response.json().catch(() => ({}));
+                showCompareMessage(data.error || 'Ошибка скачивания', 'error');
             }
         } catch (error) {
             showCompareMessage('Ошибка скачивания', 'error');
@@ -425,7 +442,7 @@ document.addEventListener('DOMContentLoaded', function() {
                     'Content-Type': 'application/json',
                 },
                 body: JSON.stringify({
-                    comparison_data: currentComparisonData,
+                    result_id: currentComparisonData.result_id,
                     file_type: 'file2'
                 })
             });
@@ -440,6 +457,9 @@ document.addEventListener('DOMContentLoaded', function() {
                 a.click();
                 window.URL.revokeObjectURL(url);
                 document.body.removeChild(a);
+            } else {
+                const data = await response.json().catch(() => ({}));
+                showCompareMessage(data.error || 'Ошибка скачивания', 'error');
             }
         } catch (error) {
             showCompareMessage('Ошибка скачивания', 'error');
@@ -768,6 +788,10 @@ document.addEventListener('DOMContentLoaded', function() {
             downloadDiff2Span.textContent = result.file2_name;
         }
         
+        // В режиме "только количество" файлов различий нет
+        downloadDiff1Btn.style.display = result.result_id ? '' : 'none';
+        downloadDiff2Btn.style.display = result.result_id ? '' : 'none';
+        
         // Обновляем tooltips
         downloadDiff1Btn.setAttribute('title', `Скачать: ${result.file1_name} minus ${result.file2_name} (${formatWithSpaces(result.only_in_file1)} записей)`);
         downloadDiff2Btn.setAttribute('title', `Скачать: ${result.file2_name} minus ${result.file1_name} (${formatWithSpaces(result.only_in_file2)} записей)`);
@@ -0,0 +1,83 @@
+import gzip
+import io
+import os
+import sys
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compressed_input import archive_exts, data_ext, full_ext, is_compressed, open_members
+from uid_readers import iter_asbt_csv, iter_pochta_txt
+
+
+class Upload(io.BytesIO):
+    """Upload stream with its original name, like werkzeug's FileStorage."""
+
+    def __init__(self, data, filename):
+        super().__init__(data)
+        self.filename = filename
+
+
+def make_zip(path, members):
+    with zipfile.ZipFile(path, 'w') as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+
+
+def test_names_and_extensions():
+    assert full_ext('a.TXT.gz') == '.txt.gz'
+    assert full_ext('b.zip') == '.zip'
+    assert archive_exts(('.txt',)) == ('.txt', '.txt.gz', '.zip')
+    assert is_compressed('x.csv.GZ') and is_compressed('x.zip') and not is_compressed('x.csv')
+
+
+def test_gzip_members(tmp_path):
+    path = tmp_path / 'POCHTA_1.txt.gz'
+    path.write_bytes(gzip.compress(b'Uid\n1\n2\n'))
+
+    members = list(open_members(str(path), ('.txt',)))
+    assert [name for name, _ in members] == ['POCHTA_1.txt']
+    with members[0][1]() as f:
+        assert f.read() == b'Uid\n1\n2\n'
+    assert list(open_members(str(path), ('.csv',))) == []
+    assert data_ext(str(path)) == '.txt'
+
+
+def test_zip_members_skip_folders_and_other_files(tmp_path):
+    path = tmp_path / 'month.zip'
+    make_zip(path, {
+        'POCHTA/': b'',
+        'POCHTA/a.txt': b'1\n2\n',
+        'POCHTA/b.TXT': b'3\n',
+        '__MACOSX/POCHTA/._a.txt': b'junk',
+        'readme.md': b'text',
+    })
+
+    members = list(open_members(str(path), ('.txt',)))
+    assert [name for name, _ in members] == ['POCHTA/a.txt', 'POCHTA/b.TXT']
+    with members[1][1]() as f:
+        assert f.read() == b'3\n'
+    assert data_ext(str(path)) == '.txt'
+
+
+def test_readers_on_compressed_paths(tmp_path):
+    (tmp_path / 'p.txt.gz').write_bytes(gzip.compress('Uid\n 1 \n2\n'.encode('utf-8')))
+    make_zip(tmp_path / 'p.zip', {'a.txt': b'Uid\n3\n', 'b.txt': b'4\n1\n'})
+    (tmp_path / 'a.csv.gz').write_bytes(gzip.compress(b'id;TV_SERIALNUMBER\n1;77\n2;88\n'))
+
+    assert list(iter_pochta_txt(str(tmp_path / 'p.txt.gz'))) == ['1', '2']
+    assert sorted(iter_pochta_txt(str(tmp_path / 'p.zip'))) == ['1', '3', '4']
+    assert list(iter_asbt_csv(str(tmp_path / 'a.csv.gz'))) == ['77', '88']
+
+
+def test_readers_on_compressed_uploads(tmp_path):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w') as zf:
+        zf.writestr('a.txt', b'5\n6\n')
+    upload = Upload(buf.getvalue(), 'upload.zip')
+
+    assert data_ext(upload) == '.txt'
+    assert list(iter_pochta_txt(upload)) == ['5', '6']
+    # The upload stays open and can be read again
+    assert list(iter_pochta_txt(upload)) == ['5', '6']
+    assert list(iter_pochta_txt(Upload(gzip.compress(b'7\n'), 'p.txt.gz'))) == ['7']
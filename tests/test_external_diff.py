@@ -0,0 +1,25 @@
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from external_diff import ExternalSorter, _MAX_FAN_IN, iter_sorted_file, sort_to_file
+
+
+def test_sort_to_file_with_more_runs_than_fan_in(tmp_path):
+    rng = random.Random(8)
+    uids = [str(rng.randrange(10 ** 12)) for _ in range(200_000)]
+    uids += uids[:5_000]  # duplicates across runs
+    memory_bytes = 100_000
+
+    with ExternalSorter(memory_bytes, str(tmp_path)) as sorter:
+        sorter.add(uids)
+        assert len(sorter._runs) > _MAX_FAN_IN
+
+    out = tmp_path / 'sorted.txt'
+    count = sort_to_file(uids, str(out), memory_bytes=memory_bytes, tmp_dir=str(tmp_path))
+
+    expected = sorted(set(uids))
+    assert count == len(expected)
+    assert list(iter_sorted_file(str(out))) == expected
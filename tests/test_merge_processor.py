@@ -0,0 +1,29 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from merge_processor import MergeProcessor
+
+
+def test_single_column_csv_uses_its_header(tmp_path):
+    (tmp_path / 'a.csv').write_text('TV_SERIALNUMBER\n111\n222\n', encoding='utf-8')
+    (tmp_path / 'b.csv').write_text('TV_SERIALNUMBER;x\n333;1\n444;2\n', encoding='utf-8')
+    files = [{'file': str(tmp_path / n), 'name': n} for n in ('a.csv', 'b.csv')]
+
+    result = MergeProcessor().merge_files(files, ['TV_SERIALNUMBER', 'missing'])
+
+    assert result['merged_data'] == {'TV_SERIALNUMBER': ['111', '222', '333', '444']}
+    assert result['file_stats'][0]['format'] == 'csv'
+    assert result['file_stats'][0]['unresolved_columns'] == ['missing']
+
+
+def test_text_file_fills_only_the_first_column(tmp_path):
+    (tmp_path / 'a.txt').write_text('111\n222\n', encoding='utf-8')
+    files = [{'file': str(tmp_path / 'a.txt'), 'name': 'a.txt'}]
+
+    result = MergeProcessor().merge_files(files, ['doc_num', 'id'])
+
+    assert result['merged_data'] == {'doc_num': ['111', '222']}
+    assert result['file_stats'][0]['format'] == 'text'
+    assert result['file_stats'][0]['unresolved_columns'] == ['id']
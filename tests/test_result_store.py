@@ -0,0 +1,80 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from result_store import ResultStore
+from uid_arrays import UidArray
+
+
+def read(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def test_put_get_writes_lists(tmp_path):
+    store = ResultStore(str(tmp_path))
+    result_id = store.put({
+        'file1_name': 'Pochta',
+        'in_both': 1,
+        'only_in_file1_list': UidArray.from_iterable(['3', '1']),
+        'only_in_file2_list': ['9'],
+    })
+
+    meta = store.get(result_id)
+    assert meta['file1_name'] == 'Pochta' and meta['in_both'] == 1
+    assert 'only_in_file1_list' not in meta
+    assert read(store.list_path(result_id, 'only_in_file1_list')) == '1\n3\n'
+    assert read(store.list_path(result_id, 'only_in_file2_list')) == '9\n'
+    assert store.list_path(result_id, 'meta') is None
+
+    # A second store over the same directory (another worker process) reads it from disk
+    assert ResultStore(str(tmp_path)).get(result_id)['file1_name'] == 'Pochta'
+
+
+def test_put_moves_list_paths(tmp_path):
+    store = ResultStore(str(tmp_path / 'store'))
+    with store.staging_dir() as list_dir:
+        staged = os.path.join(list_dir, 'only_in_file1.txt')
+        with open(staged, 'w', encoding='utf-8') as f:
+            f.write('5\n6\n')
+        result_id = store.put({'list_paths': {'only_in_file1_list': staged}, 'only_in_file2_list': []})
+        assert not os.path.exists(staged)
+
+    assert 'list_paths' not in store.get(result_id)
+    assert read(store.list_path(result_id, 'only_in_file1_list')) == '5\n6\n'
+    assert read(store.list_path(result_id, 'only_in_file2_list')) == ''
+    assert sorted(os.listdir(tmp_path / 'store')) == [result_id]
+
+
+def test_unknown_and_invalid_ids(tmp_path):
+    store = ResultStore(str(tmp_path))
+
+    assert store.get('0' * 32) is None
+    assert store.get('../etc') is None
+    assert store.list_path('../etc', 'only_in_file1_list') is None
+
+
+def test_ttl_purge(tmp_path):
+    store = ResultStore(str(tmp_path), ttl_seconds=60)
+    old_id = store.put({'only_in_file1_list': ['1']})
+    new_id = store.put({'only_in_file1_list': ['2']})
+    past = time.time() - 120
+    os.utime(tmp_path / old_id, (past, past))
+
+    store.purge_expired()
+
+    assert not os.path.exists(tmp_path / old_id)
+    assert store.get(old_id) is None
+    assert store.get(new_id) is not None
+
+
+def test_get_deletes_expired_entry(tmp_path):
+    store = ResultStore(str(tmp_path), ttl_seconds=60)
+    result_id = store.put({'only_in_file1_list': ['1']})
+    past = time.time() - 120
+    os.utime(tmp_path / result_id, (past, past))
+
+    assert store.get(result_id) is None
+    assert not os.path.exists(tmp_path / result_id)
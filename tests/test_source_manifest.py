@@ -0,0 +1,93 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compare_month import POCHTA_EXTS, read_source_incremental
+from source_manifest import SourceManifest
+from uid_cache import UidCache, file_digest
+from uid_readers import iter_pochta_txt
+
+
+def write(path, *uids, mtime=None):
+    path.write_text('Uid\n' + ''.join(u + '\n' for u in uids), encoding='utf-8')
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+def read(tmp_path, cache):
+    return sorted(read_source_incremental(str(tmp_path / 'POCHTA'), POCHTA_EXTS, iter_pochta_txt, 'POCHTA',
+                                          str(tmp_path / 'state'), cache, use_tqdm=False))
+
+
+def plan(tmp_path):
+    manifest = SourceManifest(str(tmp_path / 'state'), 'POCHTA', 'iter_pochta_txt')
+    files = sorted(str(p) for p in (tmp_path / 'POCHTA').iterdir())
+    unchanged, changed, removed = manifest.plan(files)
+    return [os.path.basename(fp) for fp in unchanged], [os.path.basename(fp) for fp in changed], removed
+
+
+def test_added_changed_and_removed_files(tmp_path):
+    src = tmp_path / 'POCHTA'
+    src.mkdir()
+    cache = UidCache(str(tmp_path / 'cache'))
+    write(src / 'p1.txt', 'A1', 'A2', mtime=1_000_000)
+    write(src / 'p2.txt', 'B1', mtime=1_000_000)
+    assert read(tmp_path, cache) == ['A1', 'A2', 'B1']
+    assert plan(tmp_path) == (['p1.txt', 'p2.txt'], [], [])
+
+    # Added: only the new file is parsed and merged into the stored set
+    write(src / 'p3.txt', 'C1')
+    assert plan(tmp_path) == (['p1.txt', 'p2.txt'], ['p3.txt'], [])
+    assert read(tmp_path, cache) == ['A1', 'A2', 'B1', 'C1']
+
+    # Changed with the same size: detected by digest, its old UIDs are gone
+    write(src / 'p2.txt', 'B9', mtime=1_500_000)
+    assert plan(tmp_path) == (['p1.txt', 'p3.txt'], ['p2.txt'], [])
+    assert read(tmp_path, cache) == ['A1', 'A2', 'B9', 'C1']
+
+    # Removed: the set is rebuilt from the remaining files
+    (src / 'p1.txt').unlink()
+    assert plan(tmp_path) == (['p2.txt', 'p3.txt'], [], ['p1.txt'])
+    assert read(tmp_path, cache) == ['B9', 'C1']
+
+
+def test_touched_file_is_unchanged_and_digests_are_recorded(tmp_path):
+    src = tmp_path / 'POCHTA'
+    src.mkdir()
+    cache = UidCache(str(tmp_path / 'cache'))
+    write(src / 'p1.txt', 'A1', mtime=1_000_000)
+    read(tmp_path, cache)
+
+    write(src / 'p1.txt', 'A1', mtime=2_000_000)
+    assert plan(tmp_path) == (['p1.txt'], [], [])
+
+    manifest = SourceManifest(str(tmp_path / 'state'), 'POCHTA', 'iter_pochta_txt')
+    digest = file_digest(str(src / 'p1.txt'))
+    assert manifest.digest(str(src / 'p1.txt')) == digest
+    assert cache.get(cache.key_for_digest(digest, 'iter_pochta_txt')).tolist() == ['A1']
+
+
+def test_evicted_cache_entry_is_reparsed(tmp_path):
+    src = tmp_path / 'POCHTA'
+    src.mkdir()
+    cache = UidCache(str(tmp_path / 'cache'))
+    write(src / 'p1.txt', 'A1')
+    write(src / 'p2.txt', 'B1')
+    read(tmp_path, cache)
+    for name in os.listdir(tmp_path / 'cache'):
+        os.remove(tmp_path / 'cache' / name)
+
+    (src / 'p2.txt').unlink()
+    assert read(tmp_path, cache) == ['A1']
+
+
+def test_other_reader_starts_over(tmp_path):
+    src = tmp_path / 'POCHTA'
+    src.mkdir()
+    write(src / 'p1.txt', 'A1')
+    read(tmp_path, UidCache(str(tmp_path / 'cache')))
+
+    manifest = SourceManifest(str(tmp_path / 'state'), 'POCHTA', 'iter_asbt_csv')
+    assert manifest.load_union() is None
+    assert manifest.plan([str(src / 'p1.txt')]) == ([], [str(src / 'p1.txt')], [])
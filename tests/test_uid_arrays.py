@@ -0,0 +1,82 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from uid_arrays import UidArray, partitioned_diff
+
+LEFT = {'100', '205', '3', 'UZ000000001', 'UZ000000777', 'ёж'}
+RIGHT = {'205', '3', '42', 'UZ000000777', 'UZ123456789012', 'ёж'}
+
+
+def uids(values):
+    return UidArray.from_iterable(values)
+
+
+def test_from_iterable_is_sorted_and_unique():
+    arr = UidArray.from_iterable(['b', 'a', 'b', 'c', 'a'], chunk_size=2)
+
+    assert arr.tolist() == ['a', 'b', 'c']
+    assert list(arr) == ['a', 'b', 'c']
+    assert 'b' in arr and 'd' not in arr
+
+
+@pytest.mark.parametrize('left, right', [
+    (LEFT, RIGHT),
+    ({'1', '22'}, {'22', '333333333333', '4444'}),  # S2 against S12
+    (set(), RIGHT),
+    (LEFT, set()),
+    (set(), set()),
+])
+def test_operators_match_set(left, right):
+    a, b = uids(left), uids(right)
+
+    assert (a & b).tolist() == sorted(left & right)
+    assert (a - b).tolist() == sorted(left - right)
+    assert (b - a).tolist() == sorted(right - left)
+    assert (a | b).tolist() == sorted(left | right)
+    assert a.count_common(b) == b.count_common(a) == len(left & right)
+
+
+def test_union_keeps_wider_uids():
+    narrow, wide = uids(['12345']), uids(['123456789012'])
+
+    assert narrow.values.dtype != wide.values.dtype
+    assert (narrow | wide).tolist() == ['12345', '123456789012']
+    assert UidArray.union_all([narrow, UidArray.empty(), wide]).tolist() == ['12345', '123456789012']
+
+
+@pytest.mark.parametrize('workers, partitions', [(1, None), (4, None), (3, 7), (8, 64)])
+def test_partitioned_diff_matches_set(workers, partitions):
+    rng = np.random.default_rng(5)
+    left = {f'UZ{n}' for n in rng.integers(0, 5000, 3000)}
+    right = {str(n) for n in rng.integers(0, 5000, 3000)} | set(list(left)[:500])
+
+    both, only_left, only_right = partitioned_diff(uids(left), uids(right), workers, partitions, min_uids=0)
+
+    assert both == len(left & right)
+    assert only_left.tolist() == sorted(left - right)
+    assert only_right.tolist() == sorted(right - left)
+
+
+@pytest.mark.parametrize('left, right', [(set(), RIGHT), (LEFT, set()), (set(), set())])
+def test_partitioned_diff_empty_inputs(left, right):
+    both, only_left, only_right = partitioned_diff(uids(left), uids(right), 4, min_uids=0)
+
+    assert both == 0
+    assert only_left.tolist() == sorted(left)
+    assert only_right.tolist() == sorted(right)
+
+
+def test_partitioned_diff_below_threshold_matches_threaded():
+    a, b = uids(LEFT), uids(RIGHT)
+
+    single = partitioned_diff(a, b, 4)
+    threaded = partitioned_diff(a, b, 4, min_uids=0)
+
+    assert single[0] == threaded[0]
+    assert single[1].tolist() == threaded[1].tolist()
+    assert single[2].tolist() == threaded[2].tolist()
@@ -0,0 +1,88 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from comparison_processor import ComparisonProcessor
+from external_diff import SortedFile, sort_to_file
+from uid_arrays import UidArray
+from uid_index import UidIndex, index_sources, period_key, source_key
+
+
+def rows(db_path):
+    index = UidIndex(db_path)
+    conn = index._connect()
+    try:
+        return conn.execute('SELECT uid, source, period FROM uid_periods ORDER BY source, period, uid').fetchall()
+    finally:
+        conn.close()
+
+
+def test_index_set_skips_unchanged_set(tmp_path):
+    index = UidIndex(str(tmp_path / 'idx.db'))
+
+    assert index.index_set('Pochta', '2025-08', {'2', '1'}) is True
+    assert index.index_set('Pochta', '2025-08', UidArray.from_iterable(['1', '2'])) is False
+    assert index.index_set('Pochta', '2025-08', {'1', '3'}) is True
+    assert index.lookup('2') == []
+    assert index.lookup(' 3 ') == [{'source': 'Pochta', 'period': '2025-08'}]
+    assert [(p['source'], p['total']) for p in index.periods()] == [('Pochta', 2)]
+
+
+def test_presorted_matches_in_memory(tmp_path):
+    uids = ['UZ3', '10', 'UZ1', '10', '2']
+    sorted_path = str(tmp_path / 'sorted.txt')
+    sort_to_file(iter(uids), sorted_path, 1024 * 1024, str(tmp_path))
+
+    index_sources(str(tmp_path / 'memory.db'), '2025-08', {'Pochta': set(uids)})
+    written = index_sources(str(tmp_path / 'disk.db'), '2025-08', {'Pochta': SortedFile(sorted_path)}, presorted=True)
+
+    assert written == {'Pochta': True}
+    assert rows(str(tmp_path / 'disk.db')) == rows(str(tmp_path / 'memory.db'))
+    # Same digest: the in-memory set is recognised as already indexed from the sorted file
+    assert UidIndex(str(tmp_path / 'disk.db')).index_set('Pochta', '2025-08', set(uids)) is False
+
+
+def test_churn_between_periods(tmp_path):
+    index = UidIndex(str(tmp_path / 'idx.db'))
+    index.index_set('Pochta', 'Avgust', {'1', '2', '3'})
+    index.index_set('Pochta', 'SEPTEMBER', {'2', '3', '4'})
+
+    result = index.churn('pochta', 'AUGUST', 'Sentyabr')
+
+    assert (result['from_total'], result['to_total']) == (3, 3)
+    assert result['disappeared_list'] == ['1'] and result['appeared_list'] == ['4']
+    assert result['retained'] == 2
+
+
+@pytest.mark.parametrize('label, key', [
+    ('AUGUST', 'AUGUST'), ('Avgust', 'AUGUST'), ('Август', 'AUGUST'), (' avgust ', 'AUGUST'),
+    ('Avgust 2025', '2025-08'), ('AUGUST_2025', '2025-08'), ('2025-8', '2025-08'), ('2025-08', '2025-08'),
+    ('2025-13', '2025-13'), ('Q3', 'Q3'),
+])
+def test_period_key(label, key):
+    assert period_key(label) == key
+
+
+def test_source_key():
+    assert [source_key(n) for n in ('pochta', ' TELECOM ', 'Asbt', 'Почта')] == ['Pochta', 'Telecom', 'ASBT', 'Pochta']
+    assert source_key('Файл 1') is None
+
+
+@pytest.mark.parametrize('external', [None, 1024 * 1024])
+def test_web_comparison_indexes_canonical_sources(tmp_path, external):
+    (tmp_path / 'a.txt').write_text('Uid\n1\n2\n', encoding='utf-8')
+    (tmp_path / 'b.txt').write_text('Uid\n2\n3\n', encoding='utf-8')
+    db_path = str(tmp_path / 'idx.db')
+    processor = ComparisonProcessor(index_db=db_path, external_memory_bytes=external)
+    files = (str(tmp_path / 'a.txt'), str(tmp_path / 'b.txt'))
+
+    assert processor.compare_files(*files, 'Файл 1', 'Telecom', index_period='Avgust')['index_skipped'] is True
+    assert processor.compare_files(*files, 'pochta', 'pochta', index_period='Avgust')['index_skipped'] is True
+    assert UidIndex(db_path).periods() == []
+
+    assert processor.compare_files(*files, 'pochta', 'TELECOM', index_period='Avgust')['index_skipped'] is False
+    assert [(p['source'], p['period'], p['total']) for p in UidIndex(db_path).periods()] == \
+        [('Pochta', 'AUGUST', 2), ('Telecom', 'AUGUST', 2)]
@@ -0,0 +1,76 @@
+import os
+import sys
+from itertools import combinations
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uid_arrays
+from compare_month import parse_region, region_uids, venn_regions
+from uid_arrays import UidArray, member_counts, membership_masks, region_counts
+
+SOURCES = [
+    ('Pochta', {'1', '2', '3', '4', 'UZ0000000005'}),
+    ('Telecom', {'2', '3', '6', 'UZ0000000005'}),
+    ('ASBT', {'3', '4', '6', '7'}),
+]
+
+
+def expected_regions(sources):
+    """{mask: sorted UIDs} computed with plain sets."""
+    regions = {}
+    for uid in set().union(*(uids for _, uids in sources)):
+        mask = sum(1 << i for i, (_, uids) in enumerate(sources) if uid in uids)
+        regions.setdefault(mask, []).append(uid)
+    return {mask: sorted(values) for mask, values in regions.items()}
+
+
+def test_membership_masks_match_sets():
+    union, masks = membership_masks([UidArray.from_iterable(uids) for _, uids in SOURCES])
+    expected = expected_regions(SOURCES)
+
+    assert union.tolist() == sorted(set().union(*(uids for _, uids in SOURCES)))
+    assert masks.dtype == np.uint8
+    assert region_counts(masks) == {mask: len(values) for mask, values in expected.items()}
+    for mask, values in expected.items():
+        assert region_uids(union, masks, mask).tolist() == values
+
+
+def test_empty_source_and_wide_masks():
+    arrays = [UidArray.from_iterable({str(i), str(i + 1)}) for i in range(20)] + [UidArray.empty()]
+    union, masks = membership_masks(arrays)
+
+    assert masks.dtype == np.uint32
+    assert not any(int(m) & (1 << 20) for m in masks)
+    assert sum(region_counts(masks).values()) == len(union) == 21
+
+
+def test_too_many_sources():
+    with pytest.raises(ValueError):
+        membership_masks([UidArray.empty()] * 65)
+
+
+@pytest.mark.parametrize('native', [True, False])
+def test_member_counts(monkeypatch, native):
+    if not native:
+        monkeypatch.delattr(uid_arrays.np, 'bitwise_count', raising=False)
+    masks = np.array([0, 1, 5, 7, 0xFFFF, 0x8001], dtype=np.uint16)
+
+    assert member_counts(masks).tolist() == [0, 1, 2, 3, 16, 2]
+
+
+def test_venn_regions_and_parse_region():
+    names = [name for name, _ in SOURCES]
+    union, masks, counts = venn_regions(SOURCES)
+    expected = expected_regions(SOURCES)
+
+    assert counts == {mask: len(values) for mask, values in expected.items()}
+    for r in range(1, len(names) + 1):
+        for members in combinations(names, r):
+            mask = parse_region('+'.join(m.lower() for m in members), names)
+            assert mask == sum(1 << names.index(m) for m in members)
+            assert region_uids(union, masks, mask).tolist() == expected.get(mask, [])
+    with pytest.raises(ValueError):
+        parse_region('Pochta+Unknown', names)
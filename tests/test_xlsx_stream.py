@@ -0,0 +1,74 @@
+import io
+import os
+import sys
+
+import pandas as pd
+from openpyxl import Workbook
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import xlsx_stream
+from merge_processor import MergeProcessor
+from uid_readers import iter_telecom_excel
+
+ROWS = [
+    ['id', None, 'doc_num', 'note'],
+    [1, 'x', 'UZ0001', 'first'],
+    [2, None, 123456789012, None],
+    [3, 'y', 12.0, 'third'],
+    [4, 'z', None, 'fourth'],
+    [5.5, 'w', 'ёж', 'fifth'],
+]
+
+
+def make_workbook(path):
+    wb = Workbook()
+    ws = wb.active
+    ws.title = 'Data'
+    for row in ROWS:
+        ws.append(row)
+    other = wb.create_sheet('Other')
+    other.append(['doc_num'])
+    other.append(['not read'])
+    wb.save(path)
+
+
+def test_read_header(tmp_path):
+    path = str(tmp_path / 'a.xlsx')
+    make_workbook(path)
+
+    assert xlsx_stream.read_header(path) == ['id', None, 'doc_num', 'note']
+
+
+def test_read_columns_matches_pandas(tmp_path):
+    path = str(tmp_path / 'a.xlsx')
+    make_workbook(path)
+
+    columns = xlsx_stream.read_columns(path, [0, 2])
+
+    df = pd.read_excel(path, dtype=str)
+    for idx in (0, 2):
+        assert columns[idx] == df.iloc[:, idx].dropna().tolist()
+    assert columns[2] == ['UZ0001', '123456789012', '12', 'ёж']
+    assert columns[0] == ['1', '2', '3', '4', '5.5']
+
+
+def test_read_from_upload_stream(tmp_path):
+    path = tmp_path / 'a.xlsx'
+    make_workbook(str(path))
+    upload = io.BytesIO(path.read_bytes())
+
+    assert xlsx_stream.read_header(upload)[2] == 'doc_num'
+    assert xlsx_stream.read_columns(upload, [3]) == {3: ['first', 'third', 'fourth', 'fifth']}
+
+
+def test_telecom_reader_and_merge_columns(tmp_path):
+    path = str(tmp_path / 'a.xlsx')
+    make_workbook(path)
+
+    assert list(iter_telecom_excel(path)) == ['UZ0001', '123456789012', '12', 'ёж']
+
+    data, info = MergeProcessor()._extract_columns(path, ['DOC_NUM', 'missing'])
+    assert info['format'] == 'xlsx'
+    assert info['unresolved_columns'] == ['missing']
+    assert data['DOC_NUM'] == ['UZ0001', '123456789012', '12', 'ёж']
@@ -0,0 +1,111 @@
+"""
+On-disk cache of parsed UID sets, keyed by file content.
+
+Each entry is the normalized UID set of one source file stored as a sorted
+fixed-width byte array (.npy, see uid_arrays.UidArray). The key is a BLAKE2
+hash of the file bytes plus the reader tag, so renamed or re-uploaded copies of
+an unchanged file hit the cache, and any edit misses it.
+
+The cache is bounded by total size: every hit refreshes the entry's mtime and
+the least recently used entries are removed once the limit is exceeded.
+"""
+from __future__ import annotations
+import hashlib
+import os
+from typing import Optional
+
+import numpy as np
+
+from compressed_input import open_stream
+from uid_arrays import UidArray
+
+# Bump when reader/normalization changes would produce different sets
+CACHE_FORMAT = 2
+
+
+def file_digest(fp, chunk_size: int = 4 * 1024 * 1024) -> str:
+    """Content hash of a path or of a seekable upload stream (read from its start)."""
+    h = hashlib.blake2b(digest_size=20)
+    with (open(fp, 'rb') if isinstance(fp, str) else open_stream(fp)) as f:
+        while True:
+            block = f.read(chunk_size)
+            if not block:
+                break
+            h.update(block)
+    return h.hexdigest()
+
+
+class UidCache:
+    """Size-bounded LRU cache of UidArrays in a directory."""
+
+    def __init__(self, cache_dir: str, max_bytes: int = 2 * 1024 ** 3):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, fp, tag: str) -> str:
+        return self.key_for_digest(file_digest(fp), tag)
+
+    @staticmethod
+    def key_for_digest(digest: str, tag: str) -> str:
+        return f"{tag}-v{CACHE_FORMAT}-{digest}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + '.npy')
+
+    def get(self, key: str) -> Optional[UidArray]:
+        path = self._path(key)
+        try:
+            values = np.load(path, allow_pickle=False)
+            os.utime(path)  # LRU: mark as recently used
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Truncated or foreign file: drop it and treat as a miss
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return UidArray(values)
+
+    def put(self, key: str, uids: UidArray) -> None:
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            np.save(f, uids.values, allow_pickle=False)
+        os.replace(tmp, path)
+        self._evict()
+
+    def _evict(self) -> None:
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.npy'):
+                continue
+            try:
+                st = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+                total -= size
+            except OSError:
+                continue
+
+    def load(self, fp, tag: str, parse, digest: Optional[str] = None) -> UidArray:
+        """Return the cached UidArray for `fp` (a path or an upload stream), or
+        build it with parse(fp) and store it. A known content `digest` of `fp`
+        saves hashing the file again.
+        """
+        key = self.key_for_digest(digest, tag) if digest else self.key(fp, tag)
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        uids = UidArray.from_iterable(parse(fp))
+        self.put(key, uids)
+        return uids
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Persistent per-source, per-month UID index (SQLite) for churn and lookups.
+
+compare_month.py (--index-db) and ComparisonProcessor store every source set
+they read under (source, period). The table is WITHOUT ROWID with primary key
+(uid, source, period), so "which months/sources contain UID X" is a single
+covering B-tree range read. The secondary index (source, period, uid) covers
+the per-month scans used by the churn queries. Neither query touches the raw
+files.
+
+Re-indexing an unchanged set is skipped via a digest stored per (source, period).
+Periods pass through period_key(), so a month indexed from its folder (AUGUST),
+its report name (Avgust) or the web form lands under one key; sources are the
+canonical SOURCES (see source_key()).
+
+Usage:
+  python uid_index.py --db uid_index.db lookup 123456789012
+  python uid_index.py --db uid_index.db periods
+  python uid_index.py --db uid_index.db churn --source Pochta --from 2025-08 --to 2025-09 --export gone.txt
+  python uid_index.py --db uid_index.db mismatches --source Telecom --against Pochta --min-periods 2
+"""
+from __future__ import annotations
+import argparse
+import hashlib
+import json
+import re
+import sqlite3
+from datetime import datetime
+from itertools import islice
+from typing import Dict, Iterable, List, Optional
+
+try:
+    from uid_arrays import sorted_uids  # type: ignore
+except Exception:
+    def sorted_uids(uids):  # type: ignore
+        return sorted(uids)
+
+_BATCH = 50_000
+
+SOURCES = ('Pochta', 'Telecom', 'ASBT')
+_SOURCE_ALIASES = {
+    'pochta': 'Pochta', 'почта': 'Pochta',
+    'telecom': 'Telecom', 'телеком': 'Telecom',
+    'asbt': 'ASBT', 'асбт': 'ASBT',
+}
+
+# Month folder name, report (Uzbek) and Russian names, in calendar order
+_MONTHS = (
+    ('JANUARY', 'Yanvar', 'Январь'), ('FEBRUARY', 'Fevral', 'Февраль'), ('MARCH', 'Mart', 'Март'),
+    ('APRIL', 'Aprel', 'Апрель'), ('MAY', 'May', 'Май'), ('JUNE', 'Iyun', 'Июнь'),
+    ('JULY', 'Iyul', 'Июль'), ('AUGUST', 'Avgust', 'Август'), ('SEPTEMBER', 'Sentyabr', 'Сентябрь'),
+    ('OCTOBER', 'Oktyabr', 'Октябрь'), ('NOVEMBER', 'Noyabr', 'Ноябрь'), ('DECEMBER', 'Dekabr', 'Декабрь'),
+)
+_MONTH_NUMBERS = {name.lower(): i for i, names in enumerate(_MONTHS, 1) for name in names}
+
+
+def period_key(label: str) -> str:
+    """Canonical index period of a month label.
+    'AUGUST', 'Avgust' and 'Август' give 'AUGUST'; with a year ('Avgust 2025',
+    'AUGUST_2025', '2025-8') - '2025-08'. Other labels are kept as given (stripped).
+    """
+    text = label.strip()
+    tokens = re.split(r'[\s_.\-/]+', text.lower())
+    year = next((t for t in tokens if re.fullmatch(r'(19|20)\d\d', t)), None)
+    month = next((_MONTH_NUMBERS[t] for t in tokens if t in _MONTH_NUMBERS), None)
+    if month is None:
+        m = re.fullmatch(r'((?:19|20)\d\d)-(\d{1,2})', text)
+        if m is None or not 1 <= int(m.group(2)) <= 12:
+            return text
+        year, month = m.group(1), int(m.group(2))
+    if year:
+        return f"{year}-{month:02d}"
+    return _MONTHS[month - 1][0]
+
+
+def source_key(name: str) -> Optional[str]:
+    """Canonical source (one of SOURCES) for a user-given name, case-insensitive; None if unknown."""
+    return _SOURCE_ALIASES.get(name.strip().lower())
+
+
+class UidIndex:
+    """SQLite index of UID sets by source and period (e.g. 'Pochta', '2025-08')."""
+
+    def __init__(self, db_path: str = 'uid_index.db'):
+        self.db_path = db_path
+        self.init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Months of a --root-dir batch may index concurrently: wait for the writer lock
+        conn = sqlite3.connect(self.db_path, timeout=300)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def init_db(self) -> None:
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS uid_periods (
+                uid TEXT NOT NULL,
+                source TEXT NOT NULL,
+                period TEXT NOT NULL,
+                PRIMARY KEY (uid, source, period)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_uid_periods_set ON uid_periods (source, period, uid)')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS indexed_sets (
+                source TEXT NOT NULL,
+                period TEXT NOT NULL,
+                total INTEGER NOT NULL,
+                digest TEXT NOT NULL,
+                indexed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (source, period)
+            )
+        ''')
+        conn.commit()
+        conn.close()
+
+    def index_set(self, source: str, period: str, uids, presorted: bool = False) -> bool:
+        """Store the UID set of `source` for `period`, replacing a previous one.
+        Returns False if the same set was already indexed (nothing written).
+        With `presorted`, `uids` are already sorted and unique and can be iterated
+        twice (e.g. external_diff.SortedFile): they are streamed, never held in memory.
+        """
+        period = period_key(period)
+        ordered = uids if presorted else sorted_uids(uids)
+        h = hashlib.blake2b(digest_size=20)
+        total = 0
+        it = iter(ordered)
+        while True:
+            batch = list(islice(it, _BATCH))
+            if not batch:
+                break
+            h.update('\n'.join(batch).encode('utf-8'))
+            h.update(b'\n')
+            total += len(batch)
+        digest = h.hexdigest()
+
+        conn = self._connect()
+        try:
+            row = conn.execute('SELECT total, digest FROM indexed_sets WHERE source = ? AND period = ?',
+                               (source, period)).fetchone()
+            if row is not None and row[0] == total and row[1] == digest:
+                return False
+            with conn:
+                conn.execute('DELETE FROM uid_periods WHERE source = ? AND period = ?', (source, period))
+                # Sorted input appends to both B-trees in order
+                conn.executemany('INSERT OR IGNORE INTO uid_periods (uid, source, period) VALUES (?, ?, ?)',
+                                 ((uid, source, period) for uid in ordered))
+                conn.execute('''
+                    INSERT OR REPLACE INTO indexed_sets (source, period, total, digest, indexed_at)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (source, period, total, digest, datetime.now().isoformat()))
+            return True
+        finally:
+            conn.close()
+
+    def periods(self) -> List[dict]:
+        """Indexed (source, period) sets with their sizes."""
+        conn = self._connect()
+        try:
+            rows = conn.execute('SELECT source, period, total, indexed_at FROM indexed_sets ORDER BY period, source').fetchall()
+        finally:
+            conn.close()
+        return [{'source': r[0], 'period': r[1], 'total': r[2], 'indexed_at': r[3]} for r in rows]
+
+    def lookup(self, uid: str) -> List[dict]:
+        """Every (source, period) containing `uid` - a primary-key range read."""
+        conn = self._connect()
+        try:
+            rows = conn.execute('SELECT source, period FROM uid_periods WHERE uid = ? ORDER BY period, source',
+                                (uid.strip(),)).fetchall()
+        finally:
+            conn.close()
+        return [{'source': r[0], 'period': r[1]} for r in rows]
+
+    def _only_in(self, conn, source: str, period: str, other_source: str, other_period: str, limit: Optional[int]):
+        sql = '''
+            SELECT a.uid FROM uid_periods a
+            WHERE a.source = ? AND a.period = ?
+              AND NOT EXISTS (SELECT 1 FROM uid_periods b WHERE b.uid = a.uid AND b.source = ? AND b.period = ?)
+            ORDER BY a.uid
+        '''
+        params = [source, period, other_source, other_period]
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        return [r[0] for r in conn.execute(sql, params)]
+
+    def churn(self, source: str, from_period: str, to_period: str, limit: Optional[int] = None) -> dict:
+        """Month-over-month churn of one source: UIDs that disappeared, appeared and stayed.
+        `limit` caps the returned lists (None - all); the counts are always exact.
+        """
+        source = source_key(source) or source
+        from_period, to_period = period_key(from_period), period_key(to_period)
+        conn = self._connect()
+        try:
+            totals = dict(conn.execute('SELECT period, total FROM indexed_sets WHERE source = ? AND period IN (?, ?)',
+                                       (source, from_period, to_period)).fetchall())
+            disappeared = self._only_in(conn, source, from_period, source, to_period, limit)
+            appeared = self._only_in(conn, source, to_period, source, from_period, limit)
+            if limit is None:
+                n_gone, n_new = len(disappeared), len(appeared)
+            else:
+                count_sql = '''
+                    SELECT COUNT(*) FROM uid_periods a WHERE a.source = ? AND a.period = ?
+                      AND NOT EXISTS (SELECT 1 FROM uid_periods b WHERE b.uid = a.uid AND b.source = ? AND b.period = ?)
+                '''
+                n_gone = conn.execute(count_sql, (source, from_period, source, to_period)).fetchone()[0]
+                n_new = conn.execute(count_sql, (source, to_period, source, from_period)).fetchone()[0]
+        finally:
+            conn.close()
+        from_total = totals.get(from_period, 0)
+        return {
+            'source': source,
+            'from_period': from_period,
+            'to_period': to_period,
+            'from_total': from_total,
+            'to_total': totals.get(to_period, 0),
+            'disappeared': n_gone,
+            'appeared': n_new,
+            'retained': from_total - n_gone,
+            'disappeared_list': disappeared,
+            'appeared_list': appeared,
+        }
+
+    def persistent_mismatches(self, source: str, against: str, min_periods: int = 2,
+                              limit: Optional[int] = None) -> List[dict]:
+        """UIDs of `source` that were missing from `against` in the same period
+        in at least `min_periods` periods (e.g. Telecom UIDs absent from Pochta month after month).
+        Only periods where `against` was indexed are counted.
+        """
+        source, against = source_key(source) or source, source_key(against) or against
+        sql = '''
+            SELECT a.uid, COUNT(*) AS n, GROUP_CONCAT(a.period) FROM uid_periods a
+            JOIN indexed_sets s ON s.source = ? AND s.period = a.period
+            WHERE a.source = ?
+              AND NOT EXISTS (SELECT 1 FROM uid_periods b WHERE b.uid = a.uid AND b.source = ? AND b.period = a.period)
+            GROUP BY a.uid HAVING n >= ?
+            ORDER BY n DESC, a.uid
+        '''
+        params = [against, source, against, min_periods]
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        conn = self._connect()
+        try:
+            rows = conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+        return [{'uid': r[0], 'periods_count': r[1], 'periods': sorted(r[2].split(','))} for r in rows]
+
+
+def index_sources(db_path: str, period: str, sources: Dict[str, Iterable[str]],
+                  presorted: bool = False) -> Dict[str, bool]:
+    """Index several {source: uids} sets for one period; returns {source: written}."""
+    index = UidIndex(db_path)
+    return {name: index.index_set(name, period, uids, presorted) for name, uids in sources.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Query the persistent UID index filled by compare_month.py --index-db.')
+    parser.add_argument('--db', type=str, default='uid_index.db', help='Path to the UID index database')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('lookup', help='Which sources/periods contain the UID(s)')
+    p.add_argument('uids', nargs='+')
+    sub.add_parser('periods', help='List indexed source sets')
+    p = sub.add_parser('churn', help='UIDs of a source that disappeared/appeared between two periods')
+    p.add_argument('--source', required=True)
+    p.add_argument('--from', dest='from_period', required=True)
+    p.add_argument('--to', dest='to_period', required=True)
+    p.add_argument('--export', type=str, default=None, help='Write the disappeared UIDs to this TXT file')
+    p = sub.add_parser('mismatches', help='UIDs of --source missing from --against in several periods')
+    p.add_argument('--source', required=True)
+    p.add_argument('--against', required=True)
+    p.add_argument('--min-periods', type=int, default=2)
+    p.add_argument('--limit', type=int, default=100)
+    args = parser.parse_args()
+
+    index = UidIndex(args.db)
+    if args.command == 'lookup':
+        for uid in args.uids:
+            hits = index.lookup(uid)
+            where = ', '.join(f"{h['source']} {h['period']}" for h in hits) or '-'
+            print(f"{uid}: {where}")
+    elif args.command == 'periods':
+        for row in index.periods():
+            print(f"{row['period']}  {row['source']}: {row['total']:,}".replace(',', ' '))
+    elif args.command == 'churn':
+        result = index.churn(args.source, args.from_period, args.to_period)
+        print(f"{args.source}: {args.from_period} -> {args.to_period}")
+        for key in ('from_total', 'to_total', 'retained', 'disappeared', 'appeared'):
+            print(f"{key}: {result[key]:,}".replace(',', ' '))
+        if args.export:
+            with open(args.export, 'w', encoding='utf-8', newline='') as f:
+                f.write('Uid\n')
+                for uid in result['disappeared_list']:
+                    f.write(f"{uid}\n")
+    elif args.command == 'mismatches':
+        rows = index.persistent_mismatches(args.source, args.against, args.min_periods, args.limit)
+        print(json.dumps(rows, ensure_ascii=False, indent=1))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Vectorized UID / value normalization for whole columns.
+
+The readers used to normalize value by value in a Python loop (strip a BOM,
+surrounding whitespace and quotes, drop header tokens and 'nan'/'none').
+normalize_values() does the same for a whole pandas Series, pyarrow array or
+list of strings at once with pyarrow.compute string kernels; without pyarrow
+the equivalent pandas .str chain is used.
+
+The steps, in order, match the old per-value code:
+  lstrip BOM -> strip whitespace -> strip '"' -> strip "'" -> strip whitespace,
+  then drop empty strings and (case-insensitive) `drop` tokens.
+"""
+from __future__ import annotations
+from typing import Iterable, List
+
+try:
+    import pyarrow as pa  # type: ignore
+    import pyarrow.compute as pc  # type: ignore
+except Exception:
+    pa = None  # type: ignore
+    pc = None  # type: ignore
+
+try:
+    import pandas as pd  # type: ignore
+except Exception:
+    pd = None  # type: ignore
+
+# Column headers that end up among the values (repeated header lines, merged files)
+HEADER_TOKENS = frozenset({'uid', 'id', 'doc_num', 'docnum'})
+# What missing cells turn into after astype(str)
+NULL_TOKENS = frozenset({'nan', 'none'})
+UID_DROP_TOKENS = HEADER_TOKENS | NULL_TOKENS
+
+
+def _to_arrow(values):
+    if isinstance(values, pa.ChunkedArray):
+        arr = values.combine_chunks() if values.num_chunks != 1 else values.chunk(0)
+    elif isinstance(values, pa.Array):
+        arr = values
+    elif pd is not None and isinstance(values, pd.Series):
+        arr = pa.array(values, from_pandas=True)
+    else:
+        arr = pa.array(values if isinstance(values, list) else list(values), from_pandas=True)
+    if isinstance(arr, pa.ChunkedArray):
+        arr = arr.combine_chunks()
+    if not (pa.types.is_string(arr.type) or pa.types.is_large_string(arr.type)):
+        if pa.types.is_dictionary(arr.type):
+            arr = arr.dictionary_decode()
+        arr = arr.cast(pa.string()) if not pa.types.is_null(arr.type) else pa.array([], type=pa.string())
+    return arr
+
+
+def _normalize_arrow(values, drop: frozenset) -> List[str]:
+    arr = _to_arrow(values).drop_null()
+    arr = pc.utf8_ltrim(arr, characters='\ufeff')
+    arr = pc.utf8_trim_whitespace(arr)
+    arr = pc.utf8_trim(arr, characters='"')
+    arr = pc.utf8_trim(arr, characters="'")
+    arr = pc.utf8_trim_whitespace(arr)
+    keep = pc.greater(pc.utf8_length(arr), 0)
+    if drop:
+        keep = pc.and_(keep, pc.invert(pc.is_in(pc.utf8_lower(arr), value_set=pa.array(sorted(drop)))))
+    return arr.filter(keep).to_pylist()
+
+
+def _normalize_pandas(values, drop: frozenset) -> List[str]:
+    s = values if isinstance(values, pd.Series) else pd.Series(list(values), dtype=object)
+    s = s.dropna().astype(str)
+    s = s.str.lstrip('\ufeff').str.strip().str.strip('"').str.strip("'").str.strip()
+    s = s[s.str.len() > 0]
+    if drop:
+        s = s[~s.str.lower().isin(drop)]
+    return s.tolist()
+
+
+def normalize_values(values: Iterable, drop: frozenset = UID_DROP_TOKENS) -> List[str]:
+    """Normalize a column of values and return the non-empty ones as a list of str.
+
+    Args:
+        values: pandas Series, pyarrow Array/ChunkedArray or iterable of str/None
+        drop: lower-case tokens to discard after trimming (default: header
+              tokens and 'nan'/'none'); pass frozenset() to keep everything
+    """
+    if pa is not None:
+        try:
+            return _normalize_arrow(values, drop)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Mixed-type object column that Arrow will not convert: use pandas
+            if pd is None:
+                raise
+    if pd is not None:
+        return _normalize_pandas(values, drop)
+    out = []
+    for v in values:
+        if v is None:
+            continue
+        s = str(v).lstrip('\ufeff').strip().strip('"').strip("'").strip()
+        if s and s.lower() not in drop:
+            out.append(s)
+    return out
@@ -0,0 +1,146 @@
+"""
+Per-file provenance of a source's UIDs.
+
+The normal readers collapse a source directory into one set, which loses how
+many times a partner sent a UID and which file it came from. In provenance
+mode every file is counted separately (sorted unique UIDs + occurrence counts)
+and the files are merged into one SourceProvenance:
+
+  - uids:   the source's sorted unique UIDs (a UidArray, usable for comparisons)
+  - masks:  per UID, a bitmask of the files containing it (uid_arrays.membership_masks);
+            with more than 64 files, the index of the first file instead
+  - counts: per UID, the total number of occurrences over all files
+
+plus rows / unique / duplicates per file. origins() then answers "which
+file(s) did this difference come from" for any subset of the UIDs.
+"""
+from __future__ import annotations
+import os
+from typing import Callable, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from uid_arrays import UidArray, membership_masks
+
+# membership_masks() keeps one bit per file
+MAX_MASK_FILES = 64
+
+
+def _unique_counts(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Sorted unique values and how often each occurs (a sort, then run lengths)."""
+    if not len(values):
+        return values, np.zeros(0, dtype=np.uint32)
+    values = np.sort(values)
+    starts = np.flatnonzero(np.concatenate(([True], values[1:] != values[:-1])))
+    return values[starts], np.diff(np.append(starts, len(values))).astype(np.uint32)
+
+
+def empty_count() -> Tuple[UidArray, np.ndarray, int]:
+    """count_file() result of a file without UIDs."""
+    return UidArray.empty(), np.zeros(0, dtype=np.uint32), 0
+
+
+def count_file(reader: Callable[[str], Iterable[str]], fp: str,
+               chunk_size: int = 1_000_000) -> Tuple[UidArray, np.ndarray, int]:
+    """(unique UIDs, occurrence count of each, number of rows) of one file."""
+    values, counts = [], []
+    rows = 0
+    chunk: List[bytes] = []
+
+    def flush():
+        v, c = _unique_counts(np.array(chunk))
+        values.append(v)
+        counts.append(c)
+
+    for uid in reader(fp):
+        chunk.append(uid.encode('utf-8'))
+        if len(chunk) >= chunk_size:
+            rows += len(chunk)
+            flush()
+            chunk = []
+    if chunk:
+        rows += len(chunk)
+        flush()
+    if not values:
+        return empty_count()
+    if len(values) == 1:
+        return UidArray(values[0]), counts[0], rows
+    # Chunks overlap: merge them and add up the counts of equal UIDs
+    merged = np.concatenate(values)
+    weights = np.concatenate(counts)
+    uniq, inverse = np.unique(merged, return_inverse=True)
+    return UidArray(uniq), np.bincount(inverse, weights=weights).astype(np.uint32), rows
+
+
+class SourceProvenance:
+    """UIDs of one source with the files they came from and their occurrence counts."""
+
+    def __init__(self, name: str, files: List[str], uids: UidArray, masks: Optional[np.ndarray],
+                 first_file: Optional[np.ndarray], counts: np.ndarray, file_stats: List[dict]):
+        self.name = name
+        self.files = files
+        self.uids = uids
+        self.masks = masks
+        self.first_file = first_file
+        self.counts = counts
+        self.file_stats = file_stats
+
+    @classmethod
+    def from_files(cls, name: str, files: List[str], parts: List[Tuple[UidArray, np.ndarray, int]]) -> 'SourceProvenance':
+        """Merge the count_file() results of `files` (same order)."""
+        arrays = [p[0] for p in parts]
+        if len(files) <= MAX_MASK_FILES:
+            uids, masks = membership_masks(arrays)
+            first_file = None
+        else:
+            uids, masks = UidArray.union_all(arrays), None
+            first_file = np.full(len(uids), -1, dtype=np.int32)
+        counts = np.zeros(len(uids), dtype=np.uint32)
+        stats = []
+        for i, (fp, (arr, file_counts, rows)) in enumerate(zip(files, parts)):
+            if len(arr):
+                pos = np.searchsorted(uids.values, arr.values)
+                counts[pos] += file_counts
+                if first_file is not None:
+                    unset = first_file[pos] < 0
+                    first_file[pos[unset]] = i
+            stats.append({'file': os.path.basename(fp), 'rows': rows, 'unique': len(arr),
+                          'duplicates': rows - len(arr)})
+        return cls(name, files, uids, masks, first_file, counts, stats)
+
+    @property
+    def total_rows(self) -> int:
+        return sum(s['rows'] for s in self.file_stats)
+
+    @property
+    def duplicated_uids(self) -> int:
+        """UIDs that occur more than once, within a file or across files."""
+        return int(np.count_nonzero(self.counts > 1))
+
+    @property
+    def in_several_files(self) -> int:
+        """UIDs present in more than one file (needs the bitmask, i.e. at most 64 files)."""
+        if self.masks is None:
+            return 0
+        m = self.masks.astype(np.uint64)
+        return int(np.count_nonzero(m & (m - np.uint64(1))))
+
+    def origins(self, uids: UidArray) -> Iterable[Tuple[str, str, int]]:
+        """(uid, originating file name(s) joined by '|', occurrences) for each of
+        `uids`, which must all belong to this source.
+        """
+        if not len(uids):
+            return
+        pos = np.searchsorted(self.uids.values, uids.values.astype(self.uids.values.dtype, copy=False))
+        names = [os.path.basename(fp) for fp in self.files]
+        label_cache = {}
+        keys = self.masks[pos] if self.masks is not None else self.first_file[pos]
+        for uid, key, count in zip(uids.values.tolist(), keys.tolist(), self.counts[pos].tolist()):
+            label = label_cache.get(key)
+            if label is None:
+                if self.masks is not None:
+                    label = '|'.join(n for i, n in enumerate(names) if key >> i & 1)
+                else:
+                    label = names[key]
+                label_cache[key] = label
+            yield uid.decode('utf-8'), label, count
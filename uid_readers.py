@@ -0,0 +1,450 @@
+"""
+UID readers shared by compare_month.py and the web processors.
+
+Every reader takes one source file - a path, a .gz/.zip bundle, or an upload
+stream (see compressed_input) - and yields its normalized UIDs (uid_normalize):
+
+  - iter_pochta_txt:    Pochta TXT, one UID per line (memory-mapped, block-decoded)
+  - iter_asbt_csv:      ASBT CSV, the TV_SERIALNUMBER column (or candidates)
+  - iter_telecom_excel: Telecom Excel, the doc_num column (or candidates)
+
+with_column() binds a CSV/Excel reader to another UID column; reader_tag() is
+the reader's key in uid_cache / source_manifest. load_file() and
+load_file_counts() parse one file into a set / UidArray / per-file counts and
+report an unreadable file instead of failing; iter_files() streams several.
+The sniffers (sniff_encoding, sniff_csv_head) are used by merge_processor too.
+"""
+from __future__ import annotations
+import codecs
+import contextlib
+import csv
+import functools
+import hashlib
+import io
+import mmap
+import os
+import sys
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+# We use pandas for CSV/XLSX reading due to varied encodings and Excel support
+try:
+    import pandas as pd  # type: ignore
+except Exception:
+    pd = None
+
+# pyarrow gives pandas a multi-threaded CSV parser; the C engine is the fallback
+try:
+    import pyarrow  # type: ignore  # noqa: F401
+    CSV_ENGINE = 'pyarrow'
+except Exception:
+    CSV_ENGINE = 'c'
+
+import xlsx_stream
+from compressed_input import Source, is_compressed, open_members, open_stream, source_name
+from uid_normalize import UID_DROP_TOKENS, normalize_values
+
+# Sorted-array UID engine needs numpy (installed together with pandas)
+try:
+    from uid_arrays import UidArray  # type: ignore
+except Exception:
+    UidArray = None  # type: ignore
+
+# Optional progress bars via tqdm
+try:
+    from tqdm import tqdm  # type: ignore
+    _TQDM_AVAILABLE = True
+except Exception:
+    tqdm = None  # type: ignore
+    _TQDM_AVAILABLE = False
+
+
+def empty_uids(engine: str = 'set'):
+    return UidArray.empty() if engine == 'array' and UidArray is not None else set()
+
+
+def load_file(reader: Callable[[str], Iterable[str]], fp: str, engine: str = 'set', cache=None, cache_tag: str = '',
+              digest: Optional[str] = None):
+    """Parse one file into its own set or UidArray (the unit of work for a pool worker).
+    With a UidCache, an unchanged file is loaded from the cache instead of parsed
+    (`digest`: the file's content digest, if already known).
+    """
+    try:
+        if cache is not None:
+            arr = cache.load(fp, cache_tag, reader, digest)
+            return arr if engine == 'array' else set(arr)
+        if engine == 'array':
+            return UidArray.from_iterable(reader(fp))
+        return set(reader(fp))
+    except KeyError as e:
+        print(f"Warning: {e.args[0]}")
+    except Exception as e:
+        print(f"Warning: Could not read {fp}: {e}")
+    return empty_uids(engine)
+
+
+def iter_files(files: List[str], reader: Callable[[str], Iterable[str]], desc: str, use_tqdm: bool = True) -> Iterator[str]:
+    """Stream the UIDs of every file in turn without collecting them (duplicates included).
+    Unreadable files are reported and skipped, as in load_file.
+    """
+    files = sorted(files)
+    bar = tqdm(total=len(files), desc=desc, unit='file') if use_tqdm and _TQDM_AVAILABLE else None  # type: ignore
+    try:
+        for fp in files:
+            try:
+                yield from reader(fp)
+            except KeyError as e:
+                print(f"Warning: {e.args[0]}")
+            except Exception as e:
+                print(f"Warning: Could not read {fp}: {e}")
+            if bar is not None:
+                bar.update(1)
+    finally:
+        if bar is not None:
+            bar.close()
+
+
+def sniff_encoding(head: bytes, complete: bool = True) -> str:
+    """Detect the text encoding from the first bytes of a file.
+    `complete` tells whether `head` is the whole file; if not, a trailing
+    partial line (and possibly a cut multi-byte character) is ignored.
+    """
+    if head.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    sample = head
+    if not complete and b'\n' in head:
+        sample = head[:head.rfind(b'\n')]
+    for enc in ('utf-8', 'cp1251'):
+        try:
+            sample.decode(enc)
+            return enc
+        except UnicodeDecodeError:
+            continue
+    return 'latin1'
+
+
+# Header tokens ('Uid', 'doc_num', ...) and 'nan'/'none', all at most 7 characters
+_HEADER_TOKENS = UID_DROP_TOKENS
+_TEXT_ENCODINGS = ['utf-8', 'cp1251', 'latin1']
+
+
+def _normalize_lines(text: str) -> List[str]:
+    """Split decoded text into lines and normalize them (uid_normalize),
+    dropping blanks and header tokens ('Uid', 'doc_num', ...) wherever they occur.
+    """
+    lines = text.split('\n')
+    if '"' in text or "'" in text or '\ufeff' in text:
+        return normalize_values(lines)
+    # Common case: plain UIDs, whitespace/CR is all there is to strip; a plain
+    # map(str.strip) beats building an Arrow array for this
+    return [s for s in map(str.strip, lines) if s and (len(s) > 7 or s.lower() not in _HEADER_TOKENS)]
+
+
+def _decode_block(block: bytes, encoding: str) -> str:
+    try:
+        return block.decode(encoding)
+    except UnicodeDecodeError:
+        # latin1 is last and never fails
+        for enc in _TEXT_ENCODINGS[_TEXT_ENCODINGS.index(encoding) + 1:]:
+            try:
+                return block.decode(enc)
+            except UnicodeDecodeError:
+                continue
+        raise
+
+
+def iter_text_stream(f, chunk_size: int = 8 * 1024 * 1024) -> Iterator[str]:
+    """Normalized UIDs from a binary stream (e.g. a decompressing gzip/zip member),
+    read in newline-aligned blocks like the memory-mapped path.
+    """
+    head = f.read(chunk_size)
+    if not head:
+        return
+    encoding = sniff_encoding(head[:64 * 1024], complete=len(head) <= 64 * 1024 and len(head) < chunk_size)
+    if encoding == 'utf-8-sig':
+        encoding, head = 'utf-8', head[len(codecs.BOM_UTF8):]
+    rest = head
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            if rest:
+                yield from _normalize_lines(_decode_block(rest, encoding))
+            return
+        rest += chunk
+        nl = rest.rfind(b'\n')
+        if nl == -1:
+            continue
+        yield from _normalize_lines(_decode_block(rest[:nl + 1], encoding))
+        rest = rest[nl + 1:]
+
+
+def iter_pochta_txt(fp: Source, chunk_size: int = 8 * 1024 * 1024) -> Iterator[str]:
+    """Yield normalized UIDs from a Pochta TXT file.
+    The file is memory-mapped, the encoding is detected once from the first
+    64 KB, and the mapping is cut into newline-aligned blocks that are decoded
+    and normalized a block at a time. A block that does not decode with the
+    detected encoding falls back to the next one (utf-8 -> cp1251 -> latin1).
+    .txt.gz files and the .txt members of a .zip are streamed the same way,
+    as is an upload stream passed instead of a path.
+    """
+    if is_compressed(fp):
+        for _, open_member in open_members(fp, ('.txt',)):
+            with open_member() as f:
+                yield from iter_text_stream(f, chunk_size)
+        return
+    if not isinstance(fp, str):
+        with open_stream(fp) as f:
+            yield from iter_text_stream(f, chunk_size)
+        return
+    with open(fp, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            encoding = sniff_encoding(mm[:64 * 1024], complete=size <= 64 * 1024)
+            pos = 0
+            if encoding == 'utf-8-sig':
+                encoding, pos = 'utf-8', len(codecs.BOM_UTF8)
+            while pos < size:
+                end = min(pos + chunk_size, size)
+                if end < size:
+                    nl = mm.rfind(b'\n', pos, end)
+                    if nl == -1:
+                        nl = mm.find(b'\n', end)
+                    end = size if nl == -1 else nl + 1
+                block = mm[pos:end]
+                pos = end
+                yield from _normalize_lines(_decode_block(block, encoding))
+
+
+_CSV_ENCODINGS = ['utf-8', 'utf-8-sig', 'cp1251', 'latin1']
+CSV_SEPARATORS = [';', ',', '\t']
+
+
+def sniff_csv_head(head: bytes, complete: bool = True) -> tuple:
+    """Detect (encoding, separator) from the first bytes of a CSV file."""
+    encoding = sniff_encoding(head, complete)
+    first_line = head.decode(encoding, errors='ignore').split('\n', 1)[0]
+    # Pick the separator that splits the header into the most quoted-aware fields;
+    # ties (including a single-column file) resolve to ';', the ASBT default
+    sep = max(CSV_SEPARATORS, key=lambda d: len(next(csv.reader([first_line], delimiter=d, quotechar='"'), [])))
+    return encoding, sep
+
+
+# A UID column given as one name, a comma-separated list or a list of candidate names
+ColumnSpec = Union[str, Sequence[str]]
+
+
+def column_candidates(column: ColumnSpec) -> List[str]:
+    """'TV_SERIALNUMBER, SERIAL' or ['TV_SERIALNUMBER', 'SERIAL'] -> names to try, in order."""
+    if isinstance(column, str):
+        column = column.split(',')
+    return [c.strip() for c in column if c and c.strip()]
+
+
+def _header_key(name) -> str:
+    return str(name).lstrip('\ufeff').strip().casefold()
+
+
+def resolve_column(header: Sequence[Optional[str]], column: ColumnSpec) -> Optional[int]:
+    """Index in `header` of the first candidate of `column` present (case-insensitive), or None."""
+    positions: Dict[str, int] = {}
+    for i, name in enumerate(header):
+        if name is not None:
+            positions.setdefault(_header_key(name), i)
+    for candidate in column_candidates(column):
+        i = positions.get(_header_key(candidate))
+        if i is not None:
+            return i
+    return None
+
+
+def _column_not_found(column: ColumnSpec, label: str, header) -> KeyError:
+    names = column_candidates(column)
+    wanted = names[0] if len(names) == 1 else f"any of {names}"
+    return KeyError(f"Column {wanted} not found in {label}. Available columns: {[h for h in header if h is not None]}")
+
+
+# Header rows by file signature (path, size, mtime, archive member): resolving
+# the column of an unchanged file again does not prescan it again
+_HEADER_CACHE: Dict[tuple, object] = {}
+_HEADER_CACHE_SIZE = 4096
+
+
+def _cached_header(fp: Source, member: Optional[str], load: Callable[[], object]):
+    if not isinstance(fp, str):
+        # An upload stream has no signature to key on
+        return load()
+    st = os.stat(fp)
+    key = (os.path.abspath(fp), st.st_size, st.st_mtime_ns, member)
+    value = _HEADER_CACHE.get(key)
+    if value is None:
+        value = load()
+        if len(_HEADER_CACHE) >= _HEADER_CACHE_SIZE:
+            _HEADER_CACHE.pop(next(iter(_HEADER_CACHE)))
+        _HEADER_CACHE[key] = value
+    return value
+
+
+def with_column(reader: Callable[..., Iterable[str]], column: Optional[ColumnSpec]) -> Callable[[str], Iterable[str]]:
+    """`reader` bound to a UID column name or candidate list (None: the reader's default column)."""
+    if not column:
+        return reader
+    return functools.partial(reader, column=column)
+
+
+def reader_tag(reader: Callable[[str], Iterable[str]]) -> str:
+    """Cache/manifest tag of a reader: its name, plus a short hash of the column
+    candidates it is bound to (the tag is part of cache file names).
+    """
+    if isinstance(reader, functools.partial):
+        columns = '|'.join(_header_key(c) for c in column_candidates(reader.keywords['column']))
+        return f"{reader.func.__name__.strip('_')}-{hashlib.blake2b(columns.encode('utf-8'), digest_size=4).hexdigest()}"
+    return reader.__name__.strip('_')
+
+
+def _open_source(source):
+    """Binary stream of a file path, or of a member opener from compressed_input."""
+    return open(source, 'rb') if isinstance(source, str) else source()
+
+
+def _sniff_csv(source, sample_size: int = 64 * 1024) -> tuple:
+    with _open_source(source) as f:
+        head = f.read(sample_size)
+    return sniff_csv_head(head, complete=len(head) < sample_size)
+
+
+def _csv_header(source, encoding: str, sep: str) -> List[str]:
+    with _open_source(source) as f:
+        text = io.TextIOWrapper(f, encoding=encoding, errors='replace', newline='')
+        return next(csv.reader(text, delimiter=sep, quotechar='"'), [])
+
+
+@contextlib.contextmanager
+def _csv_input(source):
+    """What pd.read_csv gets: the path itself, or an open (decompressing) stream."""
+    if isinstance(source, str):
+        yield source
+    else:
+        with source() as f:
+            yield f
+
+
+def _read_csv_column_fallback(source, column: ColumnSpec, label: str):
+    df = None
+    for enc in _CSV_ENCODINGS:
+        try:
+            with _csv_input(source) as src:
+                df = pd.read_csv(src, sep=';', quotechar='"', engine='python', encoding=enc, dtype=str, on_bad_lines='skip')
+            break
+        except Exception:
+            df = None
+            continue
+    if df is None:
+        raise ValueError(f"Could not read CSV {label}")
+    i = resolve_column(list(df.columns), column)
+    if i is None:
+        raise _column_not_found(column, label, list(df.columns))
+    return df[df.columns[i]]
+
+
+def _read_csv_column(source, label: str, column: ColumnSpec, fp: Source, member: Optional[str] = None):
+    """UID column of one CSV, given as a path or a member opener (`fp`/`member`
+    identify it for the header cache). Only the head of the file is read to
+    sniff the format and resolve the column; then just that column is parsed.
+    """
+    def prescan():
+        encoding, sep = _sniff_csv(source)
+        return encoding, sep, _csv_header(source, encoding, sep)
+
+    encoding, sep, header = _cached_header(fp, member, prescan)
+    i = resolve_column(header, column)
+    if i is None:
+        raise _column_not_found(column, label, header)
+    col = header[i]
+    try:
+        with _csv_input(source) as src:
+            df = pd.read_csv(src, sep=sep, quotechar='"', encoding=encoding, dtype=str,
+                             usecols=[col], engine=CSV_ENGINE, on_bad_lines='skip')
+        return df[col]
+    except Exception:
+        # Real parse error: fall back to the previous encoding trial loop (python engine)
+        return _read_csv_column_fallback(source, column, label)
+
+
+def iter_asbt_csv(fp: Source, column: ColumnSpec = 'TV_SERIALNUMBER') -> Iterator[str]:
+    """Yield normalized UIDs from `column` of an ASBT CSV file.
+    `column` may be a list (or comma-separated string) of candidate names; the
+    first one present in the header is used.
+    Encoding and separator are sniffed from the head of the file and only the
+    UID column is parsed, with the pyarrow (or C) engine. The old encoding
+    trial loop with the python engine is used only if that read fails.
+    .csv.gz files and every .csv member of a .zip are parsed from the
+    decompressing stream. `fp` may also be an upload stream.
+    Raises KeyError if the column is not present.
+    """
+    if pd is None:
+        print("Error: pandas not installed. Please install dependencies from requirements.txt")
+        sys.exit(1)
+    label = source_name(fp)
+    if is_compressed(fp):
+        for name, open_member in open_members(fp, ('.csv',)):
+            yield from normalize_values(_read_csv_column(open_member, f"{label}:{name}", column, fp, name))
+        return
+    source = fp if isinstance(fp, str) else (lambda: open_stream(fp))
+    yield from normalize_values(_read_csv_column(source, label, column, fp))
+
+
+def iter_telecom_excel(fp: Source, column: ColumnSpec = 'doc_num') -> Iterator[str]:
+    """Yield normalized UIDs from `column` of the first sheet of an Excel file
+    (a name, or candidate names tried in order).
+    .xlsx files are streamed: the header row is scanned once to locate the column,
+    then only that column's cells are extracted (see xlsx_stream). Legacy .xls
+    files go through pandas, projected to the single column.
+    A workbook inside .gz/.zip needs random access (it is a zip itself), so each
+    one is decompressed into memory, never to disk.
+    An upload stream is read in place, like a path.
+    Raises KeyError if the column is not present.
+    """
+    label = source_name(fp)
+    if is_compressed(fp):
+        for name, open_member in open_members(fp, ('.xlsx', '.xls')):
+            with open_member() as f:
+                data = io.BytesIO(f.read())
+            yield from _iter_excel_column(data, name.lower().endswith('.xlsx'), f"{label}:{name}", column, fp, name)
+        return
+    source = fp if isinstance(fp, str) else open_stream(fp)
+    yield from _iter_excel_column(source, label.lower().endswith('.xlsx'), label, column, fp)
+
+
+def _iter_excel_column(source, is_xlsx: bool, label: str, column: ColumnSpec, fp: Source,
+                       member: Optional[str] = None) -> Iterator[str]:
+    if is_xlsx:
+        header = _cached_header(fp, member, lambda: xlsx_stream.read_header(source))
+        col_idx = resolve_column(header, column)
+        if col_idx is None:
+            raise _column_not_found(column, label, header)
+        yield from normalize_values(xlsx_stream.read_columns(source, [col_idx])[col_idx])
+        return
+    if pd is None:
+        print("Error: pandas not installed. Please install dependencies from requirements.txt")
+        sys.exit(1)
+    wanted = {_header_key(c) for c in column_candidates(column)}
+    df = pd.read_excel(source, dtype=str, usecols=lambda c: _header_key(c) in wanted)
+    i = resolve_column(list(df.columns), column)
+    if i is None:
+        if not isinstance(source, str):
+            source.seek(0)
+        raise _column_not_found(column, label, list(pd.read_excel(source, nrows=0).columns))
+    yield from normalize_values(df[df.columns[i]])
+
+
+def load_file_counts(reader: Callable[[str], Iterable[str]], fp: str):
+    """count_file() for a pool worker; an unreadable file counts as empty, with a warning."""
+    from uid_provenance import count_file, empty_count
+    try:
+        return count_file(reader, fp)
+    except KeyError as e:
+        print(f"Warning: {e.args[0]}")
+    except Exception as e:
+        print(f"Warning: Could not read {fp}: {e}")
+    return empty_count()
@@ -2,6 +2,7 @@ import pandas as pd
 from collections import Counter
 from datetime import datetime
 import io
+from uid_normalize import normalize_values, NULL_TOKENS
 
 class ViolationsProcessor:
     """
@@ -12,23 +13,6 @@ class ViolationsProcessor:
     def __init__(self):
         self.violation_column = 'qoidabuzarlik nomi'
     
-    @staticmethod
-    def _normalize_value(value) -> str:
-        """
-        Нормализует значение: убирает BOM, кавычки, пробелы
-        """
-        if value is None or pd.isna(value):
-            return None
-        
-        s = str(value)
-        # Убираем BOM и окружающие символы
-        s = s.lstrip('\ufeff').strip().strip('"').strip("'").strip()
-        
-        if not s or s.lower() in {'nan', 'none', ''}:
-            return None
-        
-        return s
-    
     def process_violations_file(self, file_path):
         """
         Обрабатывает Excel файл с нарушениями и возвращает статистику
@@ -72,12 +56,7 @@ class ViolationsProcessor:
                     raise ValueError(f'Столбец "{self.violation_column}" не найден в файле. Доступные столбцы: {list(df.columns)}')
             
             # Получаем все нарушения с нормализацией
-            violations = []
-            series = df[col].astype(str)
-            for v in series:
-                normalized = self._normalize_value(v)
-                if normalized:
-                    violations.append(normalized)
+            violations = normalize_values(df[col], drop=NULL_TOKENS)
             
             # Подсчитываем количество каждого нарушения
             violation_counts = Counter(violations)
@@ -0,0 +1,199 @@
+"""
+Minimal streaming reader for single columns of .xlsx worksheets.
+
+The sheet XML is walked with iterparse and every cell outside the requested
+columns is dropped as soon as its row ends, so memory stays proportional to the
+extracted values rather than to the whole sheet. Shared strings are resolved in
+a second pass over sharedStrings.xml that keeps only the indices the requested
+columns actually reference.
+
+Values are returned as strings the way pandas.read_excel(dtype=str) renders
+them (integral numbers without a trailing ".0"); empty and error cells are
+skipped. Only the first worksheet is read, like pandas' default sheet_name=0.
+"""
+from __future__ import annotations
+import posixpath
+import zipfile
+from typing import Dict, List, Optional, Sequence, Set, Union
+from xml.etree.ElementTree import iterparse
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1]
+
+
+def _col_index(ref: str) -> int:
+    """'H12' -> 7 (0-based column index)."""
+    n = 0
+    for ch in ref:
+        if 'A' <= ch <= 'Z':
+            n = n * 26 + (ord(ch) - 64)
+        else:
+            break
+    return n - 1
+
+
+def _number_text(v: str) -> str:
+    # openpyxl reads "123" as int and "1.0"/"1E+3" as float; pandas then turns
+    # integral floats back into ints before converting to str
+    if '.' in v or 'E' in v or 'e' in v:
+        f = float(v)
+        if f.is_integer():
+            return str(int(f))
+        return str(f)
+    return str(int(v))
+
+
+def _rich_text(el) -> str:
+    """Text of an <si>/<is> element: plain <t> or rich-text runs, without phonetic hints."""
+    parts = []
+    for child in el:
+        name = _local(child.tag)
+        if name == 't':
+            parts.append(child.text or '')
+        elif name == 'r':
+            for t in child:
+                if _local(t.tag) == 't':
+                    parts.append(t.text or '')
+    return ''.join(parts)
+
+
+def _workbook_part(zf: zipfile.ZipFile, rel_type: str, default: str, first_sheet: bool = False) -> str:
+    """Resolve a workbook part (first sheet or sharedStrings) through workbook.xml.rels."""
+    try:
+        rid = None
+        if first_sheet:
+            with zf.open('xl/workbook.xml') as f:
+                for _, el in iterparse(f):
+                    if _local(el.tag) == 'sheet':
+                        rid = next((v for k, v in el.attrib.items() if _local(k) == 'id'), None)
+                        break
+            if rid is None:
+                return default
+        with zf.open('xl/_rels/workbook.xml.rels') as f:
+            for _, el in iterparse(f):
+                if _local(el.tag) != 'Relationship':
+                    continue
+                if (rid is not None and el.get('Id') == rid) or \
+                        (rid is None and el.get('Type', '').endswith('/' + rel_type)):
+                    target = el.get('Target', '')
+                    if target.startswith('/'):
+                        return target.lstrip('/')
+                    return posixpath.normpath(posixpath.join('xl', target))
+    except KeyError:
+        pass
+    return default
+
+
+def _scan_rows(zf: zipfile.ZipFile, sheet_path: str, wanted: Optional[Set[int]], max_rows: Optional[int] = None):
+    """Yield one {col_index: raw} dict per <row>, raw being str or int (shared string index)."""
+    with zf.open(sheet_path) as f:
+        sheet_data = None
+        rows_seen = 0
+        for event, el in iterparse(f, events=('start', 'end')):
+            if event == 'start':
+                if sheet_data is None and _local(el.tag) == 'sheetData':
+                    sheet_data = el
+                continue
+            if _local(el.tag) != 'row':
+                continue
+            cells = {}
+            col = -1
+            for c in el:
+                if _local(c.tag) != 'c':
+                    continue
+                ref = c.get('r')
+                col = _col_index(ref) if ref else col + 1
+                if wanted is not None and col not in wanted:
+                    continue
+                t = c.get('t', 'n')
+                if t == 'inlineStr':
+                    is_el = next((x for x in c if _local(x.tag) == 'is'), None)
+                    if is_el is not None:
+                        cells[col] = _rich_text(is_el)
+                    continue
+                v_el = next((x for x in c if _local(x.tag) == 'v'), None)
+                v = v_el.text if v_el is not None else None
+                if v is None or t == 'e':
+                    continue
+                if t == 's':
+                    cells[col] = int(v)
+                elif t == 'b':
+                    cells[col] = 'True' if v.strip() == '1' else 'False'
+                elif t in ('str', 'd'):
+                    cells[col] = v
+                else:
+                    cells[col] = _number_text(v)
+            # Drop the finished row so the tree never grows past one row
+            if sheet_data is not None:
+                sheet_data.clear()
+            else:
+                el.clear()
+            yield cells
+            rows_seen += 1
+            if max_rows is not None and rows_seen >= max_rows:
+                return
+
+
+def _resolve_shared(zf: zipfile.ZipFile, needed: Set[int]) -> Dict[int, str]:
+    """Read only the needed entries of sharedStrings.xml, stopping after the highest one."""
+    if not needed:
+        return {}
+    path = _workbook_part(zf, 'sharedStrings', 'xl/sharedStrings.xml')
+    last = max(needed)
+    found: Dict[int, str] = {}
+    try:
+        f = zf.open(path)
+    except KeyError:
+        return found
+    with f:
+        root = None
+        idx = 0
+        for event, el in iterparse(f, events=('start', 'end')):
+            if event == 'start':
+                if root is None:
+                    root = el
+                continue
+            if _local(el.tag) != 'si':
+                continue
+            if idx in needed:
+                found[idx] = _rich_text(el)
+            root.clear()
+            idx += 1
+            if idx > last:
+                break
+    return found
+
+
+def read_header(source: Union[str, object]) -> List[Optional[str]]:
+    """Return the first row of the first worksheet as strings (None for empty cells)."""
+    with zipfile.ZipFile(source) as zf:
+        sheet_path = _workbook_part(zf, 'worksheet', 'xl/worksheets/sheet1.xml', first_sheet=True)
+        row = next(_scan_rows(zf, sheet_path, None, max_rows=1), {})
+        shared = _resolve_shared(zf, {v for v in row.values() if isinstance(v, int)})
+    width = max(row) + 1 if row else 0
+    header: List[Optional[str]] = [None] * width
+    for i, v in row.items():
+        header[i] = shared.get(v) if isinstance(v, int) else v
+    return header
+
+
+def read_columns(source: Union[str, object], columns: Sequence[int]) -> Dict[int, List[str]]:
+    """Return the values below the header row for each requested 0-based column index."""
+    wanted = set(columns)
+    out: Dict[int, list] = {c: [] for c in wanted}
+    needed: Set[int] = set()
+    with zipfile.ZipFile(source) as zf:
+        sheet_path = _workbook_part(zf, 'worksheet', 'xl/worksheets/sheet1.xml', first_sheet=True)
+        rows = _scan_rows(zf, sheet_path, wanted)
+        next(rows, None)  # header
+        for cells in rows:
+            for c, v in cells.items():
+                out[c].append(v)
+                if isinstance(v, int):
+                    needed.add(v)
+        shared = _resolve_shared(zf, needed)
+    if needed:
+        for c, values in out.items():
+            out[c] = [shared.get(v, '') if isinstance(v, int) else v for v in values]
+    return out